@@ -1,12 +1,16 @@
 from __future__ import annotations
 
+import json
 from pathlib import Path
+from typing import Iterator
 
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 
 from app.services.audio_service import AudioService, default_audio_dir
 from app.services.chord_analysis_service import (
+    CHORD_SWITCH_PENALTY,
     ChordAnalysisService,
     ChordAnalysisResult,
     ChordEvent,
@@ -38,6 +42,14 @@ class ChordAnalysisResponse(BaseModel):
 
 class ChordAnalysisRequest(BaseModel):
     wav_path: str = Field(description="분리된 기타 트랙 WAV 파일의 경로 (서버 로컬 경로)")
+    stream: bool = Field(
+        default=False,
+        description="true면 블록 단위로 읽으며 NDJSON(코드 이벤트 한 줄씩, 마지막 줄에 key)으로 스트리밍",
+    )
+    smooth: bool = Field(
+        default=True,
+        description="true면 Viterbi로 코드 진행을 평활(단발 코드 점프 억제), false면 프레임별 argmax",
+    )
 
 
 @app.post("/api/audio/youtube-to-wav", response_model=YouTubeToWavResponse)
@@ -61,8 +73,26 @@ def youtube_to_wav(payload: YouTubeToWavRequest) -> YouTubeToWavResponse:
 
 
 @app.post("/api/analyze/chords", response_model=ChordAnalysisResponse)
-def analyze_chords(payload: ChordAnalysisRequest) -> ChordAnalysisResponse:
-    service = ChordAnalysisService(frame_size_sec=1.0)
+def analyze_chords(payload: ChordAnalysisRequest) -> ChordAnalysisResponse | StreamingResponse:
+    service = ChordAnalysisService(
+        frame_size_sec=1.0,
+        switch_penalty=CHORD_SWITCH_PENALTY if payload.smooth else 0.0,
+    )
+    if payload.stream:
+        try:
+            stream = service.stream_guitar_track(Path(payload.wav_path))
+        except FileNotFoundError as e:
+            raise HTTPException(status_code=404, detail=str(e))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        def ndjson_lines() -> Iterator[str]:
+            for ch in stream:
+                yield json.dumps({"time": ch.time, "chord": ch.chord}, ensure_ascii=False) + "\n"
+            yield json.dumps({"key": stream.key}, ensure_ascii=False) + "\n"
+
+        return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
+
     try:
         result: ChordAnalysisResult = service.analyze_guitar_track(Path(payload.wav_path))
     except FileNotFoundError as e:
@@ -2,10 +2,11 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from pathlib import Path
-from typing import List
+from typing import Iterator, List
 
 import numpy as np
 import librosa
+import soundfile as sf
 
 
 @dataclass(frozen=True)
@@ -20,9 +21,273 @@ class ChordAnalysisResult:
     chords: List[ChordEvent]
 
 
+# 12 반음에 대한 이름 (C, C#, D, ...)
+PITCH_CLASSES = np.array(["C", "C#", "D", "D#", "E", "F", "F#", "G", "G#", "A", "A#", "B"])
+
+# 메이저 / 마이너 키 프로파일 (Krumhansl-Kessler 스타일의 단순 버전)
+MAJOR_PROFILE = np.array([6.35, 2.23, 3.48, 2.33, 4.38, 4.09, 2.52, 5.19, 2.39, 3.66, 2.29, 2.88])
+MINOR_PROFILE = np.array([6.33, 2.68, 3.52, 5.38, 2.60, 3.53, 2.54, 4.75, 3.98, 2.69, 3.34, 3.17])
+
+CHROMA_HOP_LENGTH = 512
+CHORD_MIN_SCORE = 0.3
+# 프레임 간 코드 변경 1회당 감점(코사인 점수 단위). 0이면 프레임별 argmax 그대로.
+CHORD_SWITCH_PENALTY = 0.1
+
+# 스트리밍 분석: librosa.load 기본값과 같은 22.05kHz로 블록마다 리샘플링한다.
+STREAM_ANALYSIS_SR = 22050
+STREAM_BLOCK_SEC = 30.0
+# 블록 앞뒤로 붙여 CQT 경계 효과를 버리는 문맥 길이(가장 낮은 CQT 필터 길이보다 길게)
+STREAM_CONTEXT_SEC = 2.0
+STREAM_READ_CHUNK = 65536
+
+
+def _unit_rows(mat: np.ndarray) -> np.ndarray:
+    return mat / (np.linalg.norm(mat, axis=-1, keepdims=True) + 1e-9)
+
+
+def _key_templates() -> tuple[list[str], np.ndarray]:
+    """(이름 24개, 정규화 템플릿 24x12). 순서는 tonic별 메이저 → 마이너."""
+    names: list[str] = []
+    rows: list[np.ndarray] = []
+    for tonic in range(12):
+        names.append(f"{PITCH_CLASSES[tonic]} major")
+        rows.append(np.roll(MAJOR_PROFILE, tonic))
+        names.append(f"{PITCH_CLASSES[tonic]} minor")
+        rows.append(np.roll(MINOR_PROFILE, tonic))
+    return names, _unit_rows(np.stack(rows))
+
+
+def _triad_templates() -> tuple[list[str], np.ndarray]:
+    """(코드 이름 24개, 정규화 triad 템플릿 24x12). root, third, fifth 가중치 1.0/0.8/0.9."""
+    names: list[str] = []
+    rows: list[np.ndarray] = []
+    for root in range(12):
+        for is_major, suffix in ((True, ""), (False, "m")):
+            vec = np.zeros(12, dtype=float)
+            vec[root] = 1.0
+            vec[(root + (4 if is_major else 3)) % 12] = 0.8
+            vec[(root + 7) % 12] = 0.9
+            names.append(f"{PITCH_CLASSES[root]}{suffix}")
+            rows.append(vec)
+    return names, _unit_rows(np.stack(rows))
+
+
+KEY_NAMES, KEY_TEMPLATES = _key_templates()
+TRIAD_NAMES, TRIAD_TEMPLATES = _triad_templates()
+
+
+def best_key(chroma_mean: np.ndarray) -> str:
+    scores = KEY_TEMPLATES @ (chroma_mean / (np.linalg.norm(chroma_mean) + 1e-9))
+    return KEY_NAMES[int(np.argmax(scores))]
+
+
+def triad_scores(pooled: np.ndarray) -> np.ndarray:
+    """프레임별 크로마(12 x N) → triad 템플릿 코사인 점수(24 x N)."""
+    return TRIAD_TEMPLATES @ _unit_rows(pooled.T).T
+
+
+def viterbi_decode(
+    emission: np.ndarray,
+    transition: np.ndarray,
+    initial: np.ndarray | None = None,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    emission: (T x S) 가산 점수, transition: (S x S) [이전, 다음] 가산 점수.
+    initial: (S,) 이전 블록의 마지막 누적 점수(스트리밍에서 블록을 이어 붙일 때).
+    반환: (상태 경로 (T,), 마지막 프레임 누적 점수 (S,)). 동점은 낮은 인덱스가 이긴다.
+    """
+    em = np.asarray(emission, dtype=float)
+    n_frames, n_states = em.shape
+    if n_frames == 0:
+        return np.zeros(0, dtype=np.int64), (
+            np.zeros(n_states) if initial is None else np.asarray(initial, dtype=float)
+        )
+    back = np.zeros((n_frames, n_states), dtype=np.int64)
+    cols = np.arange(n_states)
+    if initial is None:
+        delta = em[0].copy()
+    else:
+        cand = np.asarray(initial, dtype=float)[:, None] + transition
+        back[0] = np.argmax(cand, axis=0)
+        delta = cand[back[0], cols] + em[0]
+    for t in range(1, n_frames):
+        cand = delta[:, None] + transition
+        back[t] = np.argmax(cand, axis=0)
+        delta = cand[back[t], cols] + em[t]
+    path = np.zeros(n_frames, dtype=np.int64)
+    path[-1] = int(np.argmax(delta))
+    for t in range(n_frames - 1, 0, -1):
+        path[t - 1] = back[t, path[t]]
+    return path, delta
+
+
+# 상태: triad 24개 + "N"(코드 없음). N의 점수는 CHORD_MIN_SCORE 로 고정한다.
+CHORD_STATE_NAMES = TRIAD_NAMES + ["N"]
+
+
+def _switch_penalty_transition(n_states: int, penalty: float) -> np.ndarray:
+    trans = np.full((n_states, n_states), -float(penalty), dtype=float)
+    np.fill_diagonal(trans, 0.0)
+    return trans
+
+
+def decode_chord_states(
+    pooled: np.ndarray,
+    scores: np.ndarray,
+    *,
+    switch_penalty: float = 0.0,
+    initial: np.ndarray | None = None,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    (24 x N) triad 점수 → CHORD_STATE_NAMES 인덱스 경로와 마지막 누적 점수.
+    무음 프레임은 N으로 고정한다. switch_penalty=0 이면 프레임별 argmax(점수 < CHORD_MIN_SCORE → N)와 같다.
+    """
+    n = scores.shape[1]
+    emission = np.empty((n, len(CHORD_STATE_NAMES)), dtype=float)
+    emission[:, :-1] = scores.T
+    emission[:, -1] = CHORD_MIN_SCORE
+    silent = np.all(np.isclose(pooled, 0.0), axis=0)
+    emission[silent, :-1] = -1e9
+    path, delta = viterbi_decode(
+        emission, _switch_penalty_transition(len(CHORD_STATE_NAMES), switch_penalty), initial
+    )
+    # 누적 점수가 곡 길이에 비례해 커지지 않도록 기준을 0으로 맞춘다(경로 선택에는 영향 없음).
+    return path, delta - delta.max()
+
+
+def chord_labels_from_scores(
+    pooled: np.ndarray,
+    scores: np.ndarray,
+    *,
+    switch_penalty: float = 0.0,
+) -> list[str]:
+    """프레임별 코드 이름. 무음이거나 점수가 CHORD_MIN_SCORE 미만이면 "N"; switch_penalty > 0 이면 Viterbi 평활."""
+    path, _delta = decode_chord_states(pooled, scores, switch_penalty=switch_penalty)
+    return [CHORD_STATE_NAMES[int(i)] for i in path]
+
+
+def pool_chroma_frames(
+    chroma: np.ndarray,
+    *,
+    sr: int,
+    hop_length: int,
+    frame_size_sec: float,
+    n_frames: int,
+) -> np.ndarray:
+    """크로마 열을 frame_size_sec 구간별 평균으로 묶는다(12 x n_frames). 열이 없는 구간은 0."""
+    col_times = np.arange(chroma.shape[1]) * (hop_length / float(sr))
+    frame_idx = np.minimum((col_times / frame_size_sec).astype(np.int64), n_frames - 1)
+    sums = np.zeros((chroma.shape[0], n_frames), dtype=float)
+    np.add.at(sums.T, frame_idx, chroma.T)
+    counts = np.bincount(frame_idx, minlength=n_frames).astype(float)
+    return sums / np.maximum(counts, 1.0)
+
+
+class ChordStream:
+    """
+    WAV를 soundfile 블록 단위로 읽으며 ChordEvent를 순서대로 내보내는 이터레이터.
+
+    블록마다 앞뒤 STREAM_CONTEXT_SEC 문맥을 붙여 크로마를 계산하고, 해당 블록에 속한 열만 채택해
+    블록 경계에서도 전체 곡 분석과 같은 열 연속성을 유지한다. 메모리는 블록+문맥 길이에 비례한다.
+    키는 채택된 크로마 열의 누적 합으로 추정하며, 이터레이션을 끝까지 돈 뒤 `key`로 읽는다.
+    Viterbi 평활은 블록마다 디코딩하되 직전 블록의 마지막 누적 점수에서 이어 시작한다
+    (이미 내보낸 블록은 되돌리지 않으므로 블록 경계 부근은 전체 곡 디코딩과 다를 수 있다).
+    """
+
+    def __init__(
+        self,
+        wav_path: Path,
+        *,
+        frame_size_sec: float,
+        block_sec: float = STREAM_BLOCK_SEC,
+        context_sec: float = STREAM_CONTEXT_SEC,
+        switch_penalty: float = 0.0,
+    ):
+        self.wav_path = wav_path
+        self.frame_size_sec = frame_size_sec
+        self.block_sec = block_sec
+        self.context_sec = context_sec
+        self.switch_penalty = switch_penalty
+        self._chroma_sum = np.zeros(12, dtype=float)
+        self._delta: np.ndarray | None = None
+        self._done = False
+
+    @property
+    def key(self) -> str | None:
+        return best_key(self._chroma_sum) if self._done else None
+
+    def __iter__(self) -> Iterator[ChordEvent]:
+        frames_per_block = max(1, int(round(self.block_sec / self.frame_size_sec)))
+        hop_sec = CHROMA_HOP_LENGTH / float(STREAM_ANALYSIS_SR)
+        with sf.SoundFile(str(self.wav_path)) as fh:
+            sr = int(fh.samplerate)
+            total_samples = int(fh.frames)
+            n_frames = max(1, int(np.ceil(total_samples / (self.frame_size_sec * sr))))
+            ctx = int(round(self.context_sec * sr))
+            buf = np.zeros(0, dtype=np.float32)
+            buf_start = 0  # buf[0]의 절대 샘플 위치
+            first_frame = 0
+            while first_frame < n_frames:
+                last_frame = min(n_frames, first_frame + frames_per_block)
+                block_start = int(round(first_frame * self.frame_size_sec * sr))
+                block_end = int(round(last_frame * self.frame_size_sec * sr))
+
+                # 앞 문맥 밖 샘플은 버리고, 뒤 문맥까지 읽어 둔다.
+                drop = max(0, min(len(buf), block_start - ctx - buf_start))
+                buf = buf[drop:]
+                buf_start += drop
+                need_end = min(total_samples, block_end + ctx)
+                while buf_start + len(buf) < need_end:
+                    chunk = fh.read(
+                        min(STREAM_READ_CHUNK, need_end - buf_start - len(buf)),
+                        dtype="float32",
+                        always_2d=True,
+                    )
+                    if len(chunk) == 0:
+                        break
+                    buf = np.concatenate([buf, chunk.mean(axis=1)])
+
+                pooled = self._pooled_block(buf, buf_start, sr, first_frame, last_frame, hop_sec)
+                path, self._delta = decode_chord_states(
+                    pooled, triad_scores(pooled), switch_penalty=self.switch_penalty, initial=self._delta
+                )
+                for offset, state in enumerate(path):
+                    yield ChordEvent(
+                        time=(first_frame + offset) * self.frame_size_sec, chord=CHORD_STATE_NAMES[int(state)]
+                    )
+                first_frame = last_frame
+        self._done = True
+
+    def _pooled_block(
+        self,
+        buf: np.ndarray,
+        buf_start: int,
+        sr: int,
+        first_frame: int,
+        last_frame: int,
+        hop_sec: float,
+    ) -> np.ndarray:
+        n_local = last_frame - first_frame
+        if len(buf) == 0:
+            return np.zeros((12, n_local), dtype=float)
+        y = buf if sr == STREAM_ANALYSIS_SR else librosa.resample(buf, orig_sr=sr, target_sr=STREAM_ANALYSIS_SR)
+        chroma = librosa.feature.chroma_cqt(y=y, sr=STREAM_ANALYSIS_SR, hop_length=CHROMA_HOP_LENGTH)
+        col_sec = buf_start / float(sr) + np.arange(chroma.shape[1]) * hop_sec
+        frame_idx = np.floor(col_sec / self.frame_size_sec).astype(np.int64)
+        keep = (frame_idx >= first_frame) & (frame_idx < last_frame)
+        kept = chroma[:, keep]
+        self._chroma_sum += kept.sum(axis=1)
+        sums = np.zeros((12, n_local), dtype=float)
+        local_idx = frame_idx[keep] - first_frame
+        np.add.at(sums.T, local_idx, kept.T)
+        counts = np.bincount(local_idx, minlength=n_local).astype(float)
+        return sums / np.maximum(counts, 1.0)
+
+
 class ChordAnalysisService:
-    def __init__(self, frame_size_sec: float = 1.0):
+    def __init__(self, frame_size_sec: float = 1.0, switch_penalty: float = CHORD_SWITCH_PENALTY):
         self.frame_size_sec = frame_size_sec
+        self.switch_penalty = switch_penalty
 
     def analyze_guitar_track(self, wav_path: Path) -> ChordAnalysisResult:
         if not wav_path.exists():
@@ -31,90 +296,43 @@ class ChordAnalysisService:
         # 모노 로딩
         y, sr = librosa.load(str(wav_path), mono=True)
 
+        # 크로마는 전체 곡에 대해 한 번만 계산하고, 키·프레임별 코드 모두 이 행렬을 재사용한다.
+        chroma = librosa.feature.chroma_cqt(y=y, sr=sr, hop_length=CHROMA_HOP_LENGTH)
+
         # --- 전체 곡 Key 추정 (아주 단순한 크로마 기반) ---
-        chroma = librosa.feature.chroma_cqt(y=y, sr=sr)
-        chroma_mean = chroma.mean(axis=1)
-
-        # 12 반음에 대한 이름 (C, C#, D, ...)
-        pitch_classes = np.array(["C", "C#", "D", "D#", "E", "F", "F#", "G", "G#", "A", "A#", "B"])
-
-        # 메이저 / 마이너 키 프로파일 (Krumhansl-Kessler 스타일의 단순 버전)
-        major_profile = np.array([6.35, 2.23, 3.48, 2.33, 4.38, 4.09, 2.52, 5.19, 2.39, 3.66, 2.29, 2.88])
-        minor_profile = np.array([6.33, 2.68, 3.52, 5.38, 2.60, 3.53, 2.54, 4.75, 3.98, 2.69, 3.34, 3.17])
-
-        def best_key(chroma_vec: np.ndarray) -> str:
-            chroma_vec = chroma_vec / (np.linalg.norm(chroma_vec) + 1e-9)
-            best_score = -1e9
-            best_name = "C major"
-            for tonic in range(12):
-                # 메이저
-                mp = np.roll(major_profile, tonic)
-                mp = mp / np.linalg.norm(mp)
-                score_maj = float(np.dot(chroma_vec, mp))
-                if score_maj > best_score:
-                    best_score = score_maj
-                    best_name = f"{pitch_classes[tonic]} major"
-
-                # 마이너
-                mn = np.roll(minor_profile, tonic)
-                mn = mn / np.linalg.norm(mn)
-                score_min = float(np.dot(chroma_vec, mn))
-                if score_min > best_score:
-                    best_score = score_min
-                    best_name = f"{pitch_classes[tonic]} minor"
-
-            return best_name
-
-        full_key = best_key(chroma_mean)
-
-        # --- 1초 단위 프레임별 코드 추정 (매우 단순한 triad 매칭) ---
-        chords: List[ChordEvent] = []
+        full_key = best_key(chroma.mean(axis=1))
+
+        # --- frame_size_sec 단위 프레임별 코드 추정 (크로마 열 풀링 + triad 템플릿 행렬곱 + Viterbi) ---
         frame_samples = int(self.frame_size_sec * sr)
         n_frames = max(1, int(np.ceil(len(y) / frame_samples)))
-
-        # triad 템플릿 (메이저/마이너)
-        def triad_template(root_idx: int, is_major: bool) -> np.ndarray:
-            # root, third, fifth
-            third = (root_idx + (4 if is_major else 3)) % 12
-            fifth = (root_idx + 7) % 12
-            vec = np.zeros(12, dtype=float)
-            vec[root_idx] = 1.0
-            vec[third] = 0.8
-            vec[fifth] = 0.9
-            return vec
-
-        triads = []
-        for i in range(12):
-            triads.append((f"{pitch_classes[i]}", triad_template(i, True)))   # major
-            triads.append((f"{pitch_classes[i]}m", triad_template(i, False)))  # minor
-
-        def chord_from_chroma(vec: np.ndarray) -> str:
-            if np.allclose(vec, 0):
-                return "N"
-            v = vec / (np.linalg.norm(vec) + 1e-9)
-            best_score = 0.0
-            best_name = "N"
-            for name, tmpl in triads:
-                t = tmpl / (np.linalg.norm(tmpl) + 1e-9)
-                score = float(np.dot(v, t))
-                if score > best_score:
-                    best_score = score
-                    best_name = name
-            # 스코어가 너무 낮으면 코드 없음으로 처리
-            if best_score < 0.3:
-                return "N"
-            return best_name
-
-        for idx in range(n_frames):
-            start = idx * frame_samples
-            end = min(len(y), (idx + 1) * frame_samples)
-            frame = y[start:end]
-            if len(frame) == 0:
-                continue
-            c = librosa.feature.chroma_cqt(y=frame, sr=sr).mean(axis=1)
-            chord_label = chord_from_chroma(c)
-            time_sec = idx * self.frame_size_sec
-            chords.append(ChordEvent(time=time_sec, chord=chord_label))
+        pooled = pool_chroma_frames(
+            chroma,
+            sr=sr,
+            hop_length=CHROMA_HOP_LENGTH,
+            frame_size_sec=self.frame_size_sec,
+            n_frames=n_frames,
+        )
+        labels = chord_labels_from_scores(pooled, triad_scores(pooled), switch_penalty=self.switch_penalty)
+        chords: List[ChordEvent] = [
+            ChordEvent(time=idx * self.frame_size_sec, chord=label) for idx, label in enumerate(labels)
+        ]
 
         return ChordAnalysisResult(key=full_key, chords=chords)
 
+    def stream_guitar_track(self, wav_path: Path, *, block_sec: float = STREAM_BLOCK_SEC) -> ChordStream:
+        """
+        긴 WAV용: 일정 메모리로 블록을 읽으며 ChordEvent를 순차 반환한다(키는 끝난 뒤 `stream.key`).
+        응답을 스트리밍하기 전에 실패를 알 수 있도록 여기서 파일 헤더를 열어 본다(읽을 수 없으면 ValueError).
+        """
+        if not wav_path.exists():
+            raise FileNotFoundError(f"오디오 파일을 찾을 수 없습니다: {wav_path}")
+        try:
+            sf.info(str(wav_path))
+        except RuntimeError as e:
+            raise ValueError(f"오디오 파일을 읽을 수 없습니다: {wav_path} ({e})") from e
+        return ChordStream(
+            wav_path,
+            frame_size_sec=self.frame_size_sec,
+            block_sec=block_sec,
+            switch_penalty=self.switch_penalty,
+        )
@@ -1,17 +1,90 @@
 import asyncio
+import contextlib
+import functools
+import hashlib
 import json
+import os
+import tempfile
+from collections import OrderedDict
 from urllib.parse import urlparse
 from pathlib import Path
 from typing import Any
 
-from fastapi import FastAPI, File, HTTPException, UploadFile
+from fastapi import FastAPI, File, HTTPException, Request, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel, HttpUrl
 
-from .services.pipeline import _midi_to_alphatex, _midi_to_score, run_four_step_pipeline
+from .services.json_codec import JSON_MEDIA_TYPE, dumps_bytes, read_json, write_json
+from .services.pipeline import (
+    TAB_RENDER_MODE_ALLOWED,
+    _midi_to_alphatex,
+    _midi_to_alphatex_document,
+    _midi_to_score,
+    _preset_for_mode,
+    rerender_midi_tab,
+    run_four_step_pipeline,
+)
+from .services.score_columns import SCORE_COLUMNS_MEDIA_TYPE, encode_score_columns
+from .services.stage_metrics import PROMETHEUS_CONTENT_TYPE, render_prometheus_text
 
 app = FastAPI(title="AI Guitar Tab Backend")
 
+MIDI_UPLOAD_CHUNK_BYTES = 64 * 1024
+MIDI_UPLOAD_MAX_BYTES = int(os.environ.get("MIDI_UPLOAD_MAX_BYTES") or 8 * 1024 * 1024)
+# multipart 경계·파트 헤더 등 파일 본문 밖의 요청 바이트 여유
+MIDI_UPLOAD_FORM_OVERHEAD_BYTES = 64 * 1024
+_MIDI_UPLOAD_PATH = "/api/midi/tab-preview"
+_UPLOADS_DIR = Path("data") / "uploads"
+_SERVICES_DIR = Path(__file__).resolve().parent / "services"
+
+
+def _upload_too_large_detail() -> str:
+    return f"MIDI 파일이 너무 큽니다(최대 {MIDI_UPLOAD_MAX_BYTES // 1024} KiB)."
+
+
+class _MidiUploadSizeLimit:
+    """
+    MIDI 업로드 요청 본문 크기 제한(ASGI 미들웨어).
+    FastAPI는 핸들러 전에 multipart 본문을 통째로 받아 임시 파일에 쓰므로, 그 전에 Content-Length로 413을 내고
+    Content-Length가 없는(chunked) 요청은 받는 도중 한도를 넘는 순간 읽기를 멈추고 413을 낸다.
+    """
+
+    def __init__(self, app: Any) -> None:
+        self.app = app
+
+    async def __call__(self, scope: dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] != _MIDI_UPLOAD_PATH:
+            await self.app(scope, receive, send)
+            return
+        limit = MIDI_UPLOAD_MAX_BYTES + MIDI_UPLOAD_FORM_OVERHEAD_BYTES
+        headers = dict(scope.get("headers") or [])
+        try:
+            declared = int(headers.get(b"content-length", b"-1"))
+        except ValueError:
+            declared = -1
+        if declared > limit:
+            await JSONResponse({"detail": _upload_too_large_detail()}, status_code=413)(scope, receive, send)
+            return
+        received = 0
+
+        async def limited_receive() -> dict[str, Any]:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # FastAPI는 본문 읽기 중 난 HTTPException을 그대로 응답으로 낸다.
+                    raise HTTPException(status_code=413, detail=_upload_too_large_detail())
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+# CORS보다 먼저 등록해(안쪽 미들웨어) 413 응답에도 CORS 헤더가 붙게 한다.
+app.add_middleware(_MidiUploadSizeLimit)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=[
@@ -25,12 +98,20 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
 
+# 이 크기(bytes) 이상 응답만 gzip(Accept-Encoding에 gzip이 있을 때). 0이면 끔.
+API_GZIP_MIN_BYTES = int(os.environ.get("API_GZIP_MIN_BYTES") or 1024)
+API_GZIP_LEVEL = 6
+if API_GZIP_MIN_BYTES > 0:
+    app.add_middleware(GZipMiddleware, minimum_size=API_GZIP_MIN_BYTES, compresslevel=API_GZIP_LEVEL)
+
 
 class PipelineRequest(BaseModel):
     url: HttpUrl
     jobId: str | None = None
+    profileRender: bool = False
 
 
 def _is_supported_youtube_url(raw_url: str) -> bool:
@@ -53,6 +134,21 @@ class MidiTabPreviewResponse(BaseModel):
     score: dict[str, Any]
     alphatex: str
     tab_quality: dict[str, Any] | None = None
+    sha: str | None = None
+
+
+class MidiTabRerenderRequest(BaseModel):
+    capo: int = 0
+    mode: str = "transcription"
+    title: str | None = None
+
+
+class MidiTabRerenderResponse(BaseModel):
+    title: str
+    capo: int
+    mode: str
+    score: dict[str, Any]
+    alphatex: str
 
 
 class PipelineProgressResponse(BaseModel):
@@ -64,6 +160,60 @@ class PipelineProgressResponse(BaseModel):
 
 
 _PIPELINE_PROGRESS: dict[str, dict[str, Any]] = {}
+# 완료된 유튜브 작업 jobId → 작업 디렉터리(결과 재조회용). 최근 PIPELINE_RESULTS_MAX_ENTRIES개만 남긴다.
+PIPELINE_RESULTS_MAX_ENTRIES = 256
+_PIPELINE_RESULTS: OrderedDict[str, Path] = OrderedDict()
+
+
+def _remember_pipeline_result(job_id: str, job_dir: Path) -> None:
+    _PIPELINE_RESULTS[job_id] = job_dir
+    _PIPELINE_RESULTS.move_to_end(job_id)
+    while len(_PIPELINE_RESULTS) > PIPELINE_RESULTS_MAX_ENTRIES:
+        _PIPELINE_RESULTS.popitem(last=False)
+
+
+class _RenderLock:
+    """해시별 렌더 잠금과 그 잠금을 기다리거나 쥔 요청 수(0이 되면 사전에서 뺀다)."""
+
+    def __init__(self) -> None:
+        self.lock = asyncio.Lock()
+        self.users = 0
+
+
+# 동일 내용(sha256) 업로드가 동시에 들어오면 렌더를 한 번만 수행하도록 해시별 잠금
+_MIDI_RENDER_LOCKS: dict[str, _RenderLock] = {}
+
+
+@contextlib.asynccontextmanager
+async def _midi_render_lock(sha: str):
+    entry = _MIDI_RENDER_LOCKS.get(sha)
+    if entry is None:
+        entry = _MIDI_RENDER_LOCKS[sha] = _RenderLock()
+    entry.users += 1
+    try:
+        async with entry.lock:
+            yield
+    finally:
+        entry.users -= 1
+        if entry.users == 0 and _MIDI_RENDER_LOCKS.get(sha) is entry:
+            del _MIDI_RENDER_LOCKS[sha]
+
+
+@functools.cache
+def _render_code_version() -> str:
+    """렌더 결과를 만드는 서비스 코드의 내용 해시. 코드가 바뀌면 미리보기 캐시 키도 바뀐다."""
+    digest = hashlib.sha256()
+    for path in sorted(_SERVICES_DIR.glob("*.py")):
+        digest.update(path.name.encode("utf-8"))
+        digest.update(path.read_bytes())
+    return digest.hexdigest()[:16]
+
+
+def _render_fingerprint(*parts: Any) -> str:
+    """렌더 입력(parts) + `TAB_*` 환경 설정 + 코드 버전 → 캐시 키용 짧은 해시."""
+    env = sorted((k, v) for k, v in os.environ.items() if k.startswith("TAB_"))
+    raw = json.dumps([_render_code_version(), env, [str(p) for p in parts]], ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
 
 
 def _sanitize_upload_filename(filename: str) -> str:
@@ -75,13 +225,131 @@ def _sanitize_upload_filename(filename: str) -> str:
     return safe
 
 
+async def _stream_upload_to_hashed_path(file: UploadFile, uploads_dir: Path) -> tuple[Path, str]:
+    """
+    업로드를 청크 단위로 임시 파일에 쓰면서 sha256을 계산하고, `<sha256>.mid`로 원자적 이동한다.
+    전체를 메모리에 올리지 않으며 MIDI_UPLOAD_MAX_BYTES 초과 시 413(요청 단위 한도는 `_MidiUploadSizeLimit`).
+    """
+    uploads_dir.mkdir(parents=True, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    fd, tmp_name = tempfile.mkstemp(prefix="upload-", suffix=".part", dir=str(uploads_dir))
+    tmp_path = Path(tmp_name)
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            while True:
+                chunk = await file.read(MIDI_UPLOAD_CHUNK_BYTES)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > MIDI_UPLOAD_MAX_BYTES:
+                    raise HTTPException(status_code=413, detail=_upload_too_large_detail())
+                digest.update(chunk)
+                fh.write(chunk)
+        if size == 0:
+            raise HTTPException(status_code=400, detail="업로드한 MIDI 파일이 비어 있습니다.")
+        sha = digest.hexdigest()
+        midi_path = uploads_dir / f"{sha}.mid"
+        if midi_path.is_file():
+            tmp_path.unlink(missing_ok=True)
+        else:
+            os.replace(tmp_path, midi_path)
+        return midi_path, sha
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+
+def _render_midi_tab_preview(
+    midi_path: Path, title: str, tab_q_dir: Path, *, profile: bool
+) -> dict[str, Any]:
+    """
+    업로드 MIDI → score/alphaTex/품질 리포트. 동일 해시·제목·렌더 설정(`TAB_*`)·코드 버전이면
+    `preview-*.json` 캐시를 재사용한다.
+    """
+    cache_path = tab_q_dir / f"preview-{_render_fingerprint('preview', title)}.json"
+    if not profile and cache_path.is_file():
+        try:
+            return read_json(cache_path)
+        except (OSError, ValueError):
+            pass
+    tab_q_dir.mkdir(parents=True, exist_ok=True)
+    score = _midi_to_score(midi_path, title=title, capo=0)
+    compare_report: dict[str, Any] = {}
+    alphatex = _midi_to_alphatex(
+        midi_path,
+        title=title,
+        capo=0,
+        tab_output_dir=tab_q_dir,
+        compare_report_out=compare_report,
+        profile=True if profile else None,
+    )
+    tab_quality: dict[str, Any] | None = None
+    if compare_report:
+        write_json(tab_q_dir / "compare_report.json", compare_report)
+        tab_quality = compare_report
+    payload = {"title": title, "score": score, "alphatex": alphatex, "tab_quality": tab_quality}
+    tmp_cache = cache_path.with_suffix(".json.part")
+    write_json(tmp_cache, payload, pretty=False)
+    os.replace(tmp_cache, cache_path)
+    return payload
+
+
+def _json_response(payload: dict[str, Any], request: Request | None = None) -> Response:
+    """
+    score가 든 큰 응답은 pydantic 모델 재검증·재인코딩 없이 미리 인코딩한 bytes로 넘긴다.
+    엔드포인트의 response_model은 스키마(OpenAPI) 문서용으로만 남는다. request를 주면 ETag 조건부 응답.
+    """
+    content = dumps_bytes(payload)
+    if request is not None:
+        return _conditional_response(request, content, JSON_MEDIA_TYPE)
+    return Response(content=content, media_type=JSON_MEDIA_TYPE)
+
+
+def _content_etag(content: bytes) -> str:
+    # gzip 미들웨어가 본문을 바꿔도 같은 표현으로 보도록 약한(W/) 태그
+    return f'W/"{hashlib.sha256(content).hexdigest()[:32]}"'
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    raw = request.headers.get("if-none-match")
+    if not raw:
+        return False
+    tags = {t.strip().removeprefix("W/") for t in raw.split(",")}
+    return "*" in tags or etag.removeprefix("W/") in tags
+
+
+def _etag_headers(etag: str) -> dict[str, str]:
+    # no-cache: 브라우저가 저장은 하되 매번 ETag로 재검증(변경 없으면 304)
+    return {"ETag": etag, "Cache-Control": "no-cache"}
+
+
+def _render_etag(*parts: Any) -> str:
+    """렌더 입력(업로드 해시·capo·모드·제목)+설정·코드 버전으로 정한 ETag. 렌더 전에 정해지므로 304면 렌더를 건너뛴다."""
+    return f'W/"r{_render_fingerprint(*parts)}"'
+
+
+def _conditional_response(request: Request, content: bytes, media_type: str) -> Response:
+    """완성된 결과 본문에 내용 해시 ETag를 붙이고, If-None-Match가 같으면 본문 없이 304."""
+    etag = _content_etag(content)
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers=_etag_headers(etag))
+    return Response(content=content, media_type=media_type, headers=_etag_headers(etag))
+
+
 @app.get("/health")
 async def health() -> dict:
     return {"status": "ok"}
 
 
+@app.get("/metrics")
+async def metrics() -> Response:
+    """파이프라인 단계별 누적 계측(Prometheus text format)."""
+    return Response(content=render_prometheus_text(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+
 @app.post("/api/youtube/tab-preview", response_model=YoutubeTabPreviewResponse)
-async def youtube_tab_preview(payload: PipelineRequest) -> YoutubeTabPreviewResponse:
+async def youtube_tab_preview(payload: PipelineRequest) -> Response:
     progress_id = (payload.jobId or "").strip() or f"job-{id(payload)}"
     try:
         if not _is_supported_youtube_url(str(payload.url)):
@@ -108,6 +376,7 @@ async def youtube_tab_preview(payload: PipelineRequest) -> YoutubeTabPreviewResp
                 run_four_step_pipeline,
                 str(payload.url),
                 progress_cb=_on_progress,
+                profile_render=True if payload.profileRender else None,
             ),
             timeout=1800.0,
         )
@@ -118,13 +387,16 @@ async def youtube_tab_preview(payload: PipelineRequest) -> YoutubeTabPreviewResp
             "done": True,
             "error": None,
         }
-        return YoutubeTabPreviewResponse(
-            title=result.title,
-            artist=result.artist,
-            lyrics=result.lyrics,
-            lyrics_source=result.lyrics_source,
-            score=result.score,
-            alphatex=result.alphatex,
+        _remember_pipeline_result(progress_id, result.job_dir)
+        return _json_response(
+            {
+                "title": result.title,
+                "artist": result.artist,
+                "lyrics": result.lyrics,
+                "lyrics_source": result.lyrics_source,
+                "score": result.score,
+                "alphatex": result.alphatex,
+            }
         )
     except TimeoutError as exc:
         _PIPELINE_PROGRESS[progress_id] = {
@@ -160,38 +432,135 @@ async def youtube_tab_preview_progress(job_id: str) -> PipelineProgressResponse:
     )
 
 
+def _load_youtube_job_result(job_dir: Path) -> bytes:
+    meta = read_json(job_dir / "meta.json")
+    payload = {
+        "title": meta.get("title"),
+        "artist": meta.get("artist"),
+        "lyrics": meta.get("lyrics"),
+        "lyrics_source": meta.get("lyrics_source"),
+        "score": read_json(job_dir / "tab" / "score.json"),
+        "alphatex": (job_dir / "tab" / "guitar.alphatex").read_text(encoding="utf-8"),
+    }
+    return dumps_bytes(payload)
+
+
+@app.get("/api/youtube/tab-preview/result/{job_id}", response_model=YoutubeTabPreviewResponse)
+async def youtube_tab_preview_result(job_id: str, request: Request) -> Response:
+    """완료된 작업 결과 재조회(POST 응답과 같은 본문). 내용 해시 ETag로 다시 불러올 때 304."""
+    job_dir = _PIPELINE_RESULTS.get(job_id)
+    if job_dir is None:
+        raise HTTPException(status_code=404, detail="완료된 작업을 찾을 수 없습니다.")
+    try:
+        content = await asyncio.to_thread(_load_youtube_job_result, job_dir)
+    except (OSError, ValueError) as exc:
+        raise HTTPException(status_code=404, detail="작업 결과 파일을 읽을 수 없습니다.") from exc
+    return _conditional_response(request, content, JSON_MEDIA_TYPE)
+
+
 @app.post("/api/midi/tab-preview", response_model=MidiTabPreviewResponse)
-async def midi_tab_preview(file: UploadFile = File(...)) -> MidiTabPreviewResponse:
+async def midi_tab_preview(
+    file: UploadFile = File(...),
+    profile: bool = False,
+) -> Response:
     try:
         filename = _sanitize_upload_filename(file.filename or "uploaded.mid")
         lower_name = filename.lower()
         if not (lower_name.endswith(".mid") or lower_name.endswith(".midi")):
             raise HTTPException(status_code=400, detail="MIDI 파일(.mid, .midi)만 지원합니다.")
 
-        data = await file.read()
-        if not data:
-            raise HTTPException(status_code=400, detail="업로드한 MIDI 파일이 비어 있습니다.")
-
-        uploads_dir = Path("data") / "uploads"
-        uploads_dir.mkdir(parents=True, exist_ok=True)
-        midi_path = uploads_dir / filename
-        midi_path.write_bytes(data)
+        midi_path, sha = await _stream_upload_to_hashed_path(file, _UPLOADS_DIR)
 
         title = Path(filename).stem or "Uploaded MIDI"
-        tab_q_dir = uploads_dir / "tab_preview" / Path(filename).stem
-        tab_q_dir.mkdir(parents=True, exist_ok=True)
-        score = _midi_to_score(midi_path, title=title, capo=0)
-        alphatex = _midi_to_alphatex(
-            midi_path, title=title, capo=0, tab_output_dir=tab_q_dir
-        )
-        quality_path = tab_q_dir / "compare_report.json"
-        tab_quality: dict[str, Any] | None = None
-        if quality_path.is_file():
-            tab_quality = json.loads(quality_path.read_text(encoding="utf-8"))
-        return MidiTabPreviewResponse(
-            title=title, score=score, alphatex=alphatex, tab_quality=tab_quality
-        )
+        tab_q_dir = _UPLOADS_DIR / "tab_preview" / sha
+        async with _midi_render_lock(sha):
+            result = await asyncio.to_thread(
+                _render_midi_tab_preview, midi_path, title, tab_q_dir, profile=profile
+            )
+        return _json_response({**result, "sha": sha})
     except HTTPException:
         raise
     except Exception as exc:
         raise HTTPException(status_code=500, detail=str(exc)) from exc
+
+
+def _uploaded_midi_for_rerender(sha: str, capo: int, mode: str) -> Path:
+    """재렌더 요청 검증: sha256 형식·모드·capo 범위, 업로드 MIDI 존재(없으면 404)."""
+    if len(sha) != 64 or any(ch not in "0123456789abcdef" for ch in sha):
+        raise HTTPException(status_code=400, detail="잘못된 MIDI 해시입니다.")
+    if mode not in TAB_RENDER_MODE_ALLOWED:
+        raise HTTPException(status_code=400, detail=f"지원하지 않는 렌더 모드: {mode}")
+    if not 0 <= capo <= 5:
+        raise HTTPException(status_code=400, detail="capo는 0~5만 지원합니다.")
+    midi_path = _UPLOADS_DIR / f"{sha}.mid"
+    if not midi_path.is_file():
+        raise HTTPException(status_code=404, detail="업로드한 MIDI를 찾을 수 없습니다. 다시 업로드해 주세요.")
+    return midi_path
+
+
+@app.post("/api/midi/tab-preview/{sha}/rerender", response_model=MidiTabRerenderResponse)
+async def midi_tab_rerender(sha: str, body: MidiTabRerenderRequest) -> Response:
+    """
+    업로드한 MIDI를 capo/모드만 바꿔 다시 렌더(인터랙티브 capo 선택용).
+    파싱·격자 슬롯은 파이프라인 메모리 캐시를 재사용하므로 운지·alphaTex 출력만 다시 돈다.
+    """
+    midi_path = _uploaded_midi_for_rerender(sha, body.capo, body.mode)
+    try:
+        result = await asyncio.to_thread(
+            rerender_midi_tab,
+            midi_path,
+            title=body.title or "Uploaded MIDI",
+            capo=body.capo,
+            mode=body.mode,
+        )
+        return _json_response(result)
+    except Exception as exc:
+        raise HTTPException(status_code=500, detail=str(exc)) from exc
+
+
+@app.get("/api/midi/tab-preview/{sha}/alphatex")
+async def midi_tab_alphatex(
+    sha: str,
+    request: Request,
+    capo: int = 0,
+    mode: str = "transcription",
+    title: str = "Uploaded MIDI",
+) -> Response:
+    """
+    업로드한 MIDI의 alphaTex를 text/plain으로 스트리밍(헤더 → 마디 → \\sync 조각 순).
+    ETag는 (sha, capo, mode, title, 설정·코드 버전)으로 정해 If-None-Match가 같으면 렌더 없이 304.
+    """
+    midi_path = _uploaded_midi_for_rerender(sha, capo, mode)
+    etag = _render_etag("alphatex", sha, capo, mode, title)
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers=_etag_headers(etag))
+    try:
+        doc = await asyncio.to_thread(
+            _midi_to_alphatex_document,
+            midi_path,
+            title,
+            capo=capo,
+            preset=_preset_for_mode(mode),
+        )
+    except Exception as exc:
+        raise HTTPException(status_code=500, detail=str(exc)) from exc
+    return StreamingResponse(
+        doc.iter_chunks(), media_type="text/plain; charset=utf-8", headers=_etag_headers(etag)
+    )
+
+
+@app.get("/api/midi/tab-preview/{sha}/score.bin")
+async def midi_tab_score_columns(
+    sha: str, request: Request, capo: int = 0, title: str = "Uploaded MIDI"
+) -> Response:
+    """업로드한 MIDI의 score를 열 기반 바이너리(`score_columns` 형식)로. JSON score와 같은 내용. ETag는 /alphatex와 같은 방식."""
+    midi_path = _uploaded_midi_for_rerender(sha, capo, "transcription")
+    etag = _render_etag("score.bin", sha, capo, title)
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers=_etag_headers(etag))
+    try:
+        score = await asyncio.to_thread(_midi_to_score, midi_path, title=title, capo=capo)
+        payload = await asyncio.to_thread(encode_score_columns, score)
+    except Exception as exc:
+        raise HTTPException(status_code=500, detail=str(exc)) from exc
+    return Response(content=payload, media_type=SCORE_COLUMNS_MEDIA_TYPE, headers=_etag_headers(etag))
@@ -0,0 +1,454 @@
+"""
+alphaTex 구조 검증(순수 Python).
+
+`_validate_alphatex_with_alphatab`(node + alphaTab 파서)의 토큰 가드와 AST 품질 게이트를 같은 규칙으로 흉내 낸다.
+- 토큰 가드: `{}`·`()` 짝, `:` 뒤 숫자, 태그(`\\...`) 존재
+- AST 게이트: 다음 마디 전 `|` 누락, 숫자 음의 `fret.string` 형태(오류)
+  / durationChange 없는 박, 괄호 없는 동시음·괄호 친 단일음(경고)
+결과 dict 스키마는 node 검증과 같고 `validator: "python"`이 붙는다. alphaTab 진단 코드(AT…)는 흉내 내지 않으므로
+렉서가 못 읽는 문자·닫히지 않은 문자열은 `code: None` 오류로 낸다.
+
+`check_alphatex_chunks`는 문서를 조각(`AlphaTexDocument.iter_chunks`) 단위로 받아 토큰·마디를 흘려 보내며 검사한다.
+조각 경계에 걸친 토큰은 다음 조각으로 넘겨 이어 읽고, 괄호 짝·마디 상태는 조각을 넘어 이어지므로
+전체 문자열이나 전체 토큰 목록을 만들지 않는다. 결과는 같은 문서를 한 문자열로 검사한 것과 같다.
+"""
+
+from __future__ import annotations
+
+import re
+from collections import deque
+from typing import Any, Callable, Iterable, Iterator
+
+_TOKEN_RE = re.compile(
+    r"""
+    (?P<ws>\s+)
+    |(?P<comment>//[^\n]*|/\*.*?\*/)
+    |(?P<string>"(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')
+    |(?P<tag>\\[A-Za-z_][\w-]*)
+    |(?P<number>-?\d+)
+    |(?P<ident>[A-Za-z_#][\w#]*)
+    |(?P<punct>[|{}():.*])
+    |(?P<bad>.)
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+
+# 토큰 종류(alphaTab AlphaTexNodeType 이름을 따름)
+TAG = "Tag"
+STRING = "String"
+NUMBER = "Number"
+IDENT = "Ident"
+PIPE = "Pipe"
+LBRACE = "LBrace"
+RBRACE = "RBrace"
+LPAREN = "LParen"
+RPAREN = "RParen"
+COLON = "Colon"
+DOT = "Dot"
+ASTERISK = "Asterisk"
+
+_PUNCT_TYPES = {
+    "|": PIPE,
+    "{": LBRACE,
+    "}": RBRACE,
+    "(": LPAREN,
+    ")": RPAREN,
+    ":": COLON,
+    ".": DOT,
+    "*": ASTERISK,
+}
+_CLOSING = {LBRACE: RBRACE, LPAREN: RPAREN}
+
+Token = tuple[str, str, int, int]
+
+
+_CARRY_CHARS = frozenset("\"'/")
+
+
+def _iter_tokens(chunks: Iterable[str], errors: list[dict[str, Any]]) -> Iterator[Token]:
+    """
+    조각들을 이어 읽는 토크나이저. 조각 끝에 닿은 토큰과, 닫는 짝이 다음 조각에 있을 수 있는
+    문자열·블록 주석 시작(`"`·`'`·`/`가 단독으로 읽힌 경우) 이후는 다음 조각 앞에 붙여 다시 읽는다.
+    """
+    carry = ""
+    offset = 0
+    it = iter(chunks)
+    pending = next(it, None)
+    while pending is not None:
+        following = next(it, None)
+        final = following is None
+        buf = carry + pending
+        stop = len(buf)
+        matches: list[re.Match[str]] = []
+        for m in _TOKEN_RE.finditer(buf):
+            if not final and (
+                m.end() == len(buf) or (m.lastgroup == "bad" and m.group() in _CARRY_CHARS)
+            ):
+                stop = m.start()
+                break
+            matches.append(m)
+        for m in matches:
+            kind = m.lastgroup
+            if kind == "ws" or kind == "comment":
+                continue
+            text = m.group()
+            start, end = offset + m.start(), offset + m.end()
+            if kind == "bad":
+                errors.append(
+                    {
+                        "code": None,
+                        "message": f"Unexpected character {text!r}.",
+                        "severity": 2,
+                        "start": start,
+                        "end": end,
+                    }
+                )
+                continue
+            if kind == "punct":
+                yield (_PUNCT_TYPES[text], text, start, end)
+            else:
+                yield (kind.capitalize(), text, start, end)
+        carry = buf[stop:]
+        offset += stop
+        pending = following
+
+
+def tokenize_alphatex(source: str) -> tuple[list[Token], list[dict[str, Any]]]:
+    """(종류, 원문, start, end) 토큰 목록과 렉서 오류."""
+    errors: list[dict[str, Any]] = []
+    tokens = list(_iter_tokens([source], errors))
+    return tokens, errors
+
+
+class _TokenGuard:
+    """토큰이 지나가는 대로 `{}`·`()` 개수, `:` 뒤 숫자, 태그 존재를 센다."""
+
+    def __init__(self) -> None:
+        self.counts = {LBRACE: 0, RBRACE: 0, LPAREN: 0, RPAREN: 0}
+        self.has_tag = False
+        self.has_ident = False
+        self.colon_ok = True
+        self._prev_kind: str | None = None
+
+    def feed(self, tokens: Iterator[Token]) -> Iterator[Token]:
+        for tok in tokens:
+            kind = tok[0]
+            if self._prev_kind == COLON and kind != NUMBER:
+                self.colon_ok = False
+            if kind in self.counts:
+                self.counts[kind] += 1
+            elif kind == TAG:
+                self.has_tag = True
+            elif kind == IDENT:
+                self.has_ident = True
+            self._prev_kind = kind
+            yield tok
+
+    def result(self) -> dict[str, Any]:
+        brace_ok = self.counts[LBRACE] == self.counts[RBRACE]
+        paren_ok = self.counts[LPAREN] == self.counts[RPAREN]
+        return {
+            "ok": brace_ok and paren_ok and self.colon_ok and self.has_tag,
+            "braceOk": brace_ok,
+            "parenOk": paren_ok,
+            "colonOk": self.colon_ok,
+            "hasTag": self.has_tag,
+            "hasIdent": self.has_ident,
+        }
+
+
+class _TokenStream:
+    """앞을 몇 토큰 미리 볼 수 있는 토큰 이터레이터. last_end = 마지막으로 소비한 토큰의 끝 위치."""
+
+    def __init__(self, tokens: Iterator[Token]) -> None:
+        self._it = tokens
+        self._ahead: deque[Token] = deque()
+        self.last_end = 0
+
+    def peek(self, k: int = 0) -> Token | None:
+        while len(self._ahead) <= k:
+            tok = next(self._it, None)
+            if tok is None:
+                return None
+            self._ahead.append(tok)
+        return self._ahead[k]
+
+    def kind(self, k: int = 0) -> str | None:
+        tok = self.peek(k)
+        return None if tok is None else tok[0]
+
+    def advance(self) -> Token:
+        tok = self._ahead.popleft() if self._ahead else next(self._it)
+        self.last_end = tok[3]
+        return tok
+
+
+def _skip_group(ts: _TokenStream) -> None:
+    """현재 토큰이 여는 괄호일 때 짝이 맞는 닫는 괄호까지 소비한다(닫히지 않으면 끝까지)."""
+    open_kind = ts.kind()
+    close_kind = _CLOSING[open_kind]
+    depth = 0
+    while (kind := ts.kind()) is not None:
+        ts.advance()
+        if kind == open_kind:
+            depth += 1
+        elif kind == close_kind:
+            depth -= 1
+            if depth == 0:
+                return
+
+
+def _skip_tag_arguments(ts: _TokenStream) -> None:
+    """태그 다음 인자: 괄호 묶음 하나 또는 문자열·숫자 나열, 그 뒤 `{ ... }` 속성 묶음(선택)."""
+    if ts.kind() == LPAREN:
+        _skip_group(ts)
+    else:
+        while True:
+            kind = ts.kind()
+            if kind == STRING:
+                ts.advance()
+            elif kind == NUMBER and ts.kind(1) != DOT:
+                ts.advance()
+            else:
+                break
+    if ts.kind() == LBRACE:
+        _skip_group(ts)
+
+
+def _read_note(ts: _TokenStream) -> dict[str, Any]:
+    """음 하나(`fret.string`, `x.string`, 문자열 음 등)와 음 효과 `{...}`."""
+    kind, _text, start, end = ts.advance()
+    note: dict[str, Any] = {"numeric": kind == NUMBER, "dot": False, "string": False, "start": start, "end": end}
+    if ts.kind() == DOT:
+        note["dot"] = True
+        note["end"] = ts.advance()[3]
+        if ts.kind() == NUMBER:
+            note["string"] = True
+            note["end"] = ts.advance()[3]
+    if ts.kind() == LBRACE:
+        _skip_group(ts)
+    return note
+
+
+def _parse_bars(
+    ts: _TokenStream, errors: list[dict[str, Any]], on_bar: Callable[[dict[str, Any]], None]
+) -> None:
+    """
+    alphaTab 파서처럼 마디 = (메타 태그들) + 박들 + `|`. 마디가 끝날 때마다 on_bar로 넘긴다.
+    박 뒤에 다시 태그가 나오면 `|` 없이 새 마디가 시작된 것으로 본다.
+    """
+    cur: dict[str, Any] = {"beats": [], "meta": 0, "pipe": False, "start": 0, "end": 0}
+
+    def finish(end: int) -> None:
+        nonlocal cur
+        cur["end"] = end
+        on_bar(cur)
+        cur = {"beats": [], "meta": 0, "pipe": False, "start": end, "end": end}
+
+    while (tok := ts.peek()) is not None:
+        kind, text, start, end = tok
+        if kind == TAG:
+            if cur["beats"]:
+                finish(start)
+            cur["meta"] += 1
+            ts.advance()
+            _skip_tag_arguments(ts)
+            continue
+        if kind == PIPE:
+            cur["pipe"] = True
+            ts.advance()
+            finish(end)
+            continue
+
+        beat: dict[str, Any] = {"duration": False, "rest": False, "notes": [], "grouped": False, "start": start}
+        if kind == COLON:
+            ts.advance()
+            if ts.kind() == NUMBER:
+                beat["duration"] = True
+                ts.advance()
+            tok = ts.peek()
+            if tok is None:
+                break
+            kind, text, start, end = tok
+            if kind in (TAG, PIPE):
+                # 박 없이 끝난 durationChange는 다음 박에 걸린다
+                continue
+        if kind == LPAREN:
+            beat["grouped"] = True
+            ts.advance()
+            while ts.kind() in (NUMBER, IDENT, STRING):
+                beat["notes"].append(_read_note(ts))
+            if ts.kind() == RPAREN:
+                ts.advance()
+            else:
+                nxt = ts.peek()
+                errors.append(
+                    {
+                        "code": None,
+                        "message": "Unterminated note list.",
+                        "severity": 2,
+                        "start": start,
+                        "end": nxt[3] if nxt is not None else ts.last_end,
+                    }
+                )
+        elif kind == IDENT and text == "r" and ts.kind(1) != DOT:
+            beat["rest"] = True
+            ts.advance()
+        elif kind in (NUMBER, IDENT, STRING):
+            beat["notes"].append(_read_note(ts))
+        else:
+            errors.append(
+                {
+                    "code": None,
+                    "message": f"Unexpected token {text!r} where a beat was expected.",
+                    "severity": 2,
+                    "start": start,
+                    "end": end,
+                }
+            )
+            if kind in _CLOSING:
+                _skip_group(ts)
+            else:
+                ts.advance()
+            continue
+        if ts.kind() == ASTERISK and ts.kind(1) == NUMBER:
+            ts.advance()
+            ts.advance()
+        if ts.kind() == LBRACE:
+            _skip_group(ts)
+        beat["end"] = ts.last_end
+        cur["beats"].append(beat)
+    if cur["beats"] or cur["meta"]:
+        finish(ts.last_end)
+
+
+def _bar_gates(
+    bar_index: int,
+    bar: dict[str, Any],
+    has_next: bool,
+    issues: list[dict[str, Any]],
+    warnings: list[dict[str, Any]],
+) -> None:
+    """마디 하나의 AST 게이트. `|` 누락은 뒤에 마디가 더 있을 때만(has_next) 본다."""
+    if has_next and not bar["pipe"]:
+        issues.append(
+            {
+                "kind": "MissingPipeTokenNode",
+                "barIndex": bar_index,
+                "message": f"Bar {bar_index + 1} is missing a pipe token before next bar.",
+                "start": bar["start"],
+                "end": bar["end"],
+            }
+        )
+    for beat_index, beat in enumerate(bar["beats"]):
+        notes = beat["notes"]
+        if (notes or beat["rest"]) and not beat["duration"]:
+            warnings.append(
+                {
+                    "kind": "MissingDurationChange",
+                    "barIndex": bar_index,
+                    "beatIndex": beat_index,
+                    "message": f"Beat {beat_index + 1} in bar {bar_index + 1} has no durationChange.",
+                    "start": beat["start"],
+                    "end": beat["end"],
+                }
+            )
+        if len(notes) > 1 and not beat["grouped"]:
+            warnings.append(
+                {
+                    "kind": "MissingNoteListParenthesis",
+                    "barIndex": bar_index,
+                    "beatIndex": beat_index,
+                    "message": (
+                        f"Beat {beat_index + 1} in bar {bar_index + 1} has multiple notes "
+                        "without parenthesis grouping."
+                    ),
+                    "start": beat["start"],
+                    "end": beat["end"],
+                }
+            )
+        if len(notes) <= 1 and beat["grouped"]:
+            warnings.append(
+                {
+                    "kind": "OverGroupedSingleNote",
+                    "barIndex": bar_index,
+                    "beatIndex": beat_index,
+                    "message": (
+                        f"Beat {beat_index + 1} in bar {bar_index + 1} has a single note "
+                        "with unnecessary parenthesis."
+                    ),
+                    "start": beat["start"],
+                    "end": beat["end"],
+                }
+            )
+        for note_index, note in enumerate(notes):
+            if not note["numeric"]:
+                continue
+            if note["dot"] != note["string"]:
+                issues.append(
+                    {
+                        "kind": "NoteStringDotMismatch",
+                        "barIndex": bar_index,
+                        "beatIndex": beat_index,
+                        "noteIndex": note_index,
+                        "message": (
+                            f"Note {note_index + 1} in beat {beat_index + 1} has inconsistent "
+                            "noteStringDot/noteString."
+                        ),
+                        "start": note["start"],
+                        "end": note["end"],
+                    }
+                )
+            if not note["string"]:
+                issues.append(
+                    {
+                        "kind": "NonFrettedNumericNote",
+                        "barIndex": bar_index,
+                        "beatIndex": beat_index,
+                        "noteIndex": note_index,
+                        "message": "Numeric note without string index. Expected fret.string syntax for guitar tabs.",
+                        "start": note["start"],
+                        "end": note["end"],
+                    }
+                )
+
+
+def check_alphatex_chunks(chunks: Iterable[str]) -> dict[str, Any]:
+    """alphaTex 조각들 → node 검증과 같은 모양의 진단 dict(조각을 이어 붙인 문서를 검사한 것과 같다)."""
+    lex_errors: list[dict[str, Any]] = []
+    parse_errors: list[dict[str, Any]] = []
+    ast_issues: list[dict[str, Any]] = []
+    ast_warnings: list[dict[str, Any]] = []
+    guard = _TokenGuard()
+    # `|` 누락 판정에 다음 마디가 있는지가 필요해 직전 마디 하나만 들고 있다가 게이트를 돌린다.
+    pending: list[dict[str, Any]] = []
+    bar_count = 0
+
+    def on_bar(bar: dict[str, Any]) -> None:
+        nonlocal bar_count
+        if pending:
+            _bar_gates(bar_count - 1, pending.pop(), True, ast_issues, ast_warnings)
+        pending.append(bar)
+        bar_count += 1
+
+    ts = _TokenStream(guard.feed(_iter_tokens(chunks, lex_errors)))
+    _parse_bars(ts, parse_errors, on_bar)
+    while ts.peek() is not None:
+        ts.advance()
+    if pending:
+        _bar_gates(bar_count - 1, pending.pop(), False, ast_issues, ast_warnings)
+    errors = lex_errors + parse_errors
+    return {
+        "validator": "python",
+        "tokenGuard": guard.result(),
+        "hasErrors": bool(errors) or bool(ast_issues),
+        "errors": errors,
+        "warnings": [],
+        "astIssues": ast_issues,
+        "astWarnings": ast_warnings,
+    }
+
+
+def check_alphatex_structure(source: str) -> dict[str, Any]:
+    """alphaTex 문자열 → node 검증과 같은 모양의 진단 dict."""
+    return check_alphatex_chunks([source])
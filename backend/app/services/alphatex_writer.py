@@ -0,0 +1,43 @@
+"""
+alphaTex 문서 조립·출력.
+
+헤더, 마디 줄, `\\sync` 줄을 따로 들고 있다가 조각 단위로 내보낸다. 본문을 join한 뒤 헤더·sync와 다시
+이어 붙이는 대신 파일·`io.StringIO`·HTTP 스트리밍 응답에 바로 쓰고, 전체 문자열은 필요할 때 한 번만 만든다.
+"""
+
+from __future__ import annotations
+
+import functools
+from dataclasses import dataclass
+from typing import Iterator, TextIO
+
+# 스트리밍 시 한 조각에 묶는 줄 수
+ALPHATEX_CHUNK_LINES = 64
+
+
+@dataclass
+class AlphaTexDocument:
+    header: str
+    bars: list[str]
+    sync_lines: list[str]
+    empty_body: str
+
+    def iter_chunks(self, lines_per_chunk: int = ALPHATEX_CHUNK_LINES) -> Iterator[str]:
+        """헤더 → 마디 줄 → `\\sync` 줄 순서로 조각을 낸다. 이어 붙이면 `text`와 같다."""
+        n = max(1, int(lines_per_chunk))
+        yield self.header
+        if not self.bars:
+            yield self.empty_body
+        for i in range(0, len(self.bars), n):
+            piece = "\n".join(self.bars[i : i + n])
+            yield piece if i == 0 else "\n" + piece
+        for i in range(0, len(self.sync_lines), n):
+            yield "\n" + "\n".join(self.sync_lines[i : i + n])
+
+    def write_to(self, fh: TextIO) -> None:
+        for chunk in self.iter_chunks():
+            fh.write(chunk)
+
+    @functools.cached_property
+    def text(self) -> str:
+        return "".join(self.iter_chunks())
@@ -1,42 +1,299 @@
 """
-기타 스템 onset 추출 및 MIDI 템포 그리드 스냅(8분/16분 등).
+기타 스템 onset 추출, 박(beat)·강박(downbeat) 추적, MIDI 템포 그리드 스냅(8분/16분 등).
+onset 세기 곡선(22.05kHz, hop 512)은 선택된 스템에 대해 한 번만 계산해 `.npz`로 캐시하고,
+onset 게이트·박 추적이 각자의 peak picking만 따로 한다.
 """
 
 from __future__ import annotations
 
+import copy
+import hashlib
+import json
+from dataclasses import dataclass
 from pathlib import Path
 from typing import Any
 
 import numpy as np
 import pretty_midi
 
+BEAT_TRACK_SR = 22050
+BEAT_TRACK_HOP = 512
+# 박 추적 캐시 형식이 바뀌면 올린다(캐시 키에 포함).
+BEAT_CACHE_VERSION = 1
+ONSET_ENVELOPE_MAX_SEC = 600.0
 
-def snap_midi_notes_to_tempo_grid(
-    midi: pretty_midi.PrettyMIDI,
+
+@dataclass(frozen=True)
+class OnsetEnvelope:
+    """스템 하나의 onset 세기 곡선(librosa `onset_strength`, 프레임 i = i·hop_length/sr 초)."""
+
+    env: np.ndarray
+    sr: int
+    hop_length: int
+    duration_sec: float
+
+
+def compute_onset_envelope(y: np.ndarray, sr: int, *, hop_length: int = BEAT_TRACK_HOP) -> OnsetEnvelope:
+    import librosa
+
+    env = librosa.onset.onset_strength(y=y, sr=sr, hop_length=hop_length)
+    return OnsetEnvelope(
+        env=np.asarray(env, dtype=np.float32),
+        sr=int(sr),
+        hop_length=int(hop_length),
+        duration_sec=float(len(y) / max(1, sr)),
+    )
+
+
+def load_onset_envelope(
+    audio_path: Path,
+    *,
+    cache_path: Path | None = None,
+    max_duration_sec: float = ONSET_ENVELOPE_MAX_SEC,
+) -> OnsetEnvelope | None:
+    """
+    오디오 → onset 세기 곡선. cache_path(.npz)가 있으면 읽어 쓰고, 없으면 계산해 저장한다.
+    디코딩·계산에 실패하면 None(호출 쪽이 직접 계산하는 예전 경로로 간다).
+    """
+    if cache_path is not None and cache_path.is_file():
+        try:
+            with np.load(cache_path) as data:
+                if int(data["sr"]) == BEAT_TRACK_SR and int(data["hop_length"]) == BEAT_TRACK_HOP:
+                    return OnsetEnvelope(
+                        env=np.asarray(data["env"], dtype=np.float32),
+                        sr=int(data["sr"]),
+                        hop_length=int(data["hop_length"]),
+                        duration_sec=float(data["duration_sec"]),
+                    )
+        except (OSError, KeyError, ValueError):
+            pass
+    path = Path(audio_path)
+    if not path.is_file():
+        return None
+    try:
+        import librosa
+
+        y, sr = librosa.load(str(path), sr=BEAT_TRACK_SR, mono=True, duration=max_duration_sec)
+        envelope = compute_onset_envelope(y, int(sr))
+    except Exception:
+        return None
+    if cache_path is not None:
+        try:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            with cache_path.open("wb") as fh:
+                np.savez(
+                    fh,
+                    env=envelope.env,
+                    sr=envelope.sr,
+                    hop_length=envelope.hop_length,
+                    duration_sec=envelope.duration_sec,
+                )
+        except OSError:
+            pass
+    return envelope
+
+
+def beat_grid_bpm(beat_times_sec: list[float] | np.ndarray) -> float | None:
+    """
+    박 시각에 직선(박 번호 → 시각)을 맞춘 기울기 → BPM(20~300). 박이 2개 미만이면 None.
+    간격 중앙값은 hop 단위로 양자화돼(22.05kHz/512 ≈ 23ms) 템포가 1~2 BPM 어긋나므로 전체 기울기를 쓴다.
+    """
+    beats = np.asarray(beat_times_sec, dtype=np.float64)
+    if beats.size < 2:
+        return None
+    slope = float(np.polyfit(np.arange(beats.size, dtype=np.float64), beats, 1)[0])
+    if not np.isfinite(slope) or slope <= 1e-6:
+        return None
+    return max(20.0, min(300.0, 60.0 / slope))
+
+
+def _beat_grid_frame(
+    bpm: float,
+    beat_times_sec: list[float] | np.ndarray,
+    subdivisions_per_quarter: int,
+    first_downbeat: int | None = None,
+    beats_per_bar: int = 4,
+) -> tuple[np.ndarray, np.ndarray, float, int]:
+    """
+    (박 시각, 박의 격자 칸 번호, 격자 간격, k0). `map_times_to_beat_grid`와 그 역사상이 같은 틀을 쓴다.
+    k0는 첫 박에 가장 가까운 칸에서 출발하고, first_downbeat(강박인 박 인덱스)를 주면 그 박이 마디 경계
+    (spq·beats_per_bar의 배수 칸)에 오도록 한 마디 안에서 뒤로 민다. 렌더 마디는 격자 0초에서 시작하므로
+    이렇게 해야 추적한 강박이 마디 첫 박이 된다.
+    """
+    beats = np.asarray(beat_times_sec, dtype=np.float64)
+    spq = max(1, int(subdivisions_per_quarter))
+    step = 60.0 / max(20.0, min(300.0, float(bpm))) / float(spq)
+    beat_index = np.arange(beats.size, dtype=np.float64) * spq
+    k0 = round(float(beats[0]) / step) if beats.size else 0
+    if first_downbeat is not None and 0 <= int(first_downbeat) < beats.size:
+        bar_cells = spq * max(1, int(beats_per_bar))
+        k0 += (-(k0 + int(first_downbeat) * spq)) % bar_cells
+    return beats, beat_index, step, k0
+
+
+def map_times_to_beat_grid(
+    times: np.ndarray,
+    bpm: float,
+    beat_times_sec: list[float] | np.ndarray,
+    subdivisions_per_quarter: int,
+    *,
+    first_downbeat: int | None = None,
+    beats_per_bar: int = 4,
+) -> np.ndarray:
+    """
+    오디오 시각 → 균일 템포(bpm) 격자 시각. 박 j는 (k0 + j·spq)번째 격자 칸에 놓이고(k0는 `_beat_grid_frame`:
+    첫 박 근처, 강박을 주면 그 박이 마디 경계에 오는 칸), 박 사이는 선형 보간, 첫 박 앞·마지막 박 뒤는
+    bpm 간격으로 외삽한다. 박이 2개 미만이면 그대로 반환.
+    """
+    times = np.asarray(times, dtype=np.float64)
+    if len(beat_times_sec) < 2:
+        return times
+    beats, beat_index, step, k0 = _beat_grid_frame(
+        bpm, beat_times_sec, subdivisions_per_quarter, first_downbeat, beats_per_bar
+    )
+    x = np.interp(times, beats, beat_index)
+    x = np.where(times < beats[0], (times - beats[0]) / step, x)
+    x = np.where(times > beats[-1], beat_index[-1] + (times - beats[-1]) / step, x)
+    return (k0 + x) * step
+
+
+def map_beat_grid_to_times(
+    grid_times: np.ndarray,
+    bpm: float,
+    beat_times_sec: list[float] | np.ndarray,
+    subdivisions_per_quarter: int,
+    *,
+    first_downbeat: int | None = None,
+    beats_per_bar: int = 4,
+) -> np.ndarray:
+    """`map_times_to_beat_grid`의 역사상(격자 시각 → 오디오 시각). 둘 다 구간별 선형이라 정확히 되돌린다."""
+    grid_times = np.asarray(grid_times, dtype=np.float64)
+    if len(beat_times_sec) < 2:
+        return grid_times
+    beats, beat_index, step, k0 = _beat_grid_frame(
+        bpm, beat_times_sec, subdivisions_per_quarter, first_downbeat, beats_per_bar
+    )
+    x = grid_times / step - k0
+    t = np.interp(x, beat_index, beats)
+    t = np.where(x < 0.0, beats[0] + x * step, t)
+    return np.where(x > beat_index[-1], beats[-1] + (x - beat_index[-1]) * step, t)
+
+
+@dataclass(frozen=True)
+class BeatGridWarp:
+    """
+    추적한 박 ↔ 균일 템포 격자(악보 시간축) 사상. 렌더는 격자 시각에서 하고, `\\sync`·score.json처럼
+    오디오와 맞춰야 하는 시각은 `to_audio`로 되돌린다. 박이 2개 미만이면 항등.
+    first_downbeat(첫 강박의 박 인덱스)를 주면 그 박이 격자 마디(beats_per_bar박) 경계에 온다.
+    """
+
+    bpm: float
+    beat_times_sec: tuple[float, ...]
+    subdivisions_per_quarter: int
+    first_downbeat: int | None = None
+    beats_per_bar: int = 4
+
+    @property
+    def is_identity(self) -> bool:
+        return len(self.beat_times_sec) < 2
+
+    def to_grid(self, times: list[float] | np.ndarray) -> np.ndarray:
+        return map_times_to_beat_grid(
+            times,
+            self.bpm,
+            self.beat_times_sec,
+            self.subdivisions_per_quarter,
+            first_downbeat=self.first_downbeat,
+            beats_per_bar=self.beats_per_bar,
+        )
+
+    def to_audio(self, grid_times: list[float] | np.ndarray) -> np.ndarray:
+        return map_beat_grid_to_times(
+            grid_times,
+            self.bpm,
+            self.beat_times_sec,
+            self.subdivisions_per_quarter,
+            first_downbeat=self.first_downbeat,
+            beats_per_bar=self.beats_per_bar,
+        )
+
+    def midi_to_grid(self, midi: pretty_midi.PrettyMIDI) -> pretty_midi.PrettyMIDI:
+        """노트 시각을 격자 시각으로 옮긴 사본(원본은 그대로). 템포는 격자 bpm 하나로 쓴다."""
+        out = pretty_midi.PrettyMIDI(initial_tempo=max(20.0, min(300.0, float(self.bpm))), resolution=midi.resolution)
+        out.time_signature_changes = copy.deepcopy(midi.time_signature_changes)
+        out.key_signature_changes = copy.deepcopy(midi.key_signature_changes)
+        for inst in midi.instruments:
+            new_inst = pretty_midi.Instrument(program=inst.program, is_drum=inst.is_drum, name=inst.name)
+            if inst.notes:
+                starts = self.to_grid([n.start for n in inst.notes]).tolist()
+                ends = self.to_grid([n.end for n in inst.notes]).tolist()
+                new_inst.notes = [
+                    pretty_midi.Note(velocity=n.velocity, pitch=n.pitch, start=s, end=max(e, s + 1e-3))
+                    for n, s, e in zip(inst.notes, starts, ends)
+                ]
+            out.instruments.append(new_inst)
+        return out
+
+
+def snap_note_times_to_tempo_grid(
+    starts: np.ndarray,
+    ends: np.ndarray,
     bpm: float,
     beat_times_sec: list[float],
     subdivisions_per_quarter: int,
-) -> None:
+) -> tuple[np.ndarray, np.ndarray]:
     """
-    노트 시작을 (앵커 기준) '한 박(4분음표)의 1/subdivisions_per_quarter' 길이 격자에 스냅.
-    subdivisions_per_quarter=4 → 16분음표, =2 → 8분음표. 종료는 길이 유지.
+    노트 시작 배열을 '한 박(4분음표)의 1/subdivisions_per_quarter' 길이 격자에 스냅한 (시작, 끝) 배열.
+    subdivisions_per_quarter=4 → 16분음표, =2 → 8분음표. 입력 배열은 바꾸지 않는다.
+    - 박이 2개 이상: 추적한 박 사이를 spq 등분한 칸에 맞춘다(`map_times_to_beat_grid`로 격자에서 반올림한 뒤
+      `map_beat_grid_to_times`로 되돌림). 결과는 오디오 시각 그대로라 템포가 흔들려도 음원과 어긋나지 않는다.
+    - 그 외: 첫 박(없으면 0)을 앵커로 bpm 격자에 스냅하고 길이(최소 1ms)를 유지.
     """
     bpm = max(20.0, min(300.0, float(bpm)))
     spq = max(1, int(subdivisions_per_quarter))
     quarter_sec = 60.0 / bpm
     step = quarter_sec / float(spq)
+
+    starts = np.asarray(starts, dtype=np.float64)
+    ends = np.asarray(ends, dtype=np.float64)
+    if len(beat_times_sec) >= 2:
+        mapped_starts = map_times_to_beat_grid(starts, bpm, beat_times_sec, spq)
+        mapped_ends = map_times_to_beat_grid(ends, bpm, beat_times_sec, spq)
+        grid_starts = np.maximum(0.0, np.round(mapped_starts / step) * step)
+        grid_ends = np.maximum(grid_starts + 1e-3, mapped_ends + (grid_starts - mapped_starts))
+        new_starts = np.maximum(0.0, map_beat_grid_to_times(grid_starts, bpm, beat_times_sec, spq))
+        return new_starts, np.maximum(new_starts + 1e-3, map_beat_grid_to_times(grid_ends, bpm, beat_times_sec, spq))
+
     t_anchor = float(beat_times_sec[0]) if beat_times_sec else 0.0
+    # np.round는 파이썬 round와 같이 .5를 짝수로 보낸다
+    k = np.round((starts - t_anchor) / step)
+    new_starts = np.maximum(0.0, t_anchor + k * step)
+    durs = np.maximum(1e-3, ends - starts)
+    return new_starts, new_starts + durs
 
+
+def snap_midi_notes_to_tempo_grid(
+    midi: pretty_midi.PrettyMIDI,
+    bpm: float,
+    beat_times_sec: list[float],
+    subdivisions_per_quarter: int,
+) -> None:
+    """`snap_note_times_to_tempo_grid`를 드럼이 아닌 악기 노트에 제자리 적용."""
+    snapped: list[tuple[list[pretty_midi.Note], np.ndarray, np.ndarray]] = []
     for inst in midi.instruments:
-        if inst.is_drum:
+        if inst.is_drum or not inst.notes:
             continue
-        for note in inst.notes:
-            rel = float(note.start) - t_anchor
-            k = round(rel / step)
-            new_start = max(0.0, t_anchor + k * step)
-            dur = max(1e-3, float(note.end) - float(note.start))
-            note.start = new_start
-            note.end = new_start + dur
+        starts = np.fromiter((n.start for n in inst.notes), dtype=np.float64, count=len(inst.notes))
+        ends = np.fromiter((n.end for n in inst.notes), dtype=np.float64, count=len(inst.notes))
+        new_starts, new_ends = snap_note_times_to_tempo_grid(
+            starts, ends, bpm, beat_times_sec, subdivisions_per_quarter
+        )
+        snapped.append((inst.notes, new_starts, new_ends))
+    # 계산이 모두 끝난 뒤에만 노트를 고친다(중간 실패 시 MIDI는 그대로).
+    for notes, new_starts, new_ends in snapped:
+        for note, s, e in zip(notes, new_starts.tolist(), new_ends.tolist()):
+            note.start = s
+            note.end = e
 
 
 def snap_midi_notes_to_sixteenth_grid(
@@ -53,9 +310,11 @@ def analyze_onsets_from_guitar_audio(
     *,
     max_duration_sec: float = 600.0,
     bpm_hint: float | None = None,
+    onset_envelope: OnsetEnvelope | None = None,
 ) -> dict[str, Any]:
     """
     기타 stem 오디오에서 onset 시각(초)을 추출한다.
+    onset_envelope(`load_onset_envelope`)를 주면 디코딩 없이 그 곡선에서 peak picking만 한다.
     반환: ok, onset_times_sec, sr, error(optional)
     """
     out: dict[str, Any] = {
@@ -70,32 +329,41 @@ def analyze_onsets_from_guitar_audio(
         out["error"] = f"librosa_import:{e}"
         return out
 
-    path = Path(audio_path)
-    if not path.is_file():
-        out["error"] = "file_not_found"
-        return out
-
-    try:
-        y, sr = librosa.load(
-            str(path),
-            sr=22050,
-            mono=True,
-            duration=max_duration_sec,
-        )
-    except Exception as e:
-        out["error"] = f"load:{e}"
-        return out
-
-    if y.size < sr * 0.5:
+    if onset_envelope is None:
+        path = Path(audio_path)
+        if not path.is_file():
+            out["error"] = "file_not_found"
+            return out
+        try:
+            y, sr = librosa.load(
+                str(path),
+                sr=22050,
+                mono=True,
+                duration=max_duration_sec,
+            )
+        except Exception as e:
+            out["error"] = f"load:{e}"
+            return out
+        if y.size < sr * 0.5:
+            out["error"] = "audio_too_short"
+            return out
+        try:
+            onset_envelope = compute_onset_envelope(y, int(sr))
+        except Exception as e:
+            out["error"] = f"onset_detect:{e}"
+            return out
+    elif onset_envelope.duration_sec < 0.5:
         out["error"] = "audio_too_short"
         return out
 
+    sr = onset_envelope.sr
+    hop = onset_envelope.hop_length
     try:
-        onset_env = librosa.onset.onset_strength(y=y, sr=sr, hop_length=512)
+        onset_env = onset_envelope.env
         onset_frames = librosa.onset.onset_detect(
             onset_envelope=onset_env,
             sr=sr,
-            hop_length=512,
+            hop_length=hop,
             units="frames",
             backtrack=False,
             pre_max=20,
@@ -105,7 +373,7 @@ def analyze_onsets_from_guitar_audio(
             delta=0.2,
             wait=1,
         )
-        onset_times = librosa.frames_to_time(onset_frames, sr=sr, hop_length=512)
+        onset_times = librosa.frames_to_time(onset_frames, sr=sr, hop_length=hop)
         onset_times_sec = sorted(set(round(float(t), 6) for t in np.atleast_1d(onset_times).tolist()))
         if len(onset_times_sec) < 2:
             out["error"] = "onsets_too_few"
@@ -118,3 +386,124 @@ def analyze_onsets_from_guitar_audio(
         return out
 
     return out
+
+
+def _downbeat_indices(onset_env: np.ndarray, beat_frames: np.ndarray, beats_per_bar: int) -> list[int]:
+    """마디 안 위치(0..beats_per_bar-1) 중 박 프레임 onset 세기 평균이 가장 큰 위치를 강박으로 본다."""
+    bpb = max(1, int(beats_per_bar))
+    n = int(beat_frames.size)
+    if n == 0:
+        return []
+    strength = onset_env[np.clip(beat_frames, 0, onset_env.size - 1)]
+    phase = max(range(min(bpb, n)), key=lambda p: (float(np.mean(strength[p::bpb])), -p))
+    return list(range(phase, n, bpb))
+
+
+def track_beats(
+    y: np.ndarray | None,
+    sr: int,
+    *,
+    beats_per_bar: int = 4,
+    hop_length: int = BEAT_TRACK_HOP,
+    onset_env: np.ndarray | None = None,
+) -> dict[str, Any]:
+    """
+    디코딩된 오디오에서 박·강박을 추적한다(librosa 동적 계획 박 추적 + onset 세기 기반 강박 위상).
+    같은 sr·hop_length로 구한 onset_env를 주면 y 없이 그 곡선으로 추적한다.
+    반환: ok, bpm(박 번호→시각 직선 기울기, `beat_grid_bpm`), beat_times_sec, downbeat_indices(beat_times_sec 인덱스), error
+    """
+    out: dict[str, Any] = {
+        "ok": False,
+        "bpm": None,
+        "beat_times_sec": [],
+        "downbeat_indices": [],
+        "beats_per_bar": int(beats_per_bar),
+        "error": None,
+    }
+    try:
+        import librosa
+    except ImportError as e:
+        out["error"] = f"librosa_import:{e}"
+        return out
+    try:
+        if onset_env is None:
+            onset_env = librosa.onset.onset_strength(y=y, sr=sr, hop_length=hop_length)
+        _tempo, beat_frames = librosa.beat.beat_track(
+            onset_envelope=onset_env, sr=sr, hop_length=hop_length, units="frames"
+        )
+    except Exception as e:
+        out["error"] = f"beat_track:{e}"
+        return out
+    beat_frames = np.atleast_1d(np.asarray(beat_frames, dtype=np.int64))
+    beat_times = librosa.frames_to_time(beat_frames, sr=sr, hop_length=hop_length)
+    beat_times_sec = [round(float(t), 6) for t in np.atleast_1d(beat_times).tolist()]
+    bpm = beat_grid_bpm(beat_times_sec)
+    if len(beat_times_sec) < 4 or bpm is None:
+        out["error"] = "beats_too_few"
+        return out
+    out["ok"] = True
+    out["bpm"] = round(bpm, 4)
+    out["beat_times_sec"] = beat_times_sec
+    out["downbeat_indices"] = _downbeat_indices(onset_env, beat_frames, beats_per_bar)
+    return out
+
+
+def _beat_cache_key(path: Path, beats_per_bar: int, max_duration_sec: float) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as fh:
+        for chunk in iter(lambda: fh.read(1 << 20), b""):
+            digest.update(chunk)
+    digest.update(f"|v{BEAT_CACHE_VERSION}|bpb{int(beats_per_bar)}|dur{float(max_duration_sec)}".encode())
+    return digest.hexdigest()[:32]
+
+
+def analyze_beats_from_audio(
+    audio_path: Path,
+    *,
+    beats_per_bar: int = 4,
+    max_duration_sec: float = 600.0,
+    cache_dir: Path | None = None,
+    onset_envelope: OnsetEnvelope | None = None,
+) -> dict[str, Any]:
+    """
+    오디오 파일 → `track_beats` 결과. cache_dir가 있으면 오디오 내용 해시로 결과를 저장·재사용한다
+    (같은 스템을 다시 처리할 때 디코딩·박 추적을 건너뜀, 적중 시 cached=True).
+    onset_envelope를 주면 디코딩하지 않고 그 곡선으로 추적한다.
+    """
+    path = Path(audio_path)
+    if not path.is_file():
+        return {"ok": False, "bpm": None, "beat_times_sec": [], "downbeat_indices": [], "error": "file_not_found"}
+    cache_file: Path | None = None
+    if cache_dir is not None:
+        cache_file = Path(cache_dir) / f"{_beat_cache_key(path, beats_per_bar, max_duration_sec)}.json"
+        try:
+            cached = json.loads(cache_file.read_text(encoding="utf-8"))
+            if isinstance(cached, dict) and cached.get("ok"):
+                return {**cached, "cached": True}
+        except (OSError, ValueError):
+            pass
+    if onset_envelope is not None:
+        out = track_beats(
+            None,
+            onset_envelope.sr,
+            beats_per_bar=beats_per_bar,
+            hop_length=onset_envelope.hop_length,
+            onset_env=onset_envelope.env,
+        )
+    else:
+        try:
+            import librosa
+        except ImportError as e:
+            return {"ok": False, "bpm": None, "beat_times_sec": [], "downbeat_indices": [], "error": f"librosa_import:{e}"}
+        try:
+            y, sr = librosa.load(str(path), sr=BEAT_TRACK_SR, mono=True, duration=max_duration_sec)
+        except Exception as e:
+            return {"ok": False, "bpm": None, "beat_times_sec": [], "downbeat_indices": [], "error": f"load:{e}"}
+        out = track_beats(y, int(sr), beats_per_bar=beats_per_bar)
+    if out["ok"] and cache_file is not None:
+        try:
+            cache_file.parent.mkdir(parents=True, exist_ok=True)
+            cache_file.write_text(json.dumps(out, ensure_ascii=False), encoding="utf-8")
+        except OSError:
+            pass
+    return out
@@ -0,0 +1,54 @@
+"""
+코드 진행 디코더: 프레임(마디)별 템플릿 점수 행렬 → Viterbi 최적 경로.
+
+`_bar_chord_labels`(MIDI 음높이 가중치)처럼 프레임마다 후보 코드 점수를 만드는 경로라면 어디서든
+같은 디코더를 쓴다. 전이는 (상태 x 상태) 가산 점수 행렬이며, 기본 전이는 "유지 0 / 변경 -penalty".
+프레임당 한 번의 (S x S) 브로드캐스트로 O(frames x states²)에 끝난다.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+
+
+def switch_penalty_transition(n_states: int, penalty: float) -> np.ndarray:
+    """같은 코드 유지 0, 다른 코드로 바꾸면 -penalty 인 전이 점수 행렬."""
+    trans = np.full((n_states, n_states), -float(penalty), dtype=float)
+    np.fill_diagonal(trans, 0.0)
+    return trans
+
+
+def viterbi_decode(
+    emission: np.ndarray,
+    transition: np.ndarray,
+    initial: np.ndarray | None = None,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    emission: (T x S) 프레임별 상태 점수(가산, 로그우도 스케일), transition: (S x S) [이전, 다음].
+    initial: (S,) 첫 프레임 이전 누적 점수(이전 블록의 마지막 delta를 넘겨 이어 붙일 때).
+    반환: (상태 인덱스 경로 (T,), 마지막 프레임 누적 점수 (S,)). 동점은 낮은 인덱스가 이긴다.
+    """
+    em = np.asarray(emission, dtype=float)
+    n_frames, n_states = em.shape
+    if n_frames == 0:
+        return np.zeros(0, dtype=np.int64), (
+            np.zeros(n_states) if initial is None else np.asarray(initial, dtype=float)
+        )
+    trans = np.asarray(transition, dtype=float)
+    back = np.zeros((n_frames, n_states), dtype=np.int64)
+    if initial is None:
+        delta = em[0].copy()
+    else:
+        cand = np.asarray(initial, dtype=float)[:, None] + trans
+        back[0] = np.argmax(cand, axis=0)
+        delta = cand[back[0], np.arange(n_states)] + em[0]
+    cols = np.arange(n_states)
+    for t in range(1, n_frames):
+        cand = delta[:, None] + trans
+        back[t] = np.argmax(cand, axis=0)
+        delta = cand[back[t], cols] + em[t]
+    path = np.zeros(n_frames, dtype=np.int64)
+    path[-1] = int(np.argmax(delta))
+    for t in range(n_frames - 1, 0, -1):
+        path[t - 1] = back[t, path[t]]
+    return path, delta
@@ -0,0 +1,59 @@
+"""
+작업 산출물·API 응답용 JSON 직렬화.
+
+orjson이 설치돼 있으면 그것으로, 없으면 표준 `json`으로 인코딩한다. 유한한 값이면 출력 내용은 같지만,
+NaN·±inf는 orjson이 `null`로, 표준 `json`은 (JSON 표준이 아닌) `NaN`·`Infinity`로 쓴다.
+산출물(score.json, summary.json, job_meta.json, compare_report.json, meta.json, lyrics.json)은 기본이 compact이며
+`JOB_JSON_PRETTY=1`이면 사람이 읽기 쉬운 indent=2로 쓴다. API는 미리 인코딩한 bytes를 `Response`로 그대로 넘긴다.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+from typing import Any
+
+try:
+    import orjson  # type: ignore[import-not-found]
+except ImportError:
+    orjson = None  # type: ignore[assignment]
+
+JSON_MEDIA_TYPE = "application/json"
+
+
+def _pretty_default() -> bool:
+    return (os.environ.get("JOB_JSON_PRETTY") or "").strip().lower() in ("1", "true", "yes", "on")
+
+
+def dumps_bytes(obj: Any, *, pretty: bool = False) -> bytes:
+    """obj → UTF-8 JSON bytes(비ASCII 그대로). pretty=False면 공백 없는 compact."""
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        if pretty:
+            option |= orjson.OPT_INDENT_2
+        try:
+            return orjson.dumps(obj, option=option)
+        except TypeError:
+            # orjson이 못 다루는 값(64비트 초과 정수 등)은 표준 json으로
+            pass
+    if pretty:
+        return json.dumps(obj, ensure_ascii=False, indent=2).encode("utf-8")
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def loads(data: bytes | str) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def read_json(path: Path) -> Any:
+    return loads(path.read_bytes())
+
+
+def write_json(path: Path, obj: Any, *, pretty: bool | None = None) -> int:
+    """산출물 JSON을 한 번에 쓴다. pretty=None이면 `JOB_JSON_PRETTY`를 따른다. 쓴 바이트 수를 반환."""
+    data = dumps_bytes(obj, pretty=_pretty_default() if pretty is None else pretty)
+    path.write_bytes(data)
+    return len(data)
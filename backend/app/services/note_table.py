@@ -0,0 +1,119 @@
+"""
+탭 렌더 경로의 노트 테이블(structure-of-arrays).
+
+노트 하나를 dict로 들고 단계마다 `{**n}` / `dict(n)`으로 복사하는 대신, 열(column)마다 NumPy 배열을 둔다.
+필터·정렬·그룹은 인덱스 배열로 한 번에 처리하고, 슬롯 단위 DP처럼 노트별 dict가 필요한 지점에서만
+`to_dicts()`로 내보낸다. 없는 값은 uid=-1, string=0, fret=-1 로 표시한다.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Iterable
+
+import numpy as np
+
+NO_UID = -1
+NO_STRING = 0
+NO_FRET = -1
+
+
+@dataclass
+class NoteTable:
+    pitch: np.ndarray
+    start: np.ndarray
+    end: np.ndarray
+    velocity: np.ndarray
+    uid: np.ndarray
+    string: np.ndarray
+    fret: np.ndarray
+
+    def __len__(self) -> int:
+        return int(self.pitch.shape[0])
+
+    @classmethod
+    def from_columns(
+        cls,
+        pitch: Iterable[int],
+        start: Iterable[float],
+        end: Iterable[float],
+        velocity: Iterable[int],
+        uid: Iterable[int] | None = None,
+    ) -> "NoteTable":
+        p = np.asarray(pitch, dtype=np.int64)
+        n = p.shape[0]
+        return cls(
+            pitch=p,
+            start=np.asarray(start, dtype=float).reshape(n),
+            end=np.asarray(end, dtype=float).reshape(n),
+            velocity=np.asarray(velocity, dtype=np.int64).reshape(n),
+            uid=(np.full(n, NO_UID, dtype=np.int64) if uid is None else np.asarray(uid, dtype=np.int64).reshape(n)),
+            string=np.full(n, NO_STRING, dtype=np.int64),
+            fret=np.full(n, NO_FRET, dtype=np.int64),
+        )
+
+    @classmethod
+    def empty(cls) -> "NoteTable":
+        return cls.from_columns([], [], [], [])
+
+    @classmethod
+    def from_instruments(
+        cls,
+        instruments: Iterable[Any],
+        *,
+        min_velocity: int,
+        min_pitch: int,
+        max_pitch: int,
+        with_uid: bool = False,
+    ) -> "NoteTable":
+        """pretty_midi 악기들의 노트를 (길이>0, velocity·음역 필터) 순서대로 담는다. with_uid면 0..N-1."""
+        rows = [
+            (int(note.pitch), float(note.start), float(note.end), int(note.velocity))
+            for inst in instruments
+            for note in inst.notes
+            if note.end > note.start
+            and int(note.velocity) >= min_velocity
+            and min_pitch <= int(note.pitch) <= max_pitch
+        ]
+        if not rows:
+            return cls.empty()
+        cols = list(zip(*rows))
+        return cls.from_columns(
+            cols[0], cols[1], cols[2], cols[3], uid=(np.arange(len(rows)) if with_uid else None)
+        )
+
+    def take(self, index: np.ndarray) -> "NoteTable":
+        """정수 인덱스 또는 bool 마스크로 행을 고른 새 테이블."""
+        return NoteTable(
+            pitch=self.pitch[index],
+            start=self.start[index],
+            end=self.end[index],
+            velocity=self.velocity[index],
+            uid=self.uid[index],
+            string=self.string[index],
+            fret=self.fret[index],
+        )
+
+    def max_end(self, default: float = 0.0) -> float:
+        return float(self.end.max()) if len(self) else float(default)
+
+    def to_dicts(self) -> list[dict[str, Any]]:
+        """노트별 dict(pitch/velocity/start/end + 있으면 note_uid, string/fret)."""
+        out: list[dict[str, Any]] = []
+        for p, v, s, e, u, st, fr in zip(
+            self.pitch.tolist(),
+            self.velocity.tolist(),
+            self.start.tolist(),
+            self.end.tolist(),
+            self.uid.tolist(),
+            self.string.tolist(),
+            self.fret.tolist(),
+        ):
+            row: dict[str, Any] = {"pitch": p, "velocity": v, "start": s, "end": e}
+            if u != NO_UID:
+                row["note_uid"] = u
+            if st != NO_STRING:
+                row["string"] = st
+                row["fret"] = fr
+            out.append(row)
+        return out
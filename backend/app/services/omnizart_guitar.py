@@ -233,8 +233,45 @@ def load_tab_json_sidecar(midi_path: Path) -> list[dict[str, Any]]:
     return out
 
 
+def _match_tab_texts_to_onsets(
+    lyric_times: list[tuple[float, str]], note_ons: list[tuple[float, int]]
+) -> list[dict[str, Any]]:
+    """
+    텍스트 이벤트 (시각, 문자열)과 note-on (시각, pitch)을 onset 창 [nt-0.15, nt+0.02]로 짝짓는다.
+    시각순 두 목록을 두 포인터로 함께 훑어 노트 수에 선형으로 처리한다.
+    """
+    lyric_times = sorted(lyric_times, key=lambda x: x[0])
+    note_ons = sorted(note_ons, key=lambda x: x[0])
+
+    # 두 목록 모두 시각 순이므로 창의 시작 위치(lo)는 앞으로만 움직인다.
+    hints: list[dict[str, Any]] = []
+    lo = 0
+    n_lyrics = len(lyric_times)
+    for nt, pitch in note_ons:
+        while lo < n_lyrics and lyric_times[lo][0] < nt - 0.15:
+            lo += 1
+        best: tuple[float, str] | None = None
+        j = lo
+        while j < n_lyrics and lyric_times[j][0] <= nt + 0.02:
+            lt, txt = lyric_times[j]
+            d = abs(lt - nt)
+            if best is None or d < abs(best[0] - nt):
+                best = (lt, txt)
+            j += 1
+        if best is None:
+            continue
+        tab = _parse_tab_text(best[1])
+        if tab is None:
+            continue
+        s, f = tab
+        hints.append({"pitch": pitch, "start": nt, "string": s, "fret": f, "end": nt})
+    return hints
+
+
 def _hints_from_mido_lyrics(midi_path: Path) -> list[dict[str, Any]]:
-    """Lyric/Marker/Text 메타에 포함된 `3/5` 류 문자열을 노트 onset 근처에 매칭."""
+    """
+    Lyric/Marker/Text 메타에 포함된 `3/5` 류 문자열을 노트 onset 근처에 매칭.
+    """
     try:
         import mido
     except ImportError:
@@ -245,7 +282,7 @@ def _hints_from_mido_lyrics(midi_path: Path) -> list[dict[str, Any]]:
     t = 0.0
 
     lyric_times: list[tuple[float, str]] = []
-    note_ons: list[tuple[float, int, int]] = []
+    note_ons: list[tuple[float, int]] = []
 
     for msg in mido.merge_tracks(mid.tracks):
         delta_sec = mido.tick2second(msg.time, mid.ticks_per_beat, tempo)
@@ -256,34 +293,52 @@ def _hints_from_mido_lyrics(midi_path: Path) -> list[dict[str, Any]]:
             text = getattr(msg, "text", "") or ""
             lyric_times.append((t, str(text)))
         elif msg.type == "note_on" and getattr(msg, "velocity", 0) > 0:
-            note_ons.append((t, int(msg.note), int(getattr(msg, "channel", 0))))
+            note_ons.append((t, int(msg.note)))
 
-    lyric_times.sort(key=lambda x: x[0])
+    return _match_tab_texts_to_onsets(lyric_times, note_ons)
 
-    hints: list[dict[str, Any]] = []
-    for nt, pitch, _ch in note_ons:
-        best: tuple[float, str] | None = None
-        for lt, txt in lyric_times:
-            if lt > nt + 0.12:
-                break
-            if nt - 0.15 <= lt <= nt + 0.02:
-                d = abs(lt - nt)
-                if best is None or d < abs(best[0] - nt):
-                    best = (lt, txt)
-        if best is None:
-            continue
-        tab = _parse_tab_text(best[1])
-        if tab is None:
-            continue
-        s, f = tab
-        hints.append({"pitch": pitch, "start": nt, "string": s, "fret": f, "end": nt})
-    return hints
+
+def _marker_texts_from_midi_file(midi_path: Path, midi: pretty_midi.PrettyMIDI) -> list[tuple[float, str]]:
+    """
+    pretty_midi가 버리는 Marker 메타만 mido로 훑어 (시각, 문자열)로 돌려준다. 노트·템포는 보지 않고,
+    틱 → 초는 같은 파일을 읽은 `midi`의 템포 맵(`tick_to_time`)으로 바꾼다.
+    """
+    try:
+        import mido
+    except ImportError:
+        return []
+
+    markers: list[tuple[float, str]] = []
+    for track in mido.MidiFile(str(midi_path)).tracks:
+        tick = 0
+        for msg in track:
+            tick += msg.time
+            if msg.type == "marker":
+                markers.append((float(midi.tick_to_time(tick)), str(getattr(msg, "text", "") or "")))
+    return markers
+
+
+def _hints_from_pretty_midi_lyrics(
+    midi: pretty_midi.PrettyMIDI, markers: list[tuple[float, str]] | None = None
+) -> list[dict[str, Any]]:
+    """
+    `_hints_from_mido_lyrics`의 메모리 판. pretty_midi에 남는 Lyric/Text에, 따로 읽은 Marker(markers)를 더해 본다.
+    """
+    lyric_times = [(float(ev.time), str(ev.text or "")) for ev in (*midi.lyrics, *midi.text_events)]
+    lyric_times.extend(markers or ())
+    if not lyric_times:
+        return []
+    note_ons = [(float(n.start), int(n.pitch)) for inst in midi.instruments for n in inst.notes if n.velocity > 0]
+    return _match_tab_texts_to_onsets(lyric_times, note_ons)
 
 
-def extract_guitar_tab_hints_from_midi(midi_path: Path) -> list[dict[str, Any]]:
+def extract_guitar_tab_hints_from_midi(
+    midi_path: Path, midi: pretty_midi.PrettyMIDI | None = None
+) -> list[dict[str, Any]]:
     """
     Omnizart/외부 도구가 남긴 줄·프렛 힌트를 수집한다.
     JSON 사이드카를 우선하고, 없으면 MIDI 가사/마커를 파싱한다.
+    `midi`(이미 메모리에 있는 같은 MIDI)를 주면 가사/텍스트는 그것을 쓰고, 파일은 Marker 메타만 mido로 훑는다.
     """
     merged: dict[tuple[int, int, int], dict[str, Any]] = {}
     # 키: (pitch, start_ms, string) 로 중복 제거
@@ -291,7 +346,11 @@ def extract_guitar_tab_hints_from_midi(midi_path: Path) -> list[dict[str, Any]]:
         ms = int(round(float(row["start"]) * 1000.0))
         key = (int(row["pitch"]), ms, int(row["string"]))
         merged[key] = row
-    for row in _hints_from_mido_lyrics(midi_path):
+    if midi is None:
+        lyric_hints = _hints_from_mido_lyrics(midi_path)
+    else:
+        lyric_hints = _hints_from_pretty_midi_lyrics(midi, _marker_texts_from_midi_file(midi_path, midi))
+    for row in lyric_hints:
         ms = int(round(float(row["start"]) * 1000.0))
         key = (int(row["pitch"]), ms, int(row["string"]))
         if key not in merged:
@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import hashlib
 import bisect
+import functools
 import json
 import os
 import shutil
@@ -9,23 +10,52 @@ import re
 import subprocess
 import sys
 import math
+import multiprocessing
 import statistics
 import tempfile
+import threading
+import time
 import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Callable
+from typing import Any, Callable, Iterable
 
+import numpy as np
 import pretty_midi
 
+from .alphatex_check import check_alphatex_chunks
+from .alphatex_writer import AlphaTexDocument
 from .beat_audio import (
+    BeatGridWarp,
+    OnsetEnvelope,
+    analyze_beats_from_audio,
     analyze_onsets_from_guitar_audio,
+    load_onset_envelope,
     snap_midi_notes_to_sixteenth_grid,
     snap_midi_notes_to_tempo_grid,
 )
+from .chord_viterbi import switch_penalty_transition, viterbi_decode
+from .json_codec import write_json
 from .lyrics_lrclib import fetch_lyrics_from_lrclib, parse_artist_and_track_from_youtube_title
+from .note_table import NO_UID, NoteTable
 from .omnizart_guitar import extract_guitar_tab_hints_from_midi
-from .tab_playback import refine_note_events_with_reference_midi, write_tab_compare_artifacts
+from .render_profile import RENDER_PROFILE_SUMMARY_NAME, profile_tab_render
+from .score_columns import SCORE_COLUMNS_FILENAME, encode_score_columns
+from .stage_metrics import (
+    StageRecorder,
+    activate_recorder,
+    observe_pipeline_run,
+    record_subprocess,
+    reset_recorder,
+)
+from .tab_playback import (
+    compare_tab_midi_to_reference,
+    refine_note_events_with_reference_midi,
+    write_tab_compare_artifacts,
+)
+from .timeline import BarIndex, TempoTimeline
 
 GUITAR_OPEN_MIDI = [64, 59, 55, 50, 45, 40]  # E4, B3, G3, D3, A2, E2
 GUITAR_MIN_PITCH = 40
@@ -36,6 +66,14 @@ MERGE_MIN_IOI_SEC = 0.070
 SUSTAIN_RELEASE_SEC = 0.090
 MAX_SUSTAIN_BEATS = 2.0
 MAX_NOTES_PER_SLOT = 3
+# 슬롯 전체 보이싱 빔 탐색(arrangement): 빔 폭, 슬롯당 후보 보이싱 수, 손 폭(프렛, 개방현 제외), 손 이동 가중치
+VOICING_BEAM_WIDTH = 8
+VOICING_CANDIDATES_PER_SLOT = 16
+VOICING_MAX_FRET_SPAN = 4
+VOICING_HAND_SHIFT_WEIGHT = 0.3
+VOICING_CACHE_MAX_ENTRIES = 4096
+# capo·preset만 바꾸는 재렌더용으로 메모리에 들고 있는 MIDI별 준비 입력 개수
+TAB_RENDER_INPUTS_CACHE_MAX_ENTRIES = 16
 
 # 운지 전이 비용 보정 계수(_position_transition_cost와 독립 조정)
 TAB_V2_SAME_FRET_BONUS = 0.4
@@ -48,6 +86,20 @@ TAB_RENDER_MODE_DEFAULT = "transcription"
 TAB_RENDER_MODE_ALLOWED = {"transcription", "arrangement"}
 TAB_ARRANGEMENT_MIN_RECALL_DEFAULT = 0.80
 CAPO_CANDIDATE_RANGE = (0, 5)
+# 카포 탐색: heuristic(코드 표기·음역 휴리스틱) | render(후보 6개를 프로세스 풀에서 운지까지 렌더해 채점)
+TAB_CAPO_SEARCH_DEFAULT = "heuristic"
+TAB_CAPO_SEARCH_ALLOWED = {"heuristic", "render"}
+# render 카포 채점 가중치: recall·코드톤·쉐이프 가산, 카포 아래 프렛(연주 불가)·손 이동(프렛/박) 감점
+CAPO_RENDER_RECALL_WEIGHT = 1.0
+CAPO_RENDER_CHORD_TONE_WEIGHT = 0.6
+CAPO_RENDER_SHAPE_WEIGHT = 0.6
+CAPO_RENDER_BELOW_CAPO_PENALTY = 2.0
+CAPO_RENDER_HAND_SHIFT_WEIGHT = 0.05
+# alphaTex 검증: auto(Python 구조 검증, 의심 문서·표본만 node alphaTab 파서) | python | node(매번 node)
+TAB_ALPHATEX_VALIDATOR_DEFAULT = "auto"
+TAB_ALPHATEX_VALIDATOR_ALLOWED = {"auto", "python", "node"}
+# auto에서 Python 검증을 통과한 문서 중 node로 교차 확인할 비율(문서 내용 해시로 결정)
+TAB_ALPHATEX_NODE_SAMPLE_RATE_DEFAULT = 0.02
 HYBRID_PITCH_ERROR_WEIGHT = 0.82
 HYBRID_RIFF_PITCH_ERROR_WEIGHT = 0.95
 HYBRID_CHORD_TONE_BONUS = 0.45
@@ -57,6 +109,8 @@ HYBRID_RIFF_SHAPE_ALIGNMENT_BONUS = 0.10
 HYBRID_SHAPE_OUTSIDE_PENALTY = 0.55
 HYBRID_RIFF_SHAPE_OUTSIDE_PENALTY = 0.18
 RIFF_CHORD_HIT_RATE_THRESHOLD = 0.42
+# arrangement 마디 코드 Viterbi: 코드 변경 1회당 감점(정규화 템플릿 점수 단위)
+ARRANGEMENT_CHORD_SWITCH_PENALTY = 0.15
 RIFF_NOTES_PER_SEC_THRESHOLD = 5.8
 RIFF_MEAN_MELODIC_STEP_THRESHOLD = 2.8
 STEM_QUALITY_ANALYZE_MAX_SEC = 45.0
@@ -66,6 +120,8 @@ STEM_QUALITY_SILENT_PEAK_DB = -30.0
 STEM_QUALITY_NOISE_FLATNESS = 0.42
 STEM_QUALITY_NOISE_ZCR = 0.22
 STEM_QUALITY_MIN_ONSETS = 6
+# 탭 힌트(줄·프렛)를 노트에 붙일 때 허용하는 onset 차이(초)
+TAB_HINT_MATCH_SEC = 0.085
 
 
 @dataclass(frozen=True)
@@ -81,6 +137,8 @@ class TabRenderPreset:
     onset_gate_mode: str
     emit_dynamics: bool
     base_den: int
+    chord_switch_penalty: float
+    use_voicing_beam: bool
 
 
 TRANSCRIPTION_PRESET = TabRenderPreset(
@@ -95,6 +153,8 @@ TRANSCRIPTION_PRESET = TabRenderPreset(
     onset_gate_mode="hard",
     emit_dynamics=False,
     base_den=16,
+    chord_switch_penalty=0.0,
+    use_voicing_beam=False,
 )
 
 ARRANGEMENT_PRESET = TabRenderPreset(
@@ -109,6 +169,8 @@ ARRANGEMENT_PRESET = TabRenderPreset(
     onset_gate_mode="soft",
     emit_dynamics=False,
     base_den=8,
+    chord_switch_penalty=ARRANGEMENT_CHORD_SWITCH_PENALTY,
+    use_voicing_beam=True,
 )
 
 # General MIDI program → alphaTab instrument 이름 (Structural Metadata 문서와 동일 계열)
@@ -172,24 +234,6 @@ def _parse_time_signature_segments(midi: pretty_midi.PrettyMIDI) -> list[tuple[f
     return out
 
 
-def _segment_value_at(
-    segments: list[tuple[float, Any]],
-    t: float,
-    default: Any,
-) -> Any:
-    best: Any = default
-    for st, val in segments:
-        if st <= t + 1e-9:
-            best = val
-        else:
-            break
-    return best
-
-
-def _measure_units_16ths(numerator: int, denominator: int) -> int:
-    return max(1, int(numerator * 16 // denominator))
-
-
 def _probe_audio_duration_sec(path: Path) -> float | None:
     try:
         completed = subprocess.run(
@@ -301,28 +345,24 @@ def _write_lyrics_files(
 
     root_txt.write_text(text, encoding="utf-8")
     tab_txt.write_text(text, encoding="utf-8")
-    tab_meta.write_text(
-        json.dumps(
-            {
-                "source": lyrics_source,
-                "char_count": len(text),
-                "encoding": "utf-8",
-                "alphatex_lyrics_chars": alphatex_lyrics_chars,
-                "alphatex_lyrics_truncated": alphatex_truncated,
-                "files": {
-                    "plain_root": str(root_txt.as_posix()),
-                    "plain_next_to_alphatex": str(tab_txt.as_posix()),
-                },
-                "alphatex_note": (
-                    "guitar.alphatex 헤더의 \\\\lyrics 에 동일 가사가 들어가며, "
-                    "alphaTab이 박마다 음절을 배치한다. "
-                    "문법: https://alphatab.net/docs/alphatex/metadata/staff/lyrics"
-                ),
+    write_json(
+        tab_meta,
+        {
+            "source": lyrics_source,
+            "char_count": len(text),
+            "encoding": "utf-8",
+            "alphatex_lyrics_chars": alphatex_lyrics_chars,
+            "alphatex_lyrics_truncated": alphatex_truncated,
+            "files": {
+                "plain_root": str(root_txt.as_posix()),
+                "plain_next_to_alphatex": str(tab_txt.as_posix()),
             },
-            ensure_ascii=False,
-            indent=2,
-        ),
-        encoding="utf-8",
+            "alphatex_note": (
+                "guitar.alphatex 헤더의 \\\\lyrics 에 동일 가사가 들어가며, "
+                "alphaTab이 박마다 음절을 배치한다. "
+                "문법: https://alphatab.net/docs/alphatex/metadata/staff/lyrics"
+            ),
+        },
     )
     out["saved"] = True
     out["paths"] = {
@@ -524,7 +564,7 @@ def _capo_style_prior(capo: int) -> float:
 
 
 def _refine_capo_with_midi(
-    raw_notes: list[dict[str, Any]],
+    raw_notes: NoteTable,
     bars_info: list[tuple[float, float, int, int, float, int]],
 ) -> int:
     """
@@ -534,7 +574,7 @@ def _refine_capo_with_midi(
 
 
 def _choose_capo_midi_only(
-    raw_notes: list[dict[str, Any]],
+    raw_notes: NoteTable,
     bars_info: list[tuple[float, float, int, int, float, int]],
     *,
     render_mode: str,
@@ -575,32 +615,52 @@ def _parse_arrangement_min_recall() -> float:
     except ValueError:
         return TAB_ARRANGEMENT_MIN_RECALL_DEFAULT
 
+def _resolve_capo_search_mode() -> str:
+    raw = (os.environ.get("TAB_CAPO_SEARCH") or TAB_CAPO_SEARCH_DEFAULT).strip().lower()
+    if raw in TAB_CAPO_SEARCH_ALLOWED:
+        return raw
+    return TAB_CAPO_SEARCH_DEFAULT
+
+
+def _resolve_alphatex_validator_mode() -> str:
+    raw = (os.environ.get("TAB_ALPHATEX_VALIDATOR") or TAB_ALPHATEX_VALIDATOR_DEFAULT).strip().lower()
+    if raw in TAB_ALPHATEX_VALIDATOR_ALLOWED:
+        return raw
+    return TAB_ALPHATEX_VALIDATOR_DEFAULT
+
+
+def _parse_alphatex_node_sample_rate() -> float:
+    raw = (os.environ.get("TAB_ALPHATEX_NODE_SAMPLE_RATE") or "").strip()
+    if not raw:
+        return TAB_ALPHATEX_NODE_SAMPLE_RATE_DEFAULT
+    try:
+        return max(0.0, min(1.0, float(raw)))
+    except ValueError:
+        return TAB_ALPHATEX_NODE_SAMPLE_RATE_DEFAULT
+
+
+def _parse_capo_search_workers() -> int:
+    raw = (os.environ.get("TAB_CAPO_SEARCH_WORKERS") or "").strip()
+    n_candidates = CAPO_CANDIDATE_RANGE[1] - CAPO_CANDIDATE_RANGE[0] + 1
+    try:
+        workers = int(raw) if raw else 1
+    except ValueError:
+        workers = 1
+    return max(1, min(n_candidates, workers))
+
+
 def _preset_for_mode(mode: str) -> TabRenderPreset:
     return ARRANGEMENT_PRESET if mode == "arrangement" else TRANSCRIPTION_PRESET
 
 
-def _raw_guitar_notes_from_midi(midi: pretty_midi.PrettyMIDI) -> list[dict[str, Any]]:
+def _raw_guitar_notes_from_midi(midi: pretty_midi.PrettyMIDI) -> NoteTable:
     """코드 추정용: 기타 음역 MIDI 노트(연주 음높이, concert pitch)."""
-    out: list[dict[str, Any]] = []
-    for inst in midi.instruments:
-        if inst.is_drum:
-            continue
-        for note in inst.notes:
-            if note.end <= note.start:
-                continue
-            if int(note.velocity) < MIN_NOTE_VELOCITY:
-                continue
-            if not (GUITAR_MIN_PITCH <= int(note.pitch) <= GUITAR_MAX_PITCH):
-                continue
-            out.append(
-                {
-                    "pitch": int(note.pitch),
-                    "start": float(note.start),
-                    "end": float(note.end),
-                    "velocity": int(note.velocity),
-                }
-            )
-    return out
+    return NoteTable.from_instruments(
+        (inst for inst in midi.instruments if not inst.is_drum),
+        min_velocity=MIN_NOTE_VELOCITY,
+        min_pitch=GUITAR_MIN_PITCH,
+        max_pitch=GUITAR_MAX_PITCH,
+    )
 
 
 def _midi_has_named_chord_track_hint(midi: pretty_midi.PrettyMIDI) -> bool:
@@ -633,78 +693,110 @@ _CHORD_CANDIDATES: list[tuple[str, tuple[int, ...]]] = [
 ]
 
 
+_CHORD_TEMPLATE_KEYS: list[tuple[int, str]] = [
+    (root, suffix) for root in range(12) for suffix, _intervals in _CHORD_CANDIDATES
+]
+# (root x 후보) 순서의 12음 포함 여부 행렬(120 x 12). 점수 = 템플릿 안 가중치 - 0.22 x 템플릿 밖 가중치
+_CHORD_TEMPLATE_MATRIX = np.array(
+    [
+        [1.0 if pc in {(root + i) % 12 for i in intervals} else 0.0 for pc in range(12)]
+        for root in range(12)
+        for _suffix, intervals in _CHORD_CANDIDATES
+    ]
+)
+_CHORD_SCORE_MATRIX = (1.22 * _CHORD_TEMPLATE_MATRIX - 0.22).T
+_CHORD_MIN_SCORE_RATIO = 0.06
+_CHORD_TIE_EPS = 1e-9
+
+
+def _chord_template_scores(weights: np.ndarray) -> np.ndarray:
+    """(N x 12) concert 음높이 가중치 → (N x 120) 코드 템플릿 점수."""
+    return np.asarray(weights, dtype=float) @ _CHORD_SCORE_MATRIX
+
+
+def _chord_label_for_index(idx: int, capo: int) -> str:
+    root, suffix = _CHORD_TEMPLATE_KEYS[int(idx)]
+    return f"{_pc_to_name((root - int(capo)) % 12)}{suffix}"
+
+
+def _best_chord_indices(scores: np.ndarray, totals: np.ndarray) -> np.ndarray:
+    """행별 최고 템플릿 인덱스(동점이면 앞 후보). 점수가 total x 0.06 미만·무음이면 -1."""
+    if scores.shape[0] == 0:
+        return np.zeros(0, dtype=np.int64)
+    best = scores.max(axis=1)
+    idx = np.argmax(scores >= (best - _CHORD_TIE_EPS)[:, None], axis=1)
+    idx[(totals < 1e-6) | (best < totals * _CHORD_MIN_SCORE_RATIO)] = -1
+    return idx
+
+
 def _best_chord_from_weights(weights: list[float], capo: int) -> str | None:
     """concert 음높이 가중치 → 운지 이름(카포만큼 반음 아래로 표기)."""
-    total = sum(weights)
-    if total < 1e-6:
-        return None
-    w = [float(x) for x in weights]
-    best_score = -1e9
-    best_label: str | None = None
-    for root in range(12):
-        for suffix, intervals in _CHORD_CANDIDATES:
-            template = {(root + i) % 12 for i in intervals}
-            score = sum(w[p] for p in template)
-            extra = sum(w[p] for p in range(12) if p not in template)
-            adj = score - 0.22 * extra
-            if adj > best_score + 1e-9:
-                best_score = adj
-                shape_root = (root - int(capo)) % 12
-                best_label = f"{_pc_to_name(shape_root)}{suffix}"
-    if best_label is None or best_score < total * 0.06:
-        return None
-    return best_label
+    w = np.asarray(weights, dtype=float)[None, :]
+    idx = int(_best_chord_indices(_chord_template_scores(w), w.sum(axis=1))[0])
+    return _chord_label_for_index(idx, capo) if idx >= 0 else None
 
 
-def _chord_for_time_range(
-    raw_notes: list[dict[str, Any]],
-    t0: float,
-    t1: float,
-    capo: int,
-) -> str | None:
-    weights = [0.0] * 12
-    for n in raw_notes:
-        ov = min(n["end"], t1) - max(n["start"], t0)
-        if ov > 0:
-            weights[n["pitch"] % 12] += ov
-    return _best_chord_from_weights(weights, capo)
+def _bar_pitch_weights(
+    raw_notes: NoteTable,
+    bars_info: list[tuple[float, float, int, int, float, int]],
+) -> np.ndarray:
+    """마디별 pitch class 지속시간 합(마디 수 x 12): 노트-마디 겹침 길이를 한 번에 계산."""
+    weights = np.zeros((len(bars_info), 12), dtype=float)
+    if not len(raw_notes) or not bars_info:
+        return weights
+    starts = raw_notes.start
+    ends = raw_notes.end
+    onehot = np.zeros((len(raw_notes), 12), dtype=float)
+    onehot[np.arange(len(raw_notes)), raw_notes.pitch % 12] = 1.0
+    bar_t0 = np.array([b[0] for b in bars_info], dtype=float)
+    bar_t1 = np.array([b[1] for b in bars_info], dtype=float)
+    # 마디 x 노트 겹침 행렬이 커지지 않게 마디 묶음 단위로 계산
+    step = max(1, 2_000_000 // max(1, len(raw_notes)))
+    for i in range(0, len(bars_info), step):
+        ov = np.minimum(ends[None, :], bar_t1[i : i + step, None]) - np.maximum(
+            starts[None, :], bar_t0[i : i + step, None]
+        )
+        weights[i : i + step] = np.clip(ov, 0.0, None) @ onehot
+    return weights
 
 
 def _bar_chord_labels(
-    raw_notes: list[dict[str, Any]],
+    raw_notes: NoteTable,
     bars_info: list[tuple[float, float, int, int, float, int]],
     capo: int,
+    *,
+    switch_penalty: float = 0.0,
 ) -> list[str]:
+    """
+    마디별 코드 이름. switch_penalty > 0 이면 코드가 잡힌 마디들의 정규화 템플릿 점수(점수/총 가중치)에
+    Viterbi(유지 0 / 변경 -penalty)를 돌려 단발 점프 없는 진행으로 고른다.
+    코드가 안 잡힌 마디는 직전 코드(없으면 "?")를 잇는다.
+    """
+    weights = _bar_pitch_weights(raw_notes, bars_info)
+    totals = weights.sum(axis=1)
+    scores = _chord_template_scores(weights)
+    idx = _best_chord_indices(scores, totals)
+    voiced = np.flatnonzero(idx >= 0)
+    if switch_penalty > 0 and len(voiced) > 1:
+        emission = scores[voiced] / totals[voiced, None]
+        path, _delta = viterbi_decode(
+            emission, switch_penalty_transition(emission.shape[1], switch_penalty)
+        )
+        idx[voiced] = path
     out: list[str] = []
     prev: str | None = None
-    for bs, be, *_r in bars_info:
-        label = _chord_for_time_range(raw_notes, bs, be, capo)
-        if not label:
-            label = prev if prev else "?"
+    for i in idx:
+        label = _chord_label_for_index(int(i), capo) if i >= 0 else (prev if prev else "?")
         out.append(label)
         prev = label
     return out
 
 
-def _smooth_bar_chord_labels(labels: list[str]) -> list[str]:
-    """인접 마디에서 단발 점프를 완화해 코드 진행을 안정화."""
-    if len(labels) < 3:
-        return labels
-    out = list(labels)
-    for i in range(1, len(out) - 1):
-        prev_label = out[i - 1]
-        cur_label = out[i]
-        next_label = out[i + 1]
-        if cur_label != prev_label and cur_label != next_label and prev_label == next_label:
-            out[i] = prev_label
-    return out
-
-
-def _arrangement_playability_score(raw_notes: list[dict[str, Any]], capo: int) -> float:
+def _arrangement_playability_score(raw_notes: NoteTable, capo: int) -> float:
     """카포 후보별 단순 연주성 점수(높을수록 좋음)."""
-    if not raw_notes:
+    if not len(raw_notes):
         return 0.0
-    adjusted = [max(0, int(n["pitch"]) - int(capo) - 40) for n in raw_notes]
+    adjusted = np.maximum(0, raw_notes.pitch - int(capo) - 40).tolist()
     mean_fret = statistics.fmean(adjusted) if adjusted else 0.0
     openish = sum(1 for f in adjusted if f <= 3) / max(1, len(adjusted))
     move = sum(abs(adjusted[i] - adjusted[i - 1]) for i in range(1, len(adjusted))) / max(
@@ -714,7 +806,7 @@ def _arrangement_playability_score(raw_notes: list[dict[str, Any]], capo: int) -
 
 
 def _refine_capo_for_arrangement(
-    raw_notes: list[dict[str, Any]],
+    raw_notes: NoteTable,
     bars_info: list[tuple[float, float, int, int, float, int]],
 ) -> int:
     """MIDI 기반 단순성/연주성 결합 카포 선택(0~5 full search)."""
@@ -763,6 +855,7 @@ _CHORD_ALPHA_TEX_SHAPES: dict[str, tuple[Any, ...]] = {
 }
 
 
+@functools.lru_cache(maxsize=1024)
 def _normalize_chord_label_for_shape_lookup(label: str) -> str:
     s = (label or "").strip()
     if not s or s == "?":
@@ -775,6 +868,7 @@ def _normalize_chord_label_for_shape_lookup(label: str) -> str:
     return s
 
 
+@functools.lru_cache(maxsize=1024)
 def _chord_shape_tuple_for_label(label: str) -> tuple[Any, ...] | None:
     key = _normalize_chord_label_for_shape_lookup(label)
     if not key:
@@ -786,13 +880,18 @@ def _chord_shape_tuple_for_label(label: str) -> tuple[Any, ...] | None:
     return None
 
 
-def _chord_pitch_classes_from_label(label: str | None) -> set[int]:
+_CHORD_INTERVALS_BY_QUALITY: dict[str, frozenset[int]] = {k: frozenset(v) for k, v in _CHORD_CANDIDATES}
+
+
+@functools.lru_cache(maxsize=1024)
+def _chord_pitch_classes_from_label(label: str | None) -> frozenset[int]:
+    """코드 이름 → 구성음 pitch class. 마디 라벨 종류는 적으므로 결과를 캐시한다."""
     s = _normalize_chord_label_for_shape_lookup(label or "")
     if not s:
-        return set()
+        return frozenset()
     m = re.match(r"^([A-G])([#b]?)(.*)$", s)
     if not m:
-        return set()
+        return frozenset()
     root_name = f"{m.group(1)}{m.group(2)}"
     suffix = (m.group(3) or "").strip().lower()
     root_map = {
@@ -811,7 +910,7 @@ def _chord_pitch_classes_from_label(label: str | None) -> set[int]:
     }
     root_pc = root_map.get(root_name)
     if root_pc is None:
-        return set()
+        return frozenset()
     quality = ""
     if suffix.startswith("m7b5"):
         quality = "m7b5"
@@ -831,24 +930,8 @@ def _chord_pitch_classes_from_label(label: str | None) -> set[int]:
         quality = "7"
     elif suffix.startswith("m"):
         quality = "m"
-    intervals_map = {k: set(v) for k, v in _CHORD_CANDIDATES}
-    intervals = intervals_map.get(quality, {0, 4, 7})
-    return {(root_pc + i) % 12 for i in intervals}
-
-
-def _bar_index_for_time(
-    t: float,
-    bars_info: list[tuple[float, float, int, int, float, int]],
-    cache_idx: int,
-) -> int:
-    if not bars_info:
-        return 0
-    i = max(0, min(cache_idx, len(bars_info) - 1))
-    while i + 1 < len(bars_info) and t >= float(bars_info[i][1]) - 1e-9:
-        i += 1
-    while i > 0 and t < float(bars_info[i][0]) - 1e-9:
-        i -= 1
-    return i
+    intervals = _CHORD_INTERVALS_BY_QUALITY.get(quality, frozenset((0, 4, 7)))
+    return frozenset((root_pc + i) % 12 for i in intervals)
 
 
 def _shape_fret_for_string(shape: tuple[Any, ...], string_no: int) -> int | None:
@@ -870,7 +953,7 @@ def _mapping_position_score(
     pos: tuple[int, int],
     prev_pos: tuple[int, int],
     bar_label: str | None,
-    chord_pcs: set[int],
+    chord_pcs: frozenset[int],
     shape: tuple[Any, ...] | None,
     capo: int,
     use_v2: bool,
@@ -928,7 +1011,255 @@ def _mapping_position_score(
     return float(total_cost), details
 
 
+@functools.lru_cache(maxsize=4096)
+def _slot_voicings(
+    pitches: tuple[int, ...],
+    fixed: tuple[tuple[int, int] | None, ...],
+) -> tuple[tuple[tuple[int, int], ...], ...]:
+    """
+    pitches(우선순위 순)를 서로 다른 줄에 하나씩 배정하는 모든 운지. 눌러 잡는 프렛의 폭은
+    VOICING_MAX_FRET_SPAN 이내. fixed[i]가 있으면(탭 힌트) 그 위치만 쓴다. 같은 음 집합은 곡 안에서
+    반복되므로 결과를 캐시한다.
+    """
+    options: list[tuple[tuple[int, int], ...]] = []
+    for pitch, pos in zip(pitches, fixed):
+        if pos is not None:
+            options.append((pos,))
+        else:
+            options.append(_midi_pitch_to_candidate_positions(pitch) or (_midi_note_to_string_fret(pitch),))
+    out: list[tuple[tuple[int, int], ...]] = []
+
+    def walk(i: int, chosen: list[tuple[int, int]], used: frozenset[int], lo: int, hi: int) -> None:
+        if i == len(options):
+            out.append(tuple(chosen))
+            return
+        for string_no, fret in options[i]:
+            if string_no in used:
+                continue
+            n_lo, n_hi = (min(lo, fret), max(hi, fret)) if fret > 0 else (lo, hi)
+            if n_hi - n_lo > VOICING_MAX_FRET_SPAN:
+                continue
+            chosen.append((string_no, fret))
+            walk(i + 1, chosen, used | {string_no}, n_lo, n_hi)
+            chosen.pop()
+
+    walk(0, [], frozenset(), 99, -1)
+    return tuple(out)
+
+
+def _voicing_anchor_fret(voicing: tuple[tuple[int, int], ...]) -> int:
+    """손 위치 근사: 눌러 잡는 프렛 중 최저(모두 개방현이면 0)."""
+    return min((f for _s, f in voicing if f > 0), default=0)
+
+
+_ScoredVoicing = tuple[float, tuple[tuple[int, int], ...], list[dict[str, float]]]
+
+
+class VoicingCache:
+    """
+    슬롯 보이싱 후보 점수 LRU 캐시. 키 = (음높이 오름차순, 고정 위치, capo, 코드 라벨, riff 여부).
+    스트럼 진행처럼 같은 음 집합이 반복되는 슬롯은 열거·채점을 다시 하지 않는다. 렌더 스레드 간 공유.
+    """
+
+    def __init__(self, maxsize: int) -> None:
+        self.maxsize = max(1, int(maxsize))
+        self._data: OrderedDict[tuple[Any, ...], list[_ScoredVoicing]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple[Any, ...]) -> list[_ScoredVoicing] | None:
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def put(self, key: tuple[Any, ...], value: list[_ScoredVoicing]) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+_VOICING_CACHE = VoicingCache(VOICING_CACHE_MAX_ENTRIES)
+
+
+def _score_slot_voicings(
+    pitches: tuple[int, ...],
+    fixed: tuple[tuple[int, int] | None, ...],
+    *,
+    capo: int,
+    bar_label: str | None,
+    chord_pcs: frozenset[int],
+    shape: tuple[Any, ...] | None,
+    profile: dict[str, float],
+) -> list[_ScoredVoicing]:
+    """
+    보이싱 후보를 정적 비용(노트별 `_mapping_position_score` 합, 전이 제외) 오름차순 상위 N개로.
+    pitches는 오름차순이고, 비용 합은 `math.fsum`(더하는 순서와 무관), 동률은 보이싱 (줄, 프렛) 튜플 순으로 깬다.
+    그래서 순위·상위 N개 절단이 슬롯 노트의 입력 순서나 캐시 적중 여부에 좌우되지 않는다.
+    """
+    static_cache: dict[tuple[int, tuple[int, int]], tuple[float, dict[str, float]]] = {}
+    scored: list[_ScoredVoicing] = []
+    for voicing in _slot_voicings(pitches, fixed):
+        costs: list[float] = []
+        details: list[dict[str, float]] = []
+        for idx, pos in enumerate(voicing):
+            hit = static_cache.get((idx, pos))
+            if hit is None:
+                hit = _mapping_position_score(
+                    pitch=pitches[idx],
+                    pos=pos,
+                    prev_pos=pos,
+                    bar_label=bar_label,
+                    chord_pcs=chord_pcs,
+                    shape=shape,
+                    capo=capo,
+                    use_v2=False,
+                    prev_meta=None,
+                    note_meta=None,
+                    weight_profile=profile,
+                )
+                static_cache[(idx, pos)] = hit
+            costs.append(hit[0])
+            details.append(hit[1])
+        scored.append((math.fsum(costs), voicing, details))
+    scored.sort(key=lambda x: (x[0], x[1]))
+    return scored[:VOICING_CANDIDATES_PER_SLOT]
+
+
+def _beam_search_slot_voicings(
+    slots: dict[int, list[dict[str, Any]]],
+    slot_keys: list[int],
+    slot_leads: dict[int, dict[str, Any]],
+    slot_ctx: dict[int, tuple[str | None, frozenset[int], tuple[Any, ...] | None, dict[str, float]]],
+    slot_is_riff: dict[int, bool],
+    *,
+    capo: int,
+    use_v2: bool,
+    max_notes_per_slot: int,
+    beam_width: int = VOICING_BEAM_WIDTH,
+    cache_stats_out: dict[str, Any] | None = None,
+) -> dict[int, list[tuple[dict[str, Any], tuple[int, int], dict[str, float]]]]:
+    """
+    슬롯의 모든 노트를 서로 다른 줄에 함께 배정하는 보이싱을 빔 탐색으로 고른다.
+    - 슬롯 노트는 (velocity, -pitch) 우선순위로 최대 max_notes_per_slot 개(같은 음은 하나)까지 쓰고,
+      손 폭 안에 배정할 수 없으면 우선순위가 낮은 노트부터 뺀다.
+    - 보이싱 비용 = 노트별 `_mapping_position_score`(코드톤·쉐이프·개방현, 전이 제외) 합,
+      전이 = lead 위치 전이 비용 + 손 위치(최저 프렛) 이동 x VOICING_HAND_SHIFT_WEIGHT.
+      후보 채점 결과는 `_VOICING_CACHE`에서 재사용하고, 적중 통계를 cache_stats_out에 남긴다.
+    반환: 슬롯 → [(노트, (줄, 프렛), 점수 detail)].
+    """
+    n_keep = max(1, int(max_notes_per_slot))
+    hits = 0
+    misses = 0
+    # 슬롯별 (쓰는 노트(음높이 오름차순), 후보 보이싱, lead 인덱스)
+    plans: list[tuple[list[dict[str, Any]], list[_ScoredVoicing], int]] = []
+    for k in slot_keys:
+        lead = slot_leads[k]
+        ordered = [lead] + sorted(
+            (n for n in slots[k] if n is not lead), key=lambda x: (-x["velocity"], x["pitch"])
+        )
+        chosen: list[dict[str, Any]] = []
+        seen_pitch: set[int] = set()
+        for n in ordered:
+            if int(n["pitch"]) not in seen_pitch:
+                seen_pitch.add(int(n["pitch"]))
+                chosen.append(n)
+        chosen = chosen[:n_keep]
+        bar_label, chord_pcs, shape, profile = slot_ctx[k]
+        notes_by_pitch: list[dict[str, Any]] = []
+        scored: list[_ScoredVoicing] = []
+        while chosen:
+            notes_by_pitch = sorted(chosen, key=lambda x: int(x["pitch"]))
+            pitches = tuple(int(n["pitch"]) for n in notes_by_pitch)
+            fixed = tuple(
+                (int(n["string"]), int(n["fret"])) if "string" in n and "fret" in n else None
+                for n in notes_by_pitch
+            )
+            key = (pitches, fixed, int(capo), bar_label, bool(slot_is_riff.get(k, False)))
+            cached = _VOICING_CACHE.get(key)
+            if cached is None:
+                misses += 1
+                cached = _score_slot_voicings(
+                    pitches,
+                    fixed,
+                    capo=capo,
+                    bar_label=bar_label,
+                    chord_pcs=chord_pcs,
+                    shape=shape,
+                    profile=profile,
+                )
+                _VOICING_CACHE.put(key, cached)
+            else:
+                hits += 1
+            scored = cached
+            if scored:
+                break
+            chosen.pop()
+        lead_idx = next(i for i, n in enumerate(notes_by_pitch) if n is lead)
+        plans.append((notes_by_pitch, scored, lead_idx))
+
+    if cache_stats_out is not None:
+        lookups = hits + misses
+        cache_stats_out.update(
+            {
+                "voicing_cache_hits": int(hits),
+                "voicing_cache_misses": int(misses),
+                "voicing_cache_hit_rate": round(float(hits) / float(lookups), 4) if lookups else 0.0,
+                "voicing_cache_size": len(_VOICING_CACHE),
+            }
+        )
+
+    # beam: (누적 비용, 보이싱 인덱스, 이전 슬롯 beam 인덱스). 슬롯마다 노트가 1개 이상이므로 후보는 비지 않는다.
+    beams: list[list[tuple[float, int, int]]] = []
+    for i, k in enumerate(slot_keys):
+        _notes, scored, lead_idx = plans[i]
+        if i == 0:
+            cur = [(cost, vi, -1) for vi, (cost, _v, _d) in enumerate(scored)]
+        else:
+            prev_beam = beams[-1]
+            _prev_notes, prev_scored, prev_lead_idx = plans[i - 1]
+            prev_meta = slot_leads[slot_keys[i - 1]]
+            note_meta = slot_leads[k]
+            cur = []
+            for vi, (cost, voicing, _d) in enumerate(scored):
+                anchor = _voicing_anchor_fret(voicing)
+                best_acc = float("inf")
+                best_bi = 0
+                for bi, (acc, pvi, _parent) in enumerate(prev_beam):
+                    prev_voicing = prev_scored[pvi][1]
+                    prev_lead_pos = prev_voicing[prev_lead_idx]
+                    trans = (
+                        _position_transition_cost_v2(prev_lead_pos, voicing[lead_idx], prev_meta, note_meta)
+                        if use_v2
+                        else _position_transition_cost(prev_lead_pos, voicing[lead_idx])
+                    )
+                    trans += VOICING_HAND_SHIFT_WEIGHT * abs(anchor - _voicing_anchor_fret(prev_voicing))
+                    if acc + trans < best_acc:
+                        best_acc = acc + trans
+                        best_bi = bi
+                cur.append((best_acc + cost, vi, best_bi))
+        cur.sort(key=lambda x: x[0])
+        beams.append(cur[: max(1, int(beam_width))])
+
+    out: dict[int, list[tuple[dict[str, Any], tuple[int, int], dict[str, float]]]] = {}
+    bi = 0
+    for i in range(len(slot_keys) - 1, -1, -1):
+        _acc, vi, parent = beams[i][bi]
+        chosen, scored, _lead_idx = plans[i]
+        _cost, voicing, details = scored[vi]
+        out[slot_keys[i]] = list(zip(chosen, voicing, details))
+        bi = parent
+    return out
+
+
+@functools.lru_cache(maxsize=2)
 def _hybrid_weight_profile(*, is_riff_segment: bool) -> dict[str, float]:
+    """riff/일반 구간 가중치. 슬롯마다 공유되는 읽기 전용 dict(수정 금지)."""
     if is_riff_segment:
         return {
             "pitch_error_weight": HYBRID_RIFF_PITCH_ERROR_WEIGHT,
@@ -961,14 +1292,14 @@ def _detect_riff_bars(
         return set()
     stats: dict[int, dict[str, Any]] = {}
     prev_pitch_by_bar: dict[int, int] = {}
-    bar_idx_cache = 0
+    bar_index = BarIndex(bars_info)
     for k in slot_keys:
         t = float(k * step)
-        bar_idx_cache = _bar_index_for_time(t, bars_info, bar_idx_cache)
-        bar_label = bar_chords[bar_idx_cache] if bar_idx_cache < len(bar_chords) else None
+        bar_i = bar_index.index_at(t)
+        bar_label = bar_chords[bar_i] if bar_i < len(bar_chords) else None
         chord_pcs = _chord_pitch_classes_from_label(bar_label)
         row = stats.setdefault(
-            bar_idx_cache,
+            bar_i,
             {"notes": 0, "hits": 0, "step_sum": 0.0, "step_n": 0},
         )
         notes = slots.get(k, [])
@@ -976,11 +1307,11 @@ def _detect_riff_bars(
             continue
         lead = max(notes, key=lambda x: (x.get("velocity", 0), -x.get("pitch", 0)))
         lead_pitch = int(lead["pitch"])
-        prev_pitch = prev_pitch_by_bar.get(bar_idx_cache)
+        prev_pitch = prev_pitch_by_bar.get(bar_i)
         if prev_pitch is not None:
             row["step_sum"] += abs(float(lead_pitch - prev_pitch))
             row["step_n"] += 1
-        prev_pitch_by_bar[bar_idx_cache] = lead_pitch
+        prev_pitch_by_bar[bar_i] = lead_pitch
         for n in notes:
             pitch = int(n["pitch"])
             row["notes"] += 1
@@ -1108,10 +1439,11 @@ def _emit_pick_den_cost(
     return best
 
 
-def _mdp_den_sequence_half_units(target_half: int) -> list[int] | None:
-    """rem_u를 0.5·16분 단위(=32분) 정수로 본 최소 토큰 수 분해. 실패 시 None."""
+@functools.lru_cache(maxsize=None)
+def _mdp_den_sequence_half_units(target_half: int) -> tuple[int, ...] | None:
+    """rem_u를 0.5·16분 단위(=32분) 정수로 본 최소 토큰 수 분해. 실패 시 None. 길이별로 메모이즈."""
     if target_half <= 0:
-        return []
+        return ()
     inf = 10**9
     dp = [inf] * (target_half + 1)
     back_den = [-1] * (target_half + 1)
@@ -1132,7 +1464,7 @@ def _mdp_den_sequence_half_units(target_half: int) -> list[int] | None:
         sz = _DEN_TO_HALF_UNITS[den]
         out.append(den)
         h -= sz
-    return list(reversed(out))
+    return tuple(reversed(out))
 
 
 def _strip_dy_from_alphatex_note_token(s: str) -> str:
@@ -1146,27 +1478,8 @@ def _compute_bars_info(
     bpm_override: float | None = None,
 ) -> list[tuple[float, float, int, int, float, int]]:
     """박자표·템포 구간에 따른 마디 타임라인(_midi_to_alphatex와 동일 규칙)."""
-    eps = 1e-6
-    tempo_segments = _parse_tempo_segments(midi)
-    ts_segments = _parse_time_signature_segments(midi)
-    ts_pairs: list[tuple[float, tuple[int, int]]] = [(t, (n, d)) for t, n, d in ts_segments]
-    bars_info: list[tuple[float, float, int, int, float, int]] = []
-    t_cursor = 0.0
-    while t_cursor < max_end + eps or not bars_info:
-        num_d = _segment_value_at(ts_pairs, t_cursor, (4, 4))
-        num, den = num_d[0], num_d[1]
-        if bpm_override is not None:
-            bpm = float(bpm_override)
-        else:
-            bpm = float(_segment_value_at(tempo_segments, t_cursor, 120.0))
-        bpm = max(20.0, min(300.0, bpm))
-        measure_units = _measure_units_16ths(num, den)
-        measure_sec = measure_units * (60.0 / bpm) / 4.0
-        bars_info.append((t_cursor, t_cursor + measure_sec, num, den, bpm, measure_units))
-        t_cursor += measure_sec
-        if len(bars_info) > 100_000:
-            break
-    return bars_info
+    timeline = TempoTimeline(_parse_tempo_segments(midi), _parse_time_signature_segments(midi))
+    return timeline.bars(max_end, bpm_override=bpm_override)
 
 
 def _validate_alphatex_with_alphatab(tex: str) -> dict[str, Any]:
@@ -1378,8 +1691,10 @@ console.log(JSON.stringify({
             encoding="utf-8",
         )
 
+        node_cmd = ["node", str(node_mjs_path), str(tex_path)]
+        t_node = time.perf_counter()
         completed = subprocess.run(
-            ["node", str(node_mjs_path), str(tex_path)],
+            node_cmd,
             cwd=str(frontend_dir),
             capture_output=True,
             text=True,
@@ -1387,6 +1702,7 @@ console.log(JSON.stringify({
             errors="replace",
             env=os.environ.copy(),
         )
+        record_subprocess(node_cmd, completed.returncode, time.perf_counter() - t_node)
         if completed.returncode != 0:
             raise RuntimeError(
                 "alphaTex 검증(node) 실패: "
@@ -1412,6 +1728,40 @@ console.log(JSON.stringify({
             pass
 
 
+def _alphatex_sampled_for_node(chunks: Iterable[str], rate: float) -> bool:
+    if rate <= 0.0:
+        return False
+    if rate >= 1.0:
+        return True
+    h = hashlib.blake2b(digest_size=4)
+    for chunk in chunks:
+        h.update(chunk.encode("utf-8"))
+    bucket = int(h.hexdigest(), 16)
+    return bucket < rate * 0xFFFFFFFF
+
+
+def _validate_alphatex(doc: AlphaTexDocument) -> dict[str, Any]:
+    """
+    생성 alphaTex 검증 진입점. auto면 Python 구조 검증(`check_alphatex_chunks`)을 문서 조각 위에서 먼저 하고,
+    실패(의심)했거나 표본으로 뽑힌 문서만 node alphaTab 파서로 다시 검증해 그 결과를 따른다.
+    전체 문자열(`doc.text`)은 node로 넘길 때만 만든다.
+    표본 교차 확인은 node를 쓸 수 없으면 건너뛴다(의심 문서는 Python 결과가 그대로 실패).
+    """
+    mode = _resolve_alphatex_validator_mode()
+    if mode == "node":
+        return _validate_alphatex_with_alphatab(doc.text)
+    diag = check_alphatex_chunks(doc.iter_chunks())
+    if mode == "python":
+        return diag
+    suspicious = not diag["tokenGuard"]["ok"] or diag["hasErrors"]
+    if not suspicious and not _alphatex_sampled_for_node(doc.iter_chunks(), _parse_alphatex_node_sample_rate()):
+        return diag
+    try:
+        return _validate_alphatex_with_alphatab(doc.text)
+    except (OSError, RuntimeError):
+        return diag
+
+
 def _should_retry_after_alphatex_diagnostics(diag_payload: dict[str, Any]) -> bool:
     error_codes: set[int] = {int(d.get("code")) for d in diag_payload.get("errors", []) if d.get("code") is not None}
     retry_codes = {201, 202, 206}
@@ -1469,6 +1819,7 @@ def _run(command: list[str], cwd: Path | None = None) -> None:
     # Windows(cp949) 콘솔에서 basic-pitch CLI의 유니코드 출력(✨)이 깨지며 종료되는 문제 방지
     env["PYTHONUTF8"] = "1"
     env["PYTHONIOENCODING"] = "utf-8"
+    t_start = time.perf_counter()
     completed = subprocess.run(
         command,
         cwd=str(cwd) if cwd else None,
@@ -1478,6 +1829,7 @@ def _run(command: list[str], cwd: Path | None = None) -> None:
         errors="replace",
         env=env,
     )
+    record_subprocess(command, completed.returncode, time.perf_counter() - t_start)
     if completed.returncode != 0:
         stderr = completed.stderr.strip() or completed.stdout.strip()
         raise RuntimeError(f"명령 실행 실패: {' '.join(command)}\n{stderr}")
@@ -1630,6 +1982,20 @@ def _to_dbfs(amp: float, *, floor: float = -120.0) -> float:
     return float(20.0 * math.log10(max(1e-12, amp)))
 
 
+def _onset_envelope_cache_path(job_dir: Path, audio_path: Path) -> Path:
+    return job_dir / "analysis" / f"{audio_path.stem}_onset_env.npz"
+
+
+def _stem_onset_envelope(job_dir: Path, audio_path: Path | None) -> OnsetEnvelope | None:
+    """
+    선택된 스템의 onset 세기 곡선(최대 ONSET_ENVELOPE_MAX_SEC). 작업 폴더 analysis/에 캐시해 onset 게이트·박 추적·
+    tab_learn_midi가 같이 쓴다. 품질 판별은 스템마다 앞 45초만 디코딩하므로 이 곡선을 쓰지 않는다.
+    """
+    if not audio_path or not audio_path.is_file():
+        return None
+    return load_onset_envelope(audio_path, cache_path=_onset_envelope_cache_path(job_dir, audio_path))
+
+
 def _analyze_stem_quality(audio_path: Path) -> dict[str, Any]:
     """
     가벼운 통계 기반 스템 품질 판별.
@@ -1742,25 +2108,46 @@ def _instrument_wav_to_midi_basic_pitch(instrument_wav: Path, midi_out: Path) ->
     return _basic_pitch_to_midi(instrument_wav, midi_out)
 
 
-def _match_tab_hint_for_note(
-    note: dict[str, Any],
-    hints: list[dict[str, Any]] | None,
+def _index_tab_hints(
+    hints: list[dict[str, Any]],
+) -> dict[int, tuple[list[float], list[tuple[int, dict[str, Any]]]]]:
+    """탭 힌트 → pitch별 (onset 오름차순 시각, (원래 순번, 힌트)). pitch·start가 숫자가 아닌 힌트는 뺀다."""
+    rows: dict[int, list[tuple[float, int, dict[str, Any]]]] = {}
+    for order, h in enumerate(hints):
+        try:
+            p = int(h["pitch"])
+            t = float(h["start"])
+        except (KeyError, TypeError, ValueError):
+            continue
+        if not math.isfinite(t):
+            continue
+        rows.setdefault(p, []).append((t, order, h))
+    index: dict[int, tuple[list[float], list[tuple[int, dict[str, Any]]]]] = {}
+    for p, items in rows.items():
+        items.sort(key=lambda r: (r[0], r[1]))
+        index[p] = ([r[0] for r in items], [(r[1], r[2]) for r in items])
+    return index
+
+
+def _match_tab_hint_in_index(
+    pitch: int,
+    start: float,
+    index: dict[int, tuple[list[float], list[tuple[int, dict[str, Any]]]]],
 ) -> tuple[int, int] | None:
-    """pitch·onset(초)이 일치하는 탭 힌트를 찾는다."""
-    if not hints:
+    """`_index_tab_hints` 색인에서 같은 pitch·onset ±TAB_HINT_MATCH_SEC 안의 가장 가까운 힌트(동률이면 앞선 힌트)."""
+    entry = index.get(int(pitch))
+    if entry is None:
         return None
-    p = int(note["pitch"])
-    s = float(note["start"])
+    starts, items = entry
+    s = float(start)
+    # 창을 조금 넓게 잘라 두고, 거리 판정·동률 처리는 원래 순서대로 선형 탐색과 똑같이 한다.
+    lo = bisect.bisect_left(starts, s - TAB_HINT_MATCH_SEC - 1e-6)
+    hi = bisect.bisect_right(starts, s + TAB_HINT_MATCH_SEC + 1e-6)
     best: tuple[int, int] | None = None
     best_d = 1e9
-    for h in hints:
-        try:
-            if int(h["pitch"]) != p:
-                continue
-            d = abs(float(h["start"]) - s)
-        except (KeyError, TypeError, ValueError):
-            continue
-        if d < 0.085 and d < best_d:
+    for _order, h in sorted(items[lo:hi], key=lambda r: r[0]):
+        d = abs(float(h["start"]) - s)
+        if d < TAB_HINT_MATCH_SEC and d < best_d:
             best_d = d
             try:
                 best = (int(h["string"]), int(h["fret"]))
@@ -1770,19 +2157,23 @@ def _match_tab_hint_for_note(
 
 
 def _enrich_raw_notes_with_tab_hints(
-    notes: list[dict[str, Any]],
+    notes: NoteTable,
     hints: list[dict[str, Any]] | None,
 ) -> None:
-    """Omnizart·사이드카 등에서 온 줄·프렛을 raw 노트에 붙인다(있을 때만)."""
+    """
+    Omnizart·사이드카 등에서 온 줄·프렛을 노트 테이블의 string/fret 열에 채운다(있을 때만).
+    힌트는 pitch별 onset 정렬 색인으로 한 번 만들어 노트마다 이분 탐색한다.
+    """
     if not hints:
         return
-    for n in notes:
-        tab = _match_tab_hint_for_note(n, hints)
+    index = _index_tab_hints(hints)
+    for i, (pitch, start) in enumerate(zip(notes.pitch.tolist(), notes.start.tolist())):
+        tab = _match_tab_hint_in_index(pitch, start, index)
         if tab:
-            n["string"], n["fret"] = tab[0], tab[1]
+            notes.string[i], notes.fret[i] = tab[0], tab[1]
 
 
-def _midi_note_to_string_fret(midi_pitch: int) -> tuple[int, int]:
+def _lowest_fret_position(midi_pitch: int) -> tuple[int, int]:
     # 가장 낮은 프렛 우선 매핑
     best = (6, max(0, midi_pitch - GUITAR_OPEN_MIDI[-1]))
     for string_idx, open_pitch in enumerate(GUITAR_OPEN_MIDI, start=1):
@@ -1793,16 +2184,15 @@ def _midi_note_to_string_fret(midi_pitch: int) -> tuple[int, int]:
     return best
 
 
-def _midi_pitch_to_candidate_positions(midi_pitch: int) -> list[tuple[int, int]]:
-    candidates: list[tuple[int, int]] = []
-    for string_idx, open_pitch in enumerate(GUITAR_OPEN_MIDI, start=1):
-        fret = midi_pitch - open_pitch
-        if 0 <= fret <= 24:
-            candidates.append((string_idx, int(fret)))
-    return candidates
+def _candidate_positions(midi_pitch: int) -> tuple[tuple[int, int], ...]:
+    return tuple(
+        (string_idx, int(midi_pitch - open_pitch))
+        for string_idx, open_pitch in enumerate(GUITAR_OPEN_MIDI, start=1)
+        if 0 <= midi_pitch - open_pitch <= 24
+    )
 
 
-def _position_transition_cost(prev: tuple[int, int], nxt: tuple[int, int]) -> float:
+def _position_transition_cost_raw(prev: tuple[int, int], nxt: tuple[int, int]) -> float:
     prev_string, prev_fret = prev
     string, fret = nxt
 
@@ -1821,6 +2211,42 @@ def _position_transition_cost(prev: tuple[int, int], nxt: tuple[int, int]) -> fl
     return float(cost)
 
 
+# 운지 룩업 테이블: MIDI 음높이(0~127)별 후보 (줄, 프렛)·최저 프렛 위치, 6줄 x 0~24프렛 전 쌍의 전이 비용.
+# 매 슬롯·노트마다 다시 계산하던 값을 모듈 로드 시 한 번만 만든다.
+_CANDIDATE_POSITIONS_BY_PITCH: tuple[tuple[tuple[int, int], ...], ...] = tuple(
+    _candidate_positions(p) for p in range(128)
+)
+_LOWEST_FRET_POSITION_BY_PITCH: tuple[tuple[int, int], ...] = tuple(_lowest_fret_position(p) for p in range(128))
+_FRETBOARD_POSITIONS: tuple[tuple[int, int], ...] = tuple(
+    (string_idx, fret) for string_idx in range(1, len(GUITAR_OPEN_MIDI) + 1) for fret in range(25)
+)
+# [(이전 줄-1)*25 + 이전 프렛][(줄-1)*25 + 프렛] 순 2차원 표
+_POSITION_TRANSITION_COST: tuple[tuple[float, ...], ...] = tuple(
+    tuple(_position_transition_cost_raw(a, b) for b in _FRETBOARD_POSITIONS) for a in _FRETBOARD_POSITIONS
+)
+
+
+def _midi_note_to_string_fret(midi_pitch: int) -> tuple[int, int]:
+    if 0 <= midi_pitch < 128:
+        return _LOWEST_FRET_POSITION_BY_PITCH[midi_pitch]
+    return _lowest_fret_position(midi_pitch)
+
+
+def _midi_pitch_to_candidate_positions(midi_pitch: int) -> tuple[tuple[int, int], ...]:
+    if 0 <= midi_pitch < 128:
+        return _CANDIDATE_POSITIONS_BY_PITCH[midi_pitch]
+    return _candidate_positions(midi_pitch)
+
+
+def _position_transition_cost(prev: tuple[int, int], nxt: tuple[int, int]) -> float:
+    ps, pf = prev
+    ns, nf = nxt
+    if 1 <= ps <= 6 and 1 <= ns <= 6 and 0 <= pf <= 24 and 0 <= nf <= 24:
+        return _POSITION_TRANSITION_COST[(ps - 1) * 25 + pf][(ns - 1) * 25 + nf]
+    # 탭 힌트 등으로 표 밖(24프렛 초과 등) 위치가 오면 직접 계산
+    return _position_transition_cost_raw(prev, nxt)
+
+
 def _position_transition_cost_v2(
     prev: tuple[int, int],
     nxt: tuple[int, int],
@@ -1846,39 +2272,49 @@ def _position_transition_cost_v2(
     return float(base)
 
 
-def _nearest_onset_distance_sec(onset_times: list[float], t: float) -> float:
-    if not onset_times:
-        return float("inf")
-    i = bisect.bisect_left(onset_times, t)
-    d = float("inf")
-    if i < len(onset_times):
-        d = min(d, abs(onset_times[i] - t))
-    if i > 0:
-        d = min(d, abs(onset_times[i - 1] - t))
+def _nearest_onset_distances(onset_times: np.ndarray, t: np.ndarray) -> np.ndarray:
+    """정렬된 onset 배열에서 각 t까지의 최소 거리(onset이 없으면 inf)."""
+    d = np.full(t.shape, np.inf)
+    if onset_times.size == 0:
+        return d
+    i = np.searchsorted(onset_times, t, side="left")
+    right = i < onset_times.size
+    d[right] = np.abs(onset_times[i[right]] - t[right])
+    left = i > 0
+    d[left] = np.minimum(d[left], np.abs(onset_times[i[left] - 1] - t[left]))
     return d
 
 
-def _next_onset_after(onset_times: list[float], t: float) -> float | None:
-    if not onset_times:
-        return None
-    i = bisect.bisect_right(onset_times, t)
-    if i < len(onset_times):
-        return onset_times[i]
-    return None
+def _next_onsets_after(onset_times: np.ndarray, t: np.ndarray) -> np.ndarray:
+    """각 t보다 엄격히 뒤의 첫 onset 시각(없으면 nan)."""
+    out = np.full(t.shape, np.nan)
+    i = np.searchsorted(onset_times, t, side="right")
+    found = i < onset_times.size
+    out[found] = onset_times[i[found]]
+    return out
+
+
+def _segmented_cummax(values: np.ndarray, seg_starts: np.ndarray) -> np.ndarray:
+    """seg_starts(오름차순 시작 인덱스)로 나뉜 구간마다 누적 최댓값."""
+    out = np.empty_like(values)
+    bounds = np.append(seg_starts, values.size)
+    for lo, hi in zip(bounds[:-1].tolist(), bounds[1:].tolist()):
+        out[lo:hi] = np.maximum.accumulate(values[lo:hi])
+    return out
 
 
 def _reduce_note_density_with_onsets(
-    raw_notes: list[dict[str, Any]],
+    raw_notes: NoteTable,
     *,
     onset_times_sec: list[float] | None,
     quarter_sec: float,
     onset_gate_mode: str,
     stats_out: dict[str, Any] | None = None,
-) -> list[dict[str, Any]]:
-    if not raw_notes:
+) -> NoteTable:
+    if not len(raw_notes):
         return raw_notes
 
-    onset_times = sorted(float(t) for t in (onset_times_sec or []) if t is not None)
+    onset_times = np.sort(np.asarray([float(t) for t in (onset_times_sec or []) if t is not None], dtype=float))
     mode = onset_gate_mode if onset_gate_mode in ("hard", "soft", "off") else "hard"
     hard_drop = 0
     soft_adj = 0
@@ -1886,80 +2322,68 @@ def _reduce_note_density_with_onsets(
         stats_out["onset_gate_mode"] = mode
 
     # 3-A: onset 근접 노트 우선 유지 (hard: 기존 드롭, soft: velocity 감쇠, off: 스킵)
-    if onset_times and mode != "off":
-        gated: list[dict[str, Any]] = []
-        for n in raw_notes:
-            d = _nearest_onset_distance_sec(onset_times, float(n["start"]))
-            vel = int(n["velocity"])
-            if d <= ONSET_TOLERANCE_SEC or vel >= (MIN_NOTE_VELOCITY + 8):
-                gated.append(n)
-                continue
-            if mode == "hard":
-                hard_drop += 1
-                continue
-            # soft
-            nv = max(MIN_NOTE_VELOCITY, int(round(vel * 0.62)))
-            if nv != vel:
-                soft_adj += 1
-            nn = {**n, "velocity": nv}
-            gated.append(nn)
-        if gated:
-            raw_notes = gated
+    if onset_times.size and mode != "off":
+        near = (_nearest_onset_distances(onset_times, raw_notes.start) <= ONSET_TOLERANCE_SEC) | (
+            raw_notes.velocity >= (MIN_NOTE_VELOCITY + 8)
+        )
+        if mode == "hard":
+            hard_drop = int(np.count_nonzero(~near))
+            if near.any():
+                raw_notes = raw_notes.take(near)
+        else:
+            damped = np.maximum(MIN_NOTE_VELOCITY, np.round(raw_notes.velocity * 0.62).astype(np.int64))
+            velocity = np.where(near, raw_notes.velocity, damped)
+            soft_adj = int(np.count_nonzero(velocity != raw_notes.velocity))
+            raw_notes = raw_notes.take(np.arange(len(raw_notes)))
+            raw_notes.velocity = velocity
 
     if stats_out is not None:
         stats_out["onset_hard_dropped_notes"] = int(hard_drop)
         stats_out["onset_soft_velocity_adjusted"] = int(soft_adj)
 
-    # 3-B: 동일 pitch의 과도한 촘촘 onset 병합
+    # 3-B: 동일 pitch의 과도한 촘촘 onset 병합. pitch → start → end 로 정렬한 뒤, 같은 pitch 안에서
+    # 직전까지의 누적 최대 end와의 간격이 min_ioi 이하이면 같은 발음(같은 그룹)으로 본다.
     min_ioi = max(MERGE_MIN_IOI_SEC, quarter_sec / 8.0)  # 대략 1/32 하한
-    by_pitch: dict[int, list[dict[str, Any]]] = {}
-    for n in raw_notes:
-        by_pitch.setdefault(int(n["pitch"]), []).append(n)
-
-    merged: list[dict[str, Any]] = []
-    for pitch, arr in by_pitch.items():
-        arr_sorted = sorted(arr, key=lambda x: (float(x["start"]), float(x["end"])))
-        cur = dict(arr_sorted[0])
-        for nxt in arr_sorted[1:]:
-            gap = float(nxt["start"]) - float(cur["end"])
-            # 겹치거나 너무 가까우면 같은 발음으로 취급
-            if gap <= min_ioi:
-                cur["end"] = max(float(cur["end"]), float(nxt["end"]))
-                cur["velocity"] = max(int(cur["velocity"]), int(nxt["velocity"]))
-                if "note_uid" in cur or "note_uid" in nxt:
-                    u1 = int(cur.get("note_uid", 10**9))
-                    u2 = int(nxt.get("note_uid", 10**9))
-                    cur["note_uid"] = min(u1, u2)
-            else:
-                merged.append(cur)
-                cur = dict(nxt)
-        merged.append(cur)
+    order = np.lexsort((raw_notes.end, raw_notes.start, raw_notes.pitch))
+    pitch = raw_notes.pitch[order]
+    start = raw_notes.start[order]
+    end = raw_notes.end[order]
+    new_pitch = np.ones(pitch.size, dtype=bool)
+    new_pitch[1:] = pitch[1:] != pitch[:-1]
+    run_end = _segmented_cummax(end, np.flatnonzero(new_pitch))
+    group_start = new_pitch.copy()
+    group_start[1:] |= (start[1:] - run_end[:-1]) > min_ioi
+    heads = np.flatnonzero(group_start)
+    uid = np.where(raw_notes.uid[order] != NO_UID, raw_notes.uid[order], 10**9)
+    m_uid = np.minimum.reduceat(uid, heads)
+    m_uid[m_uid == 10**9] = NO_UID
+    m_pitch = pitch[heads]
+    m_start = start[heads]
+    m_end = np.maximum.reduceat(end, heads)
+    m_vel = np.maximum.reduceat(raw_notes.velocity[order], heads)
 
     # 3-D: 지속 길이 상한 (다음 onset 직전 또는 최대 N박)
-    clamped: list[dict[str, Any]] = []
-    max_sustain_sec = quarter_sec * MAX_SUSTAIN_BEATS
-    for n in sorted(merged, key=lambda x: (float(x["start"]), int(x["pitch"]))):
-        start = float(n["start"])
-        end = float(n["end"])
-        next_onset = _next_onset_after(onset_times, start + 1e-6) if onset_times else None
-        cap1 = start + max_sustain_sec
-        cap2 = (next_onset + SUSTAIN_RELEASE_SEC) if next_onset is not None else cap1
-        new_end = min(end, cap1, cap2)
-        if new_end <= start + 1e-3:
-            continue
-        row = {
-            "pitch": int(n["pitch"]),
-            "velocity": int(n["velocity"]),
-            "start": start,
-            "end": new_end,
-        }
-        if "note_uid" in n:
-            row["note_uid"] = int(n["note_uid"])
-        clamped.append(row)
-    return clamped if clamped else raw_notes
+    order = np.lexsort((m_pitch, m_start))
+    m_pitch, m_start, m_end, m_vel, m_uid = (
+        m_pitch[order],
+        m_start[order],
+        m_end[order],
+        m_vel[order],
+        m_uid[order],
+    )
+    cap1 = m_start + quarter_sec * MAX_SUSTAIN_BEATS
+    next_onset = _next_onsets_after(onset_times, m_start + 1e-6)
+    cap2 = np.where(np.isnan(next_onset), cap1, next_onset + SUSTAIN_RELEASE_SEC)
+    new_end = np.minimum(np.minimum(m_end, cap1), cap2)
+    keep = new_end > m_start + 1e-3
+    if not keep.any():
+        return raw_notes
+    return NoteTable.from_columns(
+        m_pitch[keep], m_start[keep], new_end[keep], m_vel[keep], uid=m_uid[keep]
+    )
 
 
-def _quantized_beats_from_midi(
+def _grid_slots_from_midi(
     midi: pretty_midi.PrettyMIDI,
     tempo: float,
     *,
@@ -1967,16 +2391,11 @@ def _quantized_beats_from_midi(
     onset_times_sec: list[float] | None = None,
     tab_hints: list[dict[str, Any]] | None = None,
     onset_stats_out: dict[str, Any] | None = None,
-    bars_info: list[tuple[float, float, int, int, float, int]] | None = None,
-    bar_chords: list[str] | None = None,
-    capo: int = 0,
-    chord_metrics_out: dict[str, Any] | None = None,
-    max_notes_per_slot: int = MAX_NOTES_PER_SLOT,
-) -> tuple[list[dict[str, Any]], float]:
+) -> tuple[dict[int, list[dict[str, Any]]], float]:
     """
-    MIDI note start/end를 기본 양자화하고 모드 preset에 따라 격자 해상도를 적용한다.
+    밀도 축소·탭 힌트·격자 스냅까지 끝난 슬롯 → 노트 목록과 격자 간격(초).
+    capo와 무관하므로 capo만 바뀌는 재렌더에서는 이 결과를 재사용한다(노트 dict는 읽기 전용으로 다룬다).
     """
-
     quarter = 60.0 / max(1.0, tempo)
     step_16 = quarter / 4.0  # 1/16
     step_32 = step_16 / 2.0  # 1/32
@@ -1986,27 +2405,13 @@ def _quantized_beats_from_midi(
     if not melodic_instruments:
         melodic_instruments = [inst for inst in midi.instruments if inst.notes]
 
-    candidate_raw_notes: list[dict[str, Any]] = []
-    uid_next = 0
-    for inst in melodic_instruments:
-        for note in inst.notes:
-            if note.end <= note.start:
-                continue
-            if int(note.velocity) < MIN_NOTE_VELOCITY:
-                continue
-            if not (GUITAR_MIN_PITCH <= int(note.pitch) <= GUITAR_MAX_PITCH):
-                continue
-            candidate_raw_notes.append(
-                {
-                    "note_uid": uid_next,
-                    "pitch": int(note.pitch),
-                    "velocity": int(note.velocity),
-                    "start": float(note.start),
-                    "end": float(note.end),
-                }
-            )
-            uid_next += 1
-
+    candidate_raw_notes = NoteTable.from_instruments(
+        melodic_instruments,
+        min_velocity=MIN_NOTE_VELOCITY,
+        min_pitch=GUITAR_MIN_PITCH,
+        max_pitch=GUITAR_MAX_PITCH,
+        with_uid=True,
+    )
     candidate_raw_notes = _reduce_note_density_with_onsets(
         candidate_raw_notes,
         onset_times_sec=onset_times_sec,
@@ -2017,61 +2422,49 @@ def _quantized_beats_from_midi(
 
     _enrich_raw_notes_with_tab_hints(candidate_raw_notes, tab_hints)
 
-    if not candidate_raw_notes:
-        # 파서가 무조건 구조를 기대하므로 더미 비트 1개는 남긴다.
-        return (
-            [
-                {
-                    "time": 0.0,
-                    "chord": None,
-                    "lyric": None,
-                    "notes": [{"string": 6, "fret": 0, "start": 0.0, "end": float(step_16)}],
-                }
-            ],
-            step_16,
-        )
+    if not len(candidate_raw_notes):
+        return {}, step_16
 
-    def snap_error(note_time: float, step: float) -> float:
-        snapped = round(note_time / step) * step
-        return abs(note_time - snapped)
+    def snap_error(note_time: np.ndarray, step: float) -> np.ndarray:
+        return np.abs(note_time - np.round(note_time / step) * step)
 
     if preset.unified_grid:
         step = quarter / float(max(1, preset.subdivisions_per_quarter))
     else:
-        start_err_16 = [snap_error(n["start"], step_16) for n in candidate_raw_notes]
-        end_err_16 = [snap_error(n["end"], step_16) for n in candidate_raw_notes]
-        start_err_32 = [snap_error(n["start"], step_32) for n in candidate_raw_notes]
-        end_err_32 = [snap_error(n["end"], step_32) for n in candidate_raw_notes]
-
-        median_err_16 = statistics.median(start_err_16 + end_err_16)
-        median_err_32 = statistics.median(start_err_32 + end_err_32)
-        any_32_needed = any((n["end"] - n["start"]) <= step_16 * 0.75 for n in candidate_raw_notes)
+        times = np.concatenate([candidate_raw_notes.start, candidate_raw_notes.end])
+        median_err_16 = statistics.median(snap_error(times, step_16).tolist())
+        median_err_32 = statistics.median(snap_error(times, step_32).tolist())
+        any_32_needed = bool(np.any((candidate_raw_notes.end - candidate_raw_notes.start) <= step_16 * 0.75))
 
         step = step_32 if any_32_needed and median_err_32 <= median_err_16 * 0.6 else step_16
 
-    # slot -> raw note list (여기서 아직 string/fret은 DP 후에 결정)
+    # slot -> raw note list (여기서 아직 string/fret은 DP 후에 결정). 슬롯 스냅은 열 단위로 한 번에 계산하고,
+    # 슬롯 DP가 노트별 메타를 읽으므로 여기서만 dict로 내보낸다.
+    slot_of = np.maximum(0, np.round(candidate_raw_notes.start / step).astype(np.int64))
+    end_slot_of = np.maximum(slot_of + 1, np.round(candidate_raw_notes.end / step).astype(np.int64))
+    candidate_raw_notes.start = slot_of * step
+    candidate_raw_notes.end = end_slot_of * step
     slots: dict[int, list[dict[str, Any]]] = {}
-    for n in candidate_raw_notes:
-        slot = max(0, int(round(float(n["start"]) / step)))
-        start = slot * step
-        end_slot = max(slot + 1, int(round(float(n["end"]) / step)))
-        end = end_slot * step
-
-        slot_note: dict[str, Any] = {
-            "pitch": n["pitch"],
-            "velocity": n["velocity"],
-            "start": float(start),
-            "end": float(end),
-        }
-        if "note_uid" in n:
-            slot_note["note_uid"] = int(n["note_uid"])
-        if "string" in n and "fret" in n:
-            slot_note["string"] = int(n["string"])
-            slot_note["fret"] = int(n["fret"])
+    for slot, slot_note in zip(slot_of.tolist(), candidate_raw_notes.to_dicts()):
         slots.setdefault(slot, []).append(slot_note)
+    return slots, step
 
+
+def _beats_from_grid_slots(
+    slots: dict[int, list[dict[str, Any]]],
+    step: float,
+    *,
+    preset: TabRenderPreset,
+    bars_info: list[tuple[float, float, int, int, float, int]] | None = None,
+    bar_chords: list[str] | None = None,
+    capo: int = 0,
+    chord_metrics_out: dict[str, Any] | None = None,
+    max_notes_per_slot: int = MAX_NOTES_PER_SLOT,
+) -> tuple[list[dict[str, Any]], float]:
+    """슬롯 노트에 줄·프렛을 배정(운지)해 비트 목록을 만든다."""
     slot_keys = sorted(slots.keys())
     if not slot_keys:
+        # 파서가 무조건 구조를 기대하므로 더미 비트 1개는 남긴다.
         return (
             [
                 {
@@ -2092,16 +2485,16 @@ def _quantized_beats_from_midi(
         slot_leads[k] = lead
 
     # slot 별 lead 후보 positions
-    lead_candidates: dict[int, list[tuple[int, int]]] = {}
+    lead_candidates: dict[int, tuple[tuple[int, int], ...]] = {}
     for k in slot_keys:
         lead = slot_leads[k]
         if "string" in lead and "fret" in lead:
-            lead_candidates[k] = [(int(lead["string"]), int(lead["fret"]))]
+            lead_candidates[k] = ((int(lead["string"]), int(lead["fret"])),)
             continue
         lead_pitch = lead["pitch"]
         cand = _midi_pitch_to_candidate_positions(lead_pitch)
         if not cand:
-            cand = [_midi_note_to_string_fret(lead_pitch)]
+            cand = (_midi_note_to_string_fret(lead_pitch),)
         lead_candidates[k] = cand
 
     # Viterbi DP: 각 slot의 lead pos를 선택한다.
@@ -2113,86 +2506,104 @@ def _quantized_beats_from_midi(
     bars_local = bars_info or []
     bar_labels_local = bar_chords or []
     bar_riff_segments = _detect_riff_bars(slots, slot_keys, step, bars_local, bar_labels_local)
-    slot_ctx: dict[int, tuple[str | None, set[int], tuple[Any, ...] | None, dict[str, float]]] = {}
-    bar_idx_cache = 0
+    slot_ctx: dict[int, tuple[str | None, frozenset[int], tuple[Any, ...] | None, dict[str, float]]] = {}
+    slot_is_riff: dict[int, bool] = {}
+    bar_index = BarIndex(bars_local)
     for k in slot_keys:
         time_value = float(k * step)
         if bars_local:
-            bar_idx_cache = _bar_index_for_time(time_value, bars_local, bar_idx_cache)
-            bar_label = (
-                bar_labels_local[bar_idx_cache]
-                if bar_idx_cache < len(bar_labels_local)
-                else None
-            )
-            is_riff = bar_idx_cache in bar_riff_segments
+            bar_i = bar_index.index_at(time_value)
+            bar_label = bar_labels_local[bar_i] if bar_i < len(bar_labels_local) else None
+            is_riff = bar_i in bar_riff_segments
         else:
             bar_label = None
             is_riff = False
         chord_pcs = _chord_pitch_classes_from_label(bar_label)
         shape = _chord_shape_tuple_for_label(bar_label or "")
         slot_ctx[k] = (bar_label, chord_pcs, shape, _hybrid_weight_profile(is_riff_segment=is_riff))
-
-    for pos in lead_candidates[first_k]:
-        bar_label_0, chord_pcs_0, shape_0, profile_0 = slot_ctx[first_k]
-        seed_cost, _ = _mapping_position_score(
-            pitch=int(slot_leads[first_k]["pitch"]),
-            pos=pos,
-            prev_pos=pos,
-            bar_label=bar_label_0,
-            chord_pcs=chord_pcs_0,
-            shape=shape_0,
-            capo=capo,
+        slot_is_riff[k] = is_riff
+
+    # arrangement: 슬롯 전체 보이싱을 빔 탐색으로 고른다(lead Viterbi + 나머지 그리디 대신).
+    voicing_cache_stats: dict[str, Any] = {}
+    voicing_plan = (
+        _beam_search_slot_voicings(
+            slots,
+            slot_keys,
+            slot_leads,
+            slot_ctx,
+            slot_is_riff,
+            capo=_clamp_capo_0_5(capo),
             use_v2=use_v2,
-            prev_meta=slot_leads[first_k],
-            note_meta=slot_leads[first_k],
-            weight_profile=profile_0,
+            max_notes_per_slot=max_notes_per_slot,
+            cache_stats_out=voicing_cache_stats,
         )
-        dp[pos] = seed_cost
-        back.setdefault(first_k, {})[pos] = None
-    for i, k in enumerate(slot_keys[1:], start=1):
-        prev_k = slot_keys[i - 1]
-        prev_meta = slot_leads[prev_k]
-        next_meta = slot_leads[k]
-        new_dp: dict[tuple[int, int], float] = {}
-        back.setdefault(k, {})
-        bar_label_k, chord_pcs_k, shape_k, profile_k = slot_ctx[k]
-        for pos in lead_candidates[k]:
-            best_cost = float("inf")
-            best_prev_pos: tuple[int, int] | None = None
-            for prev_pos, prev_cost in dp.items():
-                score_cost, _detail = _mapping_position_score(
-                    pitch=int(slot_leads[k]["pitch"]),
-                    pos=pos,
-                    prev_pos=prev_pos,
-                    bar_label=bar_label_k,
-                    chord_pcs=chord_pcs_k,
-                    shape=shape_k,
-                    capo=capo,
-                    use_v2=use_v2,
-                    prev_meta=prev_meta,
-                    note_meta=next_meta,
-                    weight_profile=profile_k,
-                )
-                cost = prev_cost + score_cost
-                if cost < best_cost:
-                    best_cost = cost
-                    best_prev_pos = prev_pos
-            new_dp[pos] = best_cost
-            back[k][pos] = best_prev_pos
-        dp = new_dp
-
-    last_k = slot_keys[-1]
-    best_last_pos = min(dp.keys(), key=lambda p: dp[p])
-
-    best_lead_pos: dict[int, tuple[int, int]] = {last_k: best_last_pos}
-    cur_pos = best_last_pos
-    # back[k][pos] = (k의 lead pos가 pos일 때, 이전 슬롯의 pos)
-    for idx in range(len(slot_keys) - 2, -1, -1):
-        k = slot_keys[idx]
-        next_k = slot_keys[idx + 1]
-        prev_pos = back[next_k][cur_pos]
-        best_lead_pos[k] = prev_pos if prev_pos is not None else lead_candidates[k][0]
-        cur_pos = best_lead_pos[k]
+        if preset.use_voicing_beam
+        else None
+    )
+
+    best_lead_pos: dict[int, tuple[int, int]] = {}
+    if voicing_plan is None:
+        for pos in lead_candidates[first_k]:
+            bar_label_0, chord_pcs_0, shape_0, profile_0 = slot_ctx[first_k]
+            seed_cost, _ = _mapping_position_score(
+                pitch=int(slot_leads[first_k]["pitch"]),
+                pos=pos,
+                prev_pos=pos,
+                bar_label=bar_label_0,
+                chord_pcs=chord_pcs_0,
+                shape=shape_0,
+                capo=capo,
+                use_v2=use_v2,
+                prev_meta=slot_leads[first_k],
+                note_meta=slot_leads[first_k],
+                weight_profile=profile_0,
+            )
+            dp[pos] = seed_cost
+            back.setdefault(first_k, {})[pos] = None
+        for i, k in enumerate(slot_keys[1:], start=1):
+            prev_k = slot_keys[i - 1]
+            prev_meta = slot_leads[prev_k]
+            next_meta = slot_leads[k]
+            new_dp: dict[tuple[int, int], float] = {}
+            back.setdefault(k, {})
+            bar_label_k, chord_pcs_k, shape_k, profile_k = slot_ctx[k]
+            for pos in lead_candidates[k]:
+                best_cost = float("inf")
+                best_prev_pos: tuple[int, int] | None = None
+                for prev_pos, prev_cost in dp.items():
+                    score_cost, _detail = _mapping_position_score(
+                        pitch=int(slot_leads[k]["pitch"]),
+                        pos=pos,
+                        prev_pos=prev_pos,
+                        bar_label=bar_label_k,
+                        chord_pcs=chord_pcs_k,
+                        shape=shape_k,
+                        capo=capo,
+                        use_v2=use_v2,
+                        prev_meta=prev_meta,
+                        note_meta=next_meta,
+                        weight_profile=profile_k,
+                    )
+                    cost = prev_cost + score_cost
+                    if cost < best_cost:
+                        best_cost = cost
+                        best_prev_pos = prev_pos
+                new_dp[pos] = best_cost
+                back[k][pos] = best_prev_pos
+            dp = new_dp
+
+        last_k = slot_keys[-1]
+        best_last_pos = min(dp.keys(), key=lambda p: dp[p])
+
+        best_lead_pos[last_k] = best_last_pos
+        cur_pos = best_last_pos
+        # back[k][pos] = (k의 lead pos가 pos일 때, 이전 슬롯의 pos)
+        for idx in range(len(slot_keys) - 2, -1, -1):
+            k = slot_keys[idx]
+            next_k = slot_keys[idx + 1]
+            prev_pos = back[next_k][cur_pos]
+            best_lead_pos[k] = prev_pos if prev_pos is not None else lead_candidates[k][0]
+            cur_pos = best_lead_pos[k]
 
     # slot 별 note mapping (lead은 DP 결과, 나머지는 코드/운지 비용 + 전이비용 결합)
     beats: list[dict[str, Any]] = []
@@ -2201,22 +2612,43 @@ def _quantized_beats_from_midi(
         beats.append({"time": 0.0, "chord": None, "lyric": None, "notes": []})
 
     capo_clamped = _clamp_capo_0_5(capo)
-    bar_idx_cache = 0
     chord_hits = 0
     shape_hits = 0
     mapped_total = 0
     riff_slot_count = 0
 
-    prev_lead_pos: tuple[int, int] = best_lead_pos[slot_keys[0]]
+    prev_lead_pos: tuple[int, int] = best_lead_pos.get(slot_keys[0], (6, 0))
     for k in slot_keys:
         time_value = float(k * step)
         notes = slots[k]
         mapped_notes: list[dict[str, Any]] = []
         bar_label, chord_pcs, shape, weight_profile = slot_ctx[k]
-        if bars_local:
-            bar_idx_cache = _bar_index_for_time(time_value, bars_local, bar_idx_cache)
-            if bar_idx_cache in bar_riff_segments:
-                riff_slot_count += 1
+        if slot_is_riff[k]:
+            riff_slot_count += 1
+        if voicing_plan is not None:
+            for n, (string_no, fret), detail in voicing_plan[k]:
+                row_m = {
+                    "string": int(string_no),
+                    "fret": int(fret),
+                    "start": float(n["start"]),
+                    "end": float(n["end"]),
+                    "velocity": int(n["velocity"]),
+                }
+                if "note_uid" in n:
+                    row_m["note_uid"] = int(n["note_uid"])
+                mapped_notes.append(row_m)
+                mapped_total += 1
+                chord_hits += int(detail.get("chord_tone_hit", 0.0) > 0.5)
+                shape_hits += int(detail.get("shape_alignment_hit", 0.0) > 0.5)
+            beats.append(
+                {
+                    "time": time_value,
+                    "chord": None,
+                    "lyric": None,
+                    "notes": sorted(mapped_notes, key=lambda x: (x["string"], x["fret"])),
+                }
+            )
+            continue
         lead_note = slot_leads[k]
         for n in notes:
             if n is lead_note:
@@ -2262,7 +2694,7 @@ def _quantized_beats_from_midi(
 
             candidates = _midi_pitch_to_candidate_positions(n["pitch"])
             if not candidates:
-                candidates = [_midi_note_to_string_fret(n["pitch"])]
+                candidates = (_midi_note_to_string_fret(n["pitch"]),)
             best_pos = candidates[0]
             best_cost = float("inf")
             best_detail = {"pitch_error": 0.0, "chord_tone_hit": 0.0, "shape_alignment_hit": 0.0}
@@ -2333,10 +2765,147 @@ def _quantized_beats_from_midi(
                 "riff_segment_ratio": round(float(riff_slot_count) / float(max(1, len(slot_keys))), 4),
             }
         )
+        chord_metrics_out.update(voicing_cache_stats)
 
     return beats, step
 
 
+def _quantized_beats_from_midi(
+    midi: pretty_midi.PrettyMIDI,
+    tempo: float,
+    *,
+    preset: TabRenderPreset,
+    onset_times_sec: list[float] | None = None,
+    tab_hints: list[dict[str, Any]] | None = None,
+    onset_stats_out: dict[str, Any] | None = None,
+    bars_info: list[tuple[float, float, int, int, float, int]] | None = None,
+    bar_chords: list[str] | None = None,
+    capo: int = 0,
+    chord_metrics_out: dict[str, Any] | None = None,
+    max_notes_per_slot: int = MAX_NOTES_PER_SLOT,
+) -> tuple[list[dict[str, Any]], float]:
+    """
+    MIDI note start/end를 기본 양자화하고 모드 preset에 따라 격자 해상도를 적용한다.
+    """
+    slots, step = _grid_slots_from_midi(
+        midi,
+        tempo,
+        preset=preset,
+        onset_times_sec=onset_times_sec,
+        tab_hints=tab_hints,
+        onset_stats_out=onset_stats_out,
+    )
+    return _beats_from_grid_slots(
+        slots,
+        step,
+        preset=preset,
+        bars_info=bars_info,
+        bar_chords=bar_chords,
+        capo=capo,
+        chord_metrics_out=chord_metrics_out,
+        max_notes_per_slot=max_notes_per_slot,
+    )
+
+
+class TabRenderInputs:
+    """
+    capo·preset과 무관한 탭 렌더 입력: MIDI 파싱, 탭 힌트, 템포/박자 구간, 원시 노트, 마디 정보.
+    preset·온셋별 격자 슬롯(밀도 축소·스냅 결과)도 한 번만 계산해 들고 있어, capo나 preset만 바뀌는
+    재렌더는 운지(`_beats_from_grid_slots`)와 alphaTex 출력만 다시 돈다. 슬롯 노트 dict는 읽기 전용.
+    """
+
+    def __init__(
+        self,
+        midi_path: Path,
+        *,
+        tempo_override: float | None = None,
+        midi: pretty_midi.PrettyMIDI | None = None,
+    ) -> None:
+        self.midi_path = midi_path
+        # midi를 주면(파이프라인이 메모리에서 스냅한 MIDI) 파일을 다시 파싱하지 않는다. 이후 변경 금지.
+        self.tab_hints = extract_guitar_tab_hints_from_midi(midi_path, midi)
+        self.midi = midi if midi is not None else pretty_midi.PrettyMIDI(str(midi_path))
+        self.tempo_segments = _parse_tempo_segments(self.midi)
+        self.ts_segments = _parse_time_signature_segments(self.midi)
+        self.timeline = TempoTimeline(self.tempo_segments, self.ts_segments)
+        tempo0 = float(tempo_override) if tempo_override is not None else float(self.tempo_segments[0][1])
+        self.tempo0 = max(20.0, min(300.0, tempo0))
+        self.inst_name = _midi_program_to_alphatab_instrument(_get_primary_midi_program(self.midi))
+        self.raw_notes = _raw_guitar_notes_from_midi(self.midi)
+        self.max_end = max(self.raw_notes.max_end(), 0.01)
+        self.bars_info = self.timeline.bars(self.max_end, bpm_override=tempo_override)
+        self._slots: dict[tuple[Any, ...], tuple[dict[int, list[dict[str, Any]]], float, dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+    def grid_slots(
+        self,
+        preset: TabRenderPreset,
+        onset_times_sec: list[float] | None = None,
+        onset_stats_out: dict[str, Any] | None = None,
+    ) -> tuple[dict[int, list[dict[str, Any]]], float]:
+        key = (preset, None if onset_times_sec is None else tuple(float(t) for t in onset_times_sec))
+        with self._lock:
+            hit = self._slots.get(key)
+        if hit is None:
+            stats: dict[str, Any] = {}
+            slots, step = _grid_slots_from_midi(
+                self.midi,
+                self.tempo0,
+                preset=preset,
+                onset_times_sec=onset_times_sec,
+                tab_hints=self.tab_hints,
+                onset_stats_out=stats,
+            )
+            with self._lock:
+                hit = self._slots.setdefault(key, (slots, step, stats))
+        if onset_stats_out is not None:
+            onset_stats_out.update(hit[2])
+        return hit[0], hit[1]
+
+
+_TAB_RENDER_INPUTS: OrderedDict[tuple[Any, ...], TabRenderInputs] = OrderedDict()
+_TAB_RENDER_INPUTS_LOCK = threading.Lock()
+
+
+def _tab_render_inputs_key(midi_path: Path, tempo_override: float | None) -> tuple[Any, ...]:
+    resolved = Path(midi_path).resolve()
+    st = resolved.stat()
+    return (str(resolved), st.st_mtime_ns, st.st_size, tempo_override)
+
+
+def _store_tab_render_inputs(key: tuple[Any, ...], inputs: TabRenderInputs) -> TabRenderInputs:
+    with _TAB_RENDER_INPUTS_LOCK:
+        inputs = _TAB_RENDER_INPUTS.setdefault(key, inputs)
+        _TAB_RENDER_INPUTS.move_to_end(key)
+        while len(_TAB_RENDER_INPUTS) > TAB_RENDER_INPUTS_CACHE_MAX_ENTRIES:
+            _TAB_RENDER_INPUTS.popitem(last=False)
+    return inputs
+
+
+def _prime_tab_render_inputs(
+    midi_path: Path, midi: pretty_midi.PrettyMIDI, *, tempo_override: float | None = None
+) -> TabRenderInputs:
+    """
+    방금 `midi_path`에 쓴 MIDI의 메모리 객체로 캐시를 채운다. 이후 같은 파일의 렌더·카포·score 단계는
+    파일을 다시 파싱하지 않고 이 노트(틱 반올림 전 시각)를 쓴다.
+    """
+    inputs = TabRenderInputs(Path(midi_path), tempo_override=tempo_override, midi=midi)
+    return _store_tab_render_inputs(_tab_render_inputs_key(midi_path, tempo_override), inputs)
+
+
+def _tab_render_inputs(midi_path: Path, *, tempo_override: float | None = None) -> TabRenderInputs:
+    """
+    MIDI 경로별 `TabRenderInputs` LRU. 키에 mtime·크기를 넣어 같은 경로에 파일이 다시 써지면 새로 만든다.
+    """
+    key = _tab_render_inputs_key(midi_path, tempo_override)
+    with _TAB_RENDER_INPUTS_LOCK:
+        inputs = _TAB_RENDER_INPUTS.get(key)
+        if inputs is not None:
+            _TAB_RENDER_INPUTS.move_to_end(key)
+            return inputs
+    return _store_tab_render_inputs(key, TabRenderInputs(Path(midi_path), tempo_override=tempo_override))
+
+
 def _midi_to_alphatex(
     midi_path: Path,
     title: str,
@@ -2349,16 +2918,57 @@ def _midi_to_alphatex(
     onset_times_sec: list[float] | None = None,
     tab_output_dir: Path | None = None,
     tab_experiment_out: dict[str, Any] | None = None,
+    compare_report_out: dict[str, Any] | None = None,
     preset: TabRenderPreset = TRANSCRIPTION_PRESET,
     arrangement_relax_level: int = 0,
+    beat_warp: BeatGridWarp | None = None,
+    profile: bool | None = None,
 ) -> str:
-    tab_hints = extract_guitar_tab_hints_from_midi(midi_path)
-    midi = pretty_midi.PrettyMIDI(str(midi_path))
+    return _midi_to_alphatex_document(
+        midi_path,
+        title,
+        artist=artist,
+        lyrics=lyrics,
+        audio_duration_sec=audio_duration_sec,
+        capo=capo,
+        tempo_override=tempo_override,
+        onset_times_sec=onset_times_sec,
+        tab_output_dir=tab_output_dir,
+        tab_experiment_out=tab_experiment_out,
+        compare_report_out=compare_report_out,
+        preset=preset,
+        arrangement_relax_level=arrangement_relax_level,
+        beat_warp=beat_warp,
+        profile=profile,
+    ).text
+
+
+@profile_tab_render
+def _midi_to_alphatex_document(
+    midi_path: Path,
+    title: str,
+    *,
+    artist: str = "",
+    lyrics: str | None = None,
+    audio_duration_sec: float | None = None,
+    capo: int = 0,
+    tempo_override: float | None = None,
+    onset_times_sec: list[float] | None = None,
+    tab_output_dir: Path | None = None,
+    tab_experiment_out: dict[str, Any] | None = None,
+    compare_report_out: dict[str, Any] | None = None,
+    preset: TabRenderPreset = TRANSCRIPTION_PRESET,
+    arrangement_relax_level: int = 0,
+    beat_warp: BeatGridWarp | None = None,
+) -> AlphaTexDocument:
+    """
+    `_midi_to_alphatex`의 본체. 검증을 통과한 문서를 조각(헤더·마디·sync) 그대로 돌려준다(스트리밍용).
+    compare_report_out을 주면 tab_output_dir에 compare_report.json을 쓰지 않고 리포트를 거기에 담는다(호출부가 한 번에 씀).
+    beat_warp를 주면 MIDI가 박 격자 시간축이라 보고, `\\sync`의 마디 시작을 오디오 시각으로 되돌린다.
+    """
+    inputs = _tab_render_inputs(midi_path, tempo_override=tempo_override)
     capo = _clamp_capo_0_5(capo)
-    tempo_segments = _parse_tempo_segments(midi)
-    ts_segments = _parse_time_signature_segments(midi)
-    tempo0 = float(tempo_override) if tempo_override is not None else float(tempo_segments[0][1])
-    tempo0 = max(20.0, min(300.0, tempo0))
+    timeline = inputs.timeline
 
     safe_title = _escape_alpha_tex_string(title)
     safe_artist = _escape_alpha_tex_string(artist) if artist else ""
@@ -2366,24 +2976,20 @@ def _midi_to_alphatex(
     if lyrics and lyrics.strip():
         lyrics_line = f"\\lyrics \"{_escape_alpha_tex_lyrics(lyrics.strip())}\"\n"
 
-    inst_name = _midi_program_to_alphatab_instrument(_get_primary_midi_program(midi))
-    raw_notes = _raw_guitar_notes_from_midi(midi)
-    max_raw = max([n["end"] for n in raw_notes], default=0.0)
-    max_end = max(max_raw, 0.01)
-    bars_info = _compute_bars_info(midi, max_end, bpm_override=tempo_override)
-    bar_chords = _bar_chord_labels(raw_notes, bars_info, int(capo))
-    if preset.name == "arrangement":
-        bar_chords = _smooth_bar_chord_labels(bar_chords)
+    inst_name = inputs.inst_name
+    raw_notes = inputs.raw_notes
+    bars_info = inputs.bars_info
+    bar_chords = _bar_chord_labels(
+        raw_notes, bars_info, int(capo), switch_penalty=preset.chord_switch_penalty
+    )
 
     onset_stats: dict[str, Any] = {}
     chord_mapping_metrics: dict[str, Any] = {}
-    beats, _grid_step_sec = _quantized_beats_from_midi(
-        midi,
-        tempo0,
+    grid_slots, grid_step = inputs.grid_slots(preset, onset_times_sec, onset_stats_out=onset_stats)
+    beats, _grid_step_sec = _beats_from_grid_slots(
+        grid_slots,
+        grid_step,
         preset=preset,
-        onset_times_sec=onset_times_sec,
-        tab_hints=tab_hints,
-        onset_stats_out=onset_stats,
         bars_info=bars_info,
         bar_chords=bar_chords,
         capo=capo,
@@ -2420,7 +3026,6 @@ def _midi_to_alphatex(
     base_den = preset.base_den
     eps = 1e-6
 
-    ts_pairs: list[tuple[float, tuple[int, int]]] = [(t, (n, d)) for t, n, d in ts_segments]
     chord_order_unique: list[str] = []
     _seen_ch: set[str] = set()
     for _lbl in bar_chords:
@@ -2443,15 +3048,14 @@ def _midi_to_alphatex(
     def onset_content_with_dy(
         t0: float, prev_dy: str | None
     ) -> tuple[tuple[tuple[int, int], ...], str, str | None]:
-        onset: list[dict[str, Any]] = []
-        for n in note_events:
-            start_t = (
-                round(_snap_time_to_grid(float(n["start"])), 6)
-                if preset.use_grid_boundaries
-                else float(n["start"])
-            )
-            if abs(start_t - t0) <= 1e-5:
-                onset.append(n)
+        # 시작 시각 정렬 인덱스에서 t0 ± 허용오차 구간만 본다(원래 순서 유지: 같은 줄 동점은 앞 노트 우선).
+        lo = bisect.bisect_left(onset_sorted_starts, t0 - 2e-5)
+        hi = bisect.bisect_right(onset_sorted_starts, t0 + 2e-5)
+        onset = [
+            note_events[i]
+            for i in sorted(onset_order[lo:hi])
+            if abs(onset_starts[i] - t0) <= 1e-5
+        ]
         if not onset:
             return tuple(), "r", prev_dy
 
@@ -2484,12 +3088,8 @@ def _midi_to_alphatex(
 
     bars: list[str] = []
 
-    first_ts = _segment_value_at(ts_pairs, 0.0, (4, 4))
-    first_bpm = (
-        float(tempo_override)
-        if tempo_override is not None
-        else float(_segment_value_at(tempo_segments, 0.0, 120.0))
-    )
+    first_ts = timeline.time_signature_at(0.0)
+    first_bpm = float(tempo_override) if tempo_override is not None else timeline.bpm_at(0.0)
     first_bpm = max(20.0, min(300.0, first_bpm))
     printed_ts: tuple[int, int] = first_ts
     printed_bpm: float = first_bpm
@@ -2502,6 +3102,13 @@ def _midi_to_alphatex(
     def _snap_time_to_grid(t: float) -> float:
         return round(float(t) / step_snap) * step_snap
 
+    onset_starts = [
+        round(_snap_time_to_grid(float(n["start"])), 6) if preset.use_grid_boundaries else float(n["start"])
+        for n in note_events
+    ]
+    onset_order = sorted(range(len(note_events)), key=onset_starts.__getitem__)
+    onset_sorted_starts = [onset_starts[i] for i in onset_order]
+
     boundaries_legacy: set[float] = {0.0, last_bar_end}
     for n in note_events:
         boundaries_legacy.add(float(n["start"]))
@@ -2524,6 +3131,17 @@ def _midi_to_alphatex(
     sorted_boundaries = uniq_sorted(list(boundaries))
     boundary_count_after = len(sorted_boundaries)
 
+    # 마디 경계·마디 안 템포 변경 마커를 한 번만 계산해 둔다(템포 타임라인에서 마디별 bisect 구간).
+    bar_ends = [be for _bs, be, *_r in bars_info]
+    bar_tempo_marks: list[list[str]] = [[] for _ in bars_info]
+    if not suppress_mid_bar_midi_tempo:
+        for i, (bs, be, *_r) in enumerate(bars_info):
+            for tt, bpm_ev in timeline.tempo.between(bs + eps, be - eps):
+                ratio = (tt - bs) / max(1e-9, (be - bs))
+                ratio = min(0.9999, max(0.0001, ratio))
+                bpm_clamped = max(20.0, min(300.0, float(bpm_ev)))
+                bar_tempo_marks[i].append(f'\\tempo ({int(round(bpm_clamped))} "" {ratio:.4f} hide)')
+
     bar_idx = 0
     bar_tokens: list[str] = []
     bar_units = 0.0
@@ -2559,13 +3177,7 @@ def _midi_to_alphatex(
         if abs(float(bpm) - float(printed_bpm)) > 0.51:
             meta_parts.append(f"\\tempo {int(round(bpm))}")
             printed_bpm = float(bpm)
-        if not suppress_mid_bar_midi_tempo:
-            for tt, bpm_ev in tempo_segments:
-                if bs + eps < tt < be - eps:
-                    ratio = (tt - bs) / max(1e-9, (be - bs))
-                    ratio = min(0.9999, max(0.0001, ratio))
-                    bpm_clamped = max(20.0, min(300.0, float(bpm_ev)))
-                    meta_parts.append(f'\\tempo ({int(round(bpm_clamped))} "" {ratio:.4f} hide)')
+        meta_parts.extend(bar_tempo_marks[bar_idx])
         prefix = (" ".join(meta_parts) + " ") if meta_parts else ""
         bars.append(f"{prefix}{' '.join(bar_tokens)} |")
         bar_tokens = []
@@ -2600,10 +3212,9 @@ def _midi_to_alphatex(
         use_cost = preset.use_emit_cost
         use_mdp = preset.use_emit_mdp
         rem_u = float(total_units)
-        guard = 0
+        # 매 반복은 토큰 1개(rem_u ≥0.5 감소)를 내거나 마디를 넘기므로 마디 수 + 토큰 수 안에 끝난다.
         while rem_u > 1e-6:
-            guard += 1
-            if guard > 500_000 or bar_idx >= len(bars_info):
+            if bar_idx >= len(bars_info):
                 return
             measure_units_target = float(bars_info[bar_idx][5])
             room = measure_units_target - float(bar_units)
@@ -2664,7 +3275,7 @@ def _midi_to_alphatex(
         ct = float(st)
         first_note_in_row[0] = True
         while ct < float(en) - eps and bar_idx < len(bars_info):
-            while bar_idx < len(bars_info) and ct >= bars_info[bar_idx][1] - eps:
+            while bar_idx < len(bars_info) and ct >= bar_ends[bar_idx] - eps:
                 if bar_tokens:
                     flush_bar()
                 else:
@@ -2685,20 +3296,18 @@ def _midi_to_alphatex(
     if bar_tokens:
         flush_bar()
 
-    body = "\n".join(bars) if bars else f":{base_den} r |"
-
-    sync_block = ""
-    if bars_info:
-        lines: list[str] = []
-        cap_ms: int | None = None
-        if audio_duration_sec is not None and audio_duration_sec > 0:
-            cap_ms = int(round(float(audio_duration_sec) * 1000.0))
-        for i, (bs, _be, _n, _d, _b, _u) in enumerate(bars_info):
-            ms = int(round(bs * 1000.0))
-            if cap_ms is not None:
-                ms = min(ms, cap_ms)
-            lines.append(f"\\sync {i} 0 {ms}")
-        sync_block = "\n" + "\n".join(lines)
+    sync_lines: list[str] = []
+    cap_ms: int | None = None
+    if audio_duration_sec is not None and audio_duration_sec > 0:
+        cap_ms = int(round(float(audio_duration_sec) * 1000.0))
+    bar_starts = [float(b[0]) for b in bars_info]
+    if beat_warp is not None:
+        bar_starts = beat_warp.to_audio(bar_starts).tolist()
+    for i, bs in enumerate(bar_starts):
+        ms = int(round(max(0.0, bs) * 1000.0))
+        if cap_ms is not None:
+            ms = min(ms, cap_ms)
+        sync_lines.append(f"\\sync {i} 0 {ms}")
 
     # \\lyrics 는 \\staff 직후(스태프 컨텍스트). 이어서 \\chord 정의 → capo → 박자/튜닝/템포.
     capo_line = f"\\capo {int(capo)}\n" if int(capo) > 0 else ""
@@ -2715,23 +3324,33 @@ def _midi_to_alphatex(
         + f"\\tempo {int(round(first_bpm))}\n"
     )
 
-    tex = header + body + sync_block
+    doc = AlphaTexDocument(
+        header=header, bars=bars, sync_lines=sync_lines, empty_body=f":{base_den} r |"
+    )
 
     attempt = 0
     last_diag: dict[str, Any] | None = None
     while attempt < 2:
-        diag = _validate_alphatex_with_alphatab(tex)
+        diag = _validate_alphatex(doc)
         last_diag = diag
         token_ok = bool(diag.get("tokenGuard", {}).get("ok", True))
         has_errors = bool(diag.get("hasErrors", False))
         if token_ok and not has_errors:
             if tab_output_dir is not None and note_events:
                 try:
-                    write_tab_compare_artifacts(
-                        midi_path, note_events, tab_output_dir, refine=False
+                    compare_report = write_tab_compare_artifacts(
+                        midi_path,
+                        note_events,
+                        tab_output_dir,
+                        refine=False,
+                        write_report=compare_report_out is None,
                     )
                 except OSError:
                     pass
+                else:
+                    if compare_report_out is not None:
+                        compare_report_out.clear()
+                        compare_report_out.update(compare_report)
             if tab_experiment_out is not None:
                 tok_counts: list[int] = []
                 for line in bars:
@@ -2756,23 +3375,11 @@ def _midi_to_alphatex(
                 )
                 tab_experiment_out.update(onset_stats)
                 tab_experiment_out.update(chord_mapping_metrics)
-            return tex
-
-        if attempt == 0 and _should_retry_after_alphatex_diagnostics(diag):
-            safe_title = _escape_alpha_tex_string(title)
-            header = (
-                f"\\title \"{safe_title}\"\n"
-                + (f"\\artist \"{safe_artist}\"\n" if safe_artist else "\\artist \"\"\n")
-                + f'\\track "Guitar" {{ instrument "{inst_name}" }}\n'
-                "\\staff {score tabs}\n"
-                + lyrics_line
-                + chord_def_block
-                + capo_line
-                + f"\\ts ({first_ts[0]} {first_ts[1]})\n"
-                "\\tuning (E4 B3 G3 D3 A2 E2)\n"
-                + f"\\tempo {int(round(first_bpm))}\n"
-            )
-            tex = header + body + sync_block
+            return doc
+
+        # 같은 문서를 다시 만들어도 결과가 같으므로, 일시적인 렉서 오류 코드일 때만 한 번 더 검증한다.
+        if attempt == 0 and not _should_retry_after_alphatex_diagnostics(diag):
+            break
         attempt += 1
 
     assert last_diag is not None
@@ -2793,6 +3400,29 @@ def _midi_to_alphatex(
     )
 
 
+def _beats_to_audio_time(beats: list[dict[str, Any]], beat_warp: BeatGridWarp) -> list[dict[str, Any]]:
+    """비트의 time과 노트 start/end를 격자 시각 → 오디오 시각으로 바꾼 사본(슬롯 노트 dict는 건드리지 않음)."""
+    times: list[float] = []
+    for b in beats:
+        times.append(float(b.get("time", 0.0)))
+        for n in b.get("notes", []):
+            if n and n.get("start") is not None and n.get("end") is not None:
+                times.extend((float(n["start"]), float(n["end"])))
+    mapped = iter(np.maximum(0.0, beat_warp.to_audio(times)).tolist())
+    out: list[dict[str, Any]] = []
+    for b in beats:
+        nb = {**b, "time": next(mapped)}
+        notes: list[Any] = []
+        for n in b.get("notes", []):
+            if n and n.get("start") is not None and n.get("end") is not None:
+                n = {**n, "start": next(mapped), "end": next(mapped)}
+            notes.append(n)
+        if "notes" in b:
+            nb["notes"] = notes
+        out.append(nb)
+    return out
+
+
 def _midi_to_score(
     midi_path: Path,
     title: str,
@@ -2802,33 +3432,31 @@ def _midi_to_score(
     capo: int = 0,
     tempo_override: float | None = None,
     onset_times_sec: list[float] | None = None,
+    beat_warp: BeatGridWarp | None = None,
 ) -> dict[str, Any]:
-    tab_hints = extract_guitar_tab_hints_from_midi(midi_path)
-    midi = pretty_midi.PrettyMIDI(str(midi_path))
+    """
+    score.json 본문. beat_warp를 주면 MIDI가 박 격자 시간축이라 보고, 비트·노트 시각을 오디오 시각으로 되돌린다.
+    """
+    inputs = _tab_render_inputs(midi_path, tempo_override=tempo_override)
     capo = _clamp_capo_0_5(capo)
-    tempo_segments = _parse_tempo_segments(midi)
-    ts_segments = _parse_time_signature_segments(midi)
-    tempo = float(tempo_override) if tempo_override is not None else float(tempo_segments[0][1])
-    tempo = max(20.0, min(300.0, tempo))
-    ts0 = ts_segments[0]
+    tempo = inputs.tempo0
+    ts0 = inputs.ts_segments[0]
     num, den = int(ts0[1]), int(ts0[2])
 
-    raw_notes = _raw_guitar_notes_from_midi(midi)
-    max_end = max((n["end"] for n in raw_notes), default=0.0)
-    max_end = max(max_end, 0.01)
-    bars_info = _compute_bars_info(midi, max_end, bpm_override=tempo_override)
-    chord_labels = _bar_chord_labels(raw_notes, bars_info, int(capo))
+    bars_info = inputs.bars_info
+    chord_labels = _bar_chord_labels(inputs.raw_notes, bars_info, int(capo))
 
-    beats, _grid_step_sec = _quantized_beats_from_midi(
-        midi,
-        tempo,
+    grid_slots, grid_step = inputs.grid_slots(TRANSCRIPTION_PRESET, onset_times_sec)
+    beats, _grid_step_sec = _beats_from_grid_slots(
+        grid_slots,
+        grid_step,
         preset=TRANSCRIPTION_PRESET,
-        onset_times_sec=onset_times_sec,
-        tab_hints=tab_hints,
         bars_info=bars_info,
         bar_chords=chord_labels,
         capo=capo,
     )
+    if beat_warp is not None:
+        beats = _beats_to_audio_time(beats, beat_warp)
 
     return {
         "version": 1,
@@ -2843,7 +3471,7 @@ def _midi_to_score(
             "capoMethod": "midi_only_0_5",
             "capoCandidateRange": [int(CAPO_CANDIDATE_RANGE[0]), int(CAPO_CANDIDATE_RANGE[1])],
             "chords": chord_labels,
-            "instrument": _midi_program_to_alphatab_instrument(_get_primary_midi_program(midi)),
+            "instrument": inputs.inst_name,
         },
         "tracks": [
             {
@@ -2869,8 +3497,11 @@ def _render_transcription_alphatex(
     onset_times_sec: list[float] | None,
     tab_output_dir: Path | None,
     tab_experiment_out: dict[str, Any] | None,
-) -> str:
-    return _midi_to_alphatex(
+    compare_report_out: dict[str, Any] | None = None,
+    profile: bool | None = None,
+    beat_warp: BeatGridWarp | None = None,
+) -> AlphaTexDocument:
+    return _midi_to_alphatex_document(
         midi_path,
         title=title,
         artist=artist,
@@ -2881,7 +3512,10 @@ def _render_transcription_alphatex(
         onset_times_sec=onset_times_sec,
         tab_output_dir=tab_output_dir,
         tab_experiment_out=tab_experiment_out,
+        compare_report_out=compare_report_out,
         preset=TRANSCRIPTION_PRESET,
+        profile=profile,
+        beat_warp=beat_warp,
     )
 
 
@@ -2897,9 +3531,12 @@ def _render_arrangement_alphatex(
     onset_times_sec: list[float] | None,
     tab_output_dir: Path | None,
     tab_experiment_out: dict[str, Any] | None,
+    compare_report_out: dict[str, Any] | None = None,
     arrangement_relax_level: int = 0,
-) -> str:
-    return _midi_to_alphatex(
+    profile: bool | None = None,
+    beat_warp: BeatGridWarp | None = None,
+) -> AlphaTexDocument:
+    return _midi_to_alphatex_document(
         midi_path,
         title=title,
         artist=artist,
@@ -2910,16 +3547,176 @@ def _render_arrangement_alphatex(
         onset_times_sec=onset_times_sec,
         tab_output_dir=tab_output_dir,
         tab_experiment_out=tab_experiment_out,
+        compare_report_out=compare_report_out,
         preset=ARRANGEMENT_PRESET,
         arrangement_relax_level=arrangement_relax_level,
+        profile=profile,
+        beat_warp=beat_warp,
     )
 
 
-def _extract_pitch_onset_recall_from_compare_report(report_path: Path) -> float | None:
-    try:
-        payload = json.loads(report_path.read_text(encoding="utf-8"))
-    except (OSError, json.JSONDecodeError):
-        return None
+def rerender_midi_tab(
+    midi_path: Path,
+    *,
+    title: str,
+    capo: int,
+    mode: str = TAB_RENDER_MODE_DEFAULT,
+) -> dict[str, Any]:
+    """
+    capo·렌더 모드만 바꿔 다시 그린다(인터랙티브 capo 선택용).
+    MIDI 파싱·밀도 축소·격자 슬롯은 `_tab_render_inputs` 캐시를 재사용하고 운지·alphaTex 출력만 다시 돈다.
+    품질 리포트(compare_report)는 쓰지 않는다.
+    """
+    if mode not in TAB_RENDER_MODE_ALLOWED:
+        raise ValueError(f"지원하지 않는 렌더 모드: {mode}")
+    capo = _clamp_capo_0_5(capo)
+    alphatex = _midi_to_alphatex(midi_path, title=title, capo=capo, preset=_preset_for_mode(mode))
+    score = _midi_to_score(midi_path, title=title, capo=capo)
+    return {"title": title, "capo": capo, "mode": mode, "score": score, "alphatex": alphatex}
+
+
+def _capo_render_metrics(
+    midi_path: str,
+    capos: list[int],
+    preset: TabRenderPreset,
+    raw_notes: NoteTable,
+    bars_info: list[tuple[float, float, int, int, float, int]],
+    slots: dict[int, list[dict[str, Any]]],
+    step: float,
+) -> list[dict[str, Any]]:
+    """
+    카포 후보들을 운지 엔진(`_beats_from_grid_slots`)까지 돌려 채점한다. 격자 슬롯은 카포와 무관해 호출부가
+    한 번만 계산해 넘기고(프로세스 풀 워커도 같은 슬롯을 받는다), 여기서는 카포별 코드 라벨·운지·지표만 돈다.
+    프렛은 절대 프렛이라 fret < capo 인 노트는 카포를 끼운 상태로는 칠 수 없다.
+    """
+    rows: list[dict[str, Any]] = []
+    for capo in capos:
+        bar_chords = _bar_chord_labels(raw_notes, bars_info, capo, switch_penalty=preset.chord_switch_penalty)
+        chord_metrics: dict[str, Any] = {}
+        beats, _step = _beats_from_grid_slots(
+            slots,
+            step,
+            preset=preset,
+            bars_info=bars_info,
+            bar_chords=bar_chords,
+            capo=capo,
+            chord_metrics_out=chord_metrics,
+        )
+        note_events = [n for b in beats for n in b.get("notes", []) if n and n.get("start") is not None]
+        compare = compare_tab_midi_to_reference(Path(midi_path), note_events)
+        below_capo = sum(1 for n in note_events if int(n["fret"]) < capo)
+        anchors = [
+            min(fretted)
+            for b in beats
+            if (fretted := [int(n["fret"]) for n in b.get("notes", []) if int(n["fret"]) > capo])
+        ]
+        hand_shift = (
+            statistics.fmean(abs(anchors[i] - anchors[i - 1]) for i in range(1, len(anchors)))
+            if len(anchors) > 1
+            else 0.0
+        )
+        simplicity = (
+            statistics.fmean(_chord_label_notation_simplicity(lb) for lb in bar_chords) if bar_chords else 0.0
+        )
+        recall = float(compare["pitch_onset_recall_rate"])
+        chord_tone = float(chord_metrics.get("chord_tone_hit_rate", 0.0))
+        shape = float(chord_metrics.get("shape_alignment_rate", 0.0))
+        below_rate = below_capo / max(1, len(note_events))
+        score = (
+            CAPO_RENDER_RECALL_WEIGHT * recall
+            + CAPO_RENDER_CHORD_TONE_WEIGHT * chord_tone
+            + CAPO_RENDER_SHAPE_WEIGHT * shape
+            - CAPO_RENDER_BELOW_CAPO_PENALTY * below_rate
+            - CAPO_RENDER_HAND_SHIFT_WEIGHT * hand_shift
+            + simplicity
+            + _capo_style_prior(capo)
+        )
+        rows.append(
+            {
+                "capo": int(capo),
+                "score": round(float(score), 6),
+                "pitch_onset_recall_rate": recall,
+                "chord_tone_hit_rate": chord_tone,
+                "shape_alignment_rate": shape,
+                "below_capo_rate": round(float(below_rate), 4),
+                "mean_hand_shift_frets": round(float(hand_shift), 4),
+                "chord_simplicity": round(float(simplicity), 4),
+            }
+        )
+    return rows
+
+
+_CAPO_SEARCH_POOL: ProcessPoolExecutor | None = None
+_CAPO_SEARCH_POOL_WORKERS = 0
+_CAPO_SEARCH_POOL_LOCK = threading.Lock()
+
+
+def _capo_search_pool(n_workers: int) -> ProcessPoolExecutor:
+    """카포 탐색용 프로세스 풀(모듈 수명). 워커 import 비용을 작업마다 다시 내지 않도록 한 번 띄워 재사용한다."""
+    global _CAPO_SEARCH_POOL, _CAPO_SEARCH_POOL_WORKERS
+    with _CAPO_SEARCH_POOL_LOCK:
+        if _CAPO_SEARCH_POOL is None or _CAPO_SEARCH_POOL_WORKERS != n_workers:
+            if _CAPO_SEARCH_POOL is not None:
+                _CAPO_SEARCH_POOL.shutdown(wait=False, cancel_futures=True)
+            # 서버는 렌더를 스레드에서 돌리므로 fork 대신 spawn으로 워커를 띄운다.
+            _CAPO_SEARCH_POOL = ProcessPoolExecutor(
+                max_workers=n_workers, mp_context=multiprocessing.get_context("spawn")
+            )
+            _CAPO_SEARCH_POOL_WORKERS = n_workers
+        return _CAPO_SEARCH_POOL
+
+
+def _discard_capo_search_pool() -> None:
+    global _CAPO_SEARCH_POOL, _CAPO_SEARCH_POOL_WORKERS
+    with _CAPO_SEARCH_POOL_LOCK:
+        if _CAPO_SEARCH_POOL is not None:
+            _CAPO_SEARCH_POOL.shutdown(wait=False, cancel_futures=True)
+        _CAPO_SEARCH_POOL = None
+        _CAPO_SEARCH_POOL_WORKERS = 0
+
+
+def _choose_capo_by_render(
+    midi_path: Path,
+    *,
+    render_mode: str,
+    tempo_override: float | None = None,
+    onset_times_sec: list[float] | None = None,
+    workers: int | None = None,
+) -> tuple[int, list[dict[str, Any]]]:
+    """
+    카포 0~5를 모두 운지까지 렌더해 실제 recall·연주성 지표로 고른다(`TAB_CAPO_SEARCH=render`).
+    밀도 축소·격자 슬롯은 카포와 무관해 `TabRenderInputs`에서 한 번만 만들고, 기본은 같은 프로세스에서
+    후보를 순서대로 채점한다(후보당 운지만 돌아 단일 렌더 몇 배 수준). workers>1 이면 모듈 수명 풀에
+    워커당 한 번씩 슬롯을 보내 후보를 나눠 돌리고, 풀에서 어떤 예외가 나도 같은 프로세스 경로로 다시 돈다.
+    반환: (카포, 후보별 지표).
+    """
+    candidates = list(range(CAPO_CANDIDATE_RANGE[0], CAPO_CANDIDATE_RANGE[1] + 1))
+    n_workers = _parse_capo_search_workers() if workers is None else max(1, min(len(candidates), int(workers)))
+    preset = _preset_for_mode(render_mode)
+    inputs = _tab_render_inputs(midi_path, tempo_override=tempo_override)
+    slots, step = inputs.grid_slots(preset, onset_times_sec)
+    args = (str(midi_path), preset, inputs.raw_notes, inputs.bars_info, slots, step)
+    rows: list[dict[str, Any]] | None = None
+    if n_workers > 1:
+        chunks = [candidates[i::n_workers] for i in range(n_workers)]
+        try:
+            pool = _capo_search_pool(n_workers)
+            futures = [pool.submit(_capo_render_metrics, args[0], chunk, *args[1:]) for chunk in chunks if chunk]
+            by_capo = {row["capo"]: row for f in futures for row in f.result()}
+            rows = [by_capo[c] for c in candidates]
+        except Exception:
+            _discard_capo_search_pool()
+            rows = None
+    if rows is None:
+        rows = _capo_render_metrics(args[0], candidates, *args[1:])
+    best = rows[0]
+    for row in rows[1:]:
+        if row["score"] > best["score"] + 1e-9:
+            best = row
+    return _clamp_capo_0_5(best["capo"]), rows
+
+
+def _extract_pitch_onset_recall_from_compare_report(payload: dict[str, Any]) -> float | None:
     compare_after = payload.get("compare_after_export")
     if not isinstance(compare_after, dict):
         return None
@@ -2936,12 +3733,42 @@ def run_four_step_pipeline(
     url: str,
     *,
     progress_cb: Callable[[dict[str, Any]], None] | None = None,
+    profile_render: bool | None = None,
+) -> PipelineResult:
+    """
+    단계별 계측(StageRecorder)을 켠 채 파이프라인을 실행하고, 종료 시 /metrics 누적 집계에 반영한다.
+    profile_render=True(또는 TAB_RENDER_PROFILE=1)이면 탭 렌더 프로파일을 tab/ 에 남긴다.
+    """
+    stages = StageRecorder()
+    token = activate_recorder(stages)
+    try:
+        result = _run_four_step_pipeline(
+            url, progress_cb=progress_cb, stages=stages, profile_render=profile_render
+        )
+    except Exception as exc:
+        stages.finish("error", str(exc))
+        raise
+    else:
+        stages.finish("ok")
+        return result
+    finally:
+        reset_recorder(token)
+        observe_pipeline_run(stages)
+
+
+def _run_four_step_pipeline(
+    url: str,
+    *,
+    progress_cb: Callable[[dict[str, Any]], None] | None,
+    stages: StageRecorder,
+    profile_render: bool | None,
 ) -> PipelineResult:
     def report(progress: int, stage: str, detail: str) -> None:
         print(f"[pipeline] {progress:>3}% | {stage:<11} | {detail}", flush=True)
         if progress_cb:
             progress_cb({"type": "progress", "progress": progress, "stage": stage, "detail": detail})
 
+    stages.begin("meta")
     title, artist, description, duration_youtube, uploader = _fetch_youtube_meta(url)
     parsed_artist, parsed_track = parse_artist_and_track_from_youtube_title(title)
     score_title = f"{parsed_artist} - {parsed_track}" if (parsed_artist and parsed_track) else title
@@ -2960,9 +3787,12 @@ def run_four_step_pipeline(
     job_dir = _allocate_job_dir(Path("data") / "jobs", base_name)
     (job_dir / "audio").mkdir(parents=True, exist_ok=True)
 
+    stages.begin("download")
     report(5, "download", "yt-dlp로 mp3 다운로드 시작")
     mp3_path = _download_mp3(url, job_dir / "audio")
+    stages.add_artifact("mp3", mp3_path)
     audio_dur = _probe_audio_duration_sec(mp3_path)
+    stages.begin("lyrics")
     lyrics, lyrics_source = _resolve_youtube_lyrics(
         str(url),
         job_dir,
@@ -2982,9 +3812,13 @@ def run_four_step_pipeline(
     render_mode = _resolve_tab_render_mode()
     render_preset = _preset_for_mode(render_mode)
 
+    stages.begin("separate")
     report(25, "separate", "Demucs로 stem 분리 시작")
     stems = _separate_demucs(mp3_path, job_dir / "stems")
     stems_root = job_dir / "stems"
+    for stem_name, stem_path in stems.items():
+        stages.add_artifact(f"stem_{stem_name}", stem_path)
+    stages.begin("stem-q")
     guitar_stem_mp3 = stems.get("guitar")
     piano_stem_mp3 = stems.get("piano")
     guitar_quality = _analyze_stem_quality(guitar_stem_mp3) if guitar_stem_mp3 else {
@@ -3029,80 +3863,150 @@ def run_four_step_pipeline(
         guitar_mp3 = selected_stem_mp3
     selected_stem_wav = stems_root / f"{selected_source}.wav"
     guitar_wav = stems_root / "guitar.wav"
+    stages.begin("convert")
     report(35, "convert", f"{selected_source} 스템 MP3 → WAV(44.1k mono)")
     _ffmpeg_mp3_to_wav_mono_44k(selected_stem_mp3, selected_stem_wav)
     if selected_source == "guitar":
         guitar_wav = selected_stem_wav
     elif not guitar_wav.exists():
         _ffmpeg_mp3_to_wav_mono_44k(guitar_mp3, guitar_wav)
+    stages.add_artifact("selected_stem_wav", selected_stem_wav)
 
+    stages.begin("basic-pitch")
     report(50, "basic-pitch", f"Basic Pitch로 {selected_source} WAV → MIDI 변환")
-    midi_path = _instrument_wav_to_midi_basic_pitch(selected_stem_wav, job_dir / "midi" / "guitar.mid")
-
-    midi_for_bpm = pretty_midi.PrettyMIDI(str(midi_path))
-    midi_bpm = _primary_bpm_from_midi(midi_for_bpm)
-    report(58, "tempo", f"MIDI 템포 BPM≈{midi_bpm:.1f}")
+    # Basic Pitch 원본은 guitar_unsnapped.mid로 남기고(비교용), 스냅은 메모리에서 한 뒤 guitar.mid로 한 번만 쓴다.
+    unsnapped_midi_path = _instrument_wav_to_midi_basic_pitch(
+        selected_stem_wav, job_dir / "midi" / "guitar_unsnapped.mid"
+    )
+    stages.add_artifact("midi_unsnapped", unsnapped_midi_path)
+
+    midi_tab = pretty_midi.PrettyMIDI(str(unsnapped_midi_path))
+    midi_bpm = _primary_bpm_from_midi(midi_tab)
+
+    # 박 추적: Basic Pitch MIDI 템포는 고정값이라, 스냅·마디 격자는 스템에서 추적한 박을 따른다.
+    stages.begin("beats")
+    report(56, "beats", f"{selected_source} stem 박·강박 추적")
+    beats_per_bar = int(midi_tab.time_signature_changes[0].numerator) if midi_tab.time_signature_changes else 4
+    # 선택된 스템만 전체 길이 onset 곡선을 한 번 계산해 박 추적·onset 게이트가 같이 쓴다.
+    selected_onset_envelope = _stem_onset_envelope(job_dir, selected_stem_mp3)
+    beat_meta = analyze_beats_from_audio(
+        selected_stem_mp3,
+        beats_per_bar=beats_per_bar,
+        cache_dir=Path("data") / "beat_cache",
+        onset_envelope=selected_onset_envelope,
+    )
+    beat_times: list[float] = []
+    downbeat_indices: list[int] = []
+    tab_bpm = midi_bpm
+    if beat_meta.get("ok"):
+        beat_times = [float(t) for t in beat_meta.get("beat_times_sec") or []]
+        downbeat_indices = [int(i) for i in beat_meta.get("downbeat_indices") or []]
+        tab_bpm = float(beat_meta["bpm"])
+        report(58, "tempo", f"박 {len(beat_times)}개, BPM≈{tab_bpm:.1f} (MIDI 템포 {midi_bpm:.1f})")
+    else:
+        report(58, "tempo", f"박 추적 실패·MIDI 템포 BPM≈{midi_bpm:.1f} 사용 ({beat_meta.get('error') or 'unknown'})")
 
+    stages.begin("quantize")
+    snap_subdivisions = render_preset.subdivisions_per_quarter if render_preset.unified_grid else 4
     try:
-        midi_adjust = pretty_midi.PrettyMIDI(str(midi_path))
         if render_preset.unified_grid:
             snap_midi_notes_to_tempo_grid(
-                midi_adjust,
-                midi_bpm,
-                [],
+                midi_tab,
+                tab_bpm,
+                beat_times,
                 subdivisions_per_quarter=render_preset.subdivisions_per_quarter,
             )
         else:
-            snap_midi_notes_to_sixteenth_grid(midi_adjust, midi_bpm, [])
-        midi_adjust.write(str(midi_path))
+            snap_midi_notes_to_sixteenth_grid(midi_tab, tab_bpm, beat_times)
     except Exception as exc:
         report(62, "quantize", f"MIDI 16분 그리드 스냅 생략/실패: {exc}")
-
+    # guitar.mid는 오디오 시각 그대로(박 사이 등분 칸에 스냅) 남겨 job_meta의 박·onset 시각과 맞춘다.
+    midi_path = job_dir / "midi" / "guitar.mid"
+    midi_tab.write(str(midi_path))
+    stages.add_artifact("midi", midi_path)
+    # 렌더(마디·슬롯 격자)는 균일 템포를 전제하므로, 박을 추적했으면 박 격자 시간축으로 옮긴 사본에서 한다.
+    # `\\sync`·score.json은 beat_warp로 오디오 시각으로 되돌린다. 첫 강박이 격자 마디 첫 박에 오게 맞춘다.
+    beat_warp = BeatGridWarp(
+        tab_bpm,
+        tuple(beat_times),
+        snap_subdivisions,
+        first_downbeat=downbeat_indices[0] if downbeat_indices else None,
+        beats_per_bar=beats_per_bar,
+    )
+    render_midi_path = midi_path
+    render_midi = midi_tab
+    if not beat_warp.is_identity:
+        render_midi = beat_warp.midi_to_grid(midi_tab)
+        render_midi_path = job_dir / "midi" / "guitar_grid.mid"
+        render_midi.write(str(render_midi_path))
+        stages.add_artifact("midi_grid", render_midi_path)
+    tab_inputs = _prime_tab_render_inputs(render_midi_path, render_midi, tempo_override=tab_bpm)
+
+    stages.begin("onset")
     report(65, "onset", f"{selected_source} stem onset 추출(음 과다 표기 완화)")
-    onset_meta = analyze_onsets_from_guitar_audio(selected_stem_mp3, bpm_hint=midi_bpm)
+    onset_meta = analyze_onsets_from_guitar_audio(
+        selected_stem_mp3, bpm_hint=tab_bpm, onset_envelope=selected_onset_envelope
+    )
     onset_times_out: list[float] = []
     if onset_meta.get("ok"):
         onset_times_out = list(onset_meta.get("onset_times_sec") or [])
         report(68, "onset", f"onset {len(onset_times_out)}개 추출")
     else:
         report(68, "onset", f"onset 추출 실패·기본 후처리 사용 ({onset_meta.get('error') or 'unknown'})")
+    # 렌더의 onset 게이트는 렌더 MIDI와 같은 시간축(박 격자)에서 비교한다. job_meta에는 오디오 시각을 남긴다.
+    onset_times_grid = [round(float(t), 6) for t in beat_warp.to_grid(onset_times_out).tolist()]
 
+    stages.begin("capo")
     capo_guess = 0
     capo_method = "midi_only_0_5"
+    capo_candidates: list[dict[str, Any]] = []
+    capo_search = _resolve_capo_search_mode()
     try:
-        midi_for_capo = pretty_midi.PrettyMIDI(str(midi_path))
-        raw_capo = _raw_guitar_notes_from_midi(midi_for_capo)
-        max_e_capo = max((n["end"] for n in raw_capo), default=0.01)
-        bars_capo = _compute_bars_info(midi_for_capo, max_e_capo, bpm_override=midi_bpm)
-        capo_guess = _choose_capo_midi_only(raw_capo, bars_capo, render_mode=render_mode)
+        if capo_search == "render":
+            report(78, "capo", "카포 후보 0~5 운지 렌더 채점")
+            capo_guess, capo_candidates = _choose_capo_by_render(
+                render_midi_path,
+                render_mode=render_mode,
+                tempo_override=tab_bpm,
+                onset_times_sec=onset_times_grid,
+            )
+            capo_method = "render_0_5"
+        else:
+            capo_guess = _choose_capo_midi_only(
+                tab_inputs.raw_notes, tab_inputs.bars_info, render_mode=render_mode
+            )
     except Exception as exc:
         report(80, "capo", f"MIDI 기반 카포 탐색 실패·기본값 0 사용 ({exc})")
         capo_guess = 0
     capo_guess = _clamp_capo_0_5(capo_guess)
     report(82, "capo", f"카포: {capo_guess} ({capo_method})")
 
+    stages.begin("alphatex")
     report(85, "alphatex", f"MIDI를 AlphaTex 문법으로 변환 시작 (mode={render_mode})")
     tab_experiment: dict[str, Any] = {}
+    compare_report: dict[str, Any] = {}
     arrangement_retry_applied = False
     arrangement_recall_initial: float | None = None
     arrangement_recall_final: float | None = None
     arrangement_min_recall = _parse_arrangement_min_recall()
     if render_mode == "arrangement":
-        alphatex = _render_arrangement_alphatex(
-            midi_path,
+        alphatex_doc = _render_arrangement_alphatex(
+            render_midi_path,
             title=score_title,
             artist=display_artist,
             lyrics=lyrics,
             audio_duration_sec=audio_dur,
             capo=capo_guess,
-            tempo_override=midi_bpm,
-            onset_times_sec=onset_times_out,
+            tempo_override=tab_bpm,
+            onset_times_sec=onset_times_grid,
             tab_output_dir=job_dir / "tab",
             tab_experiment_out=tab_experiment,
+            compare_report_out=compare_report,
             arrangement_relax_level=0,
+            profile=profile_render,
+            beat_warp=beat_warp,
         )
-        report_path = job_dir / "tab" / "compare_report.json"
-        arrangement_recall_initial = _extract_pitch_onset_recall_from_compare_report(report_path)
+        arrangement_recall_initial = _extract_pitch_onset_recall_from_compare_report(compare_report)
         arrangement_recall_final = arrangement_recall_initial
         if arrangement_recall_initial is not None and arrangement_recall_initial < arrangement_min_recall:
             arrangement_retry_applied = True
@@ -3111,68 +4015,67 @@ def run_four_step_pipeline(
                 "quality",
                 f"arrangement recall {arrangement_recall_initial:.3f} < {arrangement_min_recall:.3f}, 완화 재시도",
             )
-            alphatex = _render_arrangement_alphatex(
-                midi_path,
+            alphatex_doc = _render_arrangement_alphatex(
+                render_midi_path,
                 title=score_title,
                 artist=display_artist,
                 lyrics=lyrics,
                 audio_duration_sec=audio_dur,
                 capo=capo_guess,
-                tempo_override=midi_bpm,
-                onset_times_sec=onset_times_out,
+                tempo_override=tab_bpm,
+                onset_times_sec=onset_times_grid,
                 tab_output_dir=job_dir / "tab",
                 tab_experiment_out=tab_experiment,
+                compare_report_out=compare_report,
                 arrangement_relax_level=1,
+                profile=profile_render,
+                beat_warp=beat_warp,
             )
-            arrangement_recall_final = _extract_pitch_onset_recall_from_compare_report(report_path)
+            arrangement_recall_final = _extract_pitch_onset_recall_from_compare_report(compare_report)
     else:
-        alphatex = _render_transcription_alphatex(
-            midi_path,
+        alphatex_doc = _render_transcription_alphatex(
+            render_midi_path,
             title=score_title,
             artist=display_artist,
             lyrics=lyrics,
             audio_duration_sec=audio_dur,
             capo=capo_guess,
-            tempo_override=midi_bpm,
-            onset_times_sec=onset_times_out,
+            tempo_override=tab_bpm,
+            onset_times_sec=onset_times_grid,
             tab_output_dir=job_dir / "tab",
             tab_experiment_out=tab_experiment,
+            compare_report_out=compare_report,
+            profile=profile_render,
+            beat_warp=beat_warp,
         )
+    stages.begin("score")
     score = _midi_to_score(
-        midi_path,
+        render_midi_path,
         title=score_title,
         artist=display_artist,
         lyrics=lyrics,
         capo=capo_guess,
-        tempo_override=midi_bpm,
-        onset_times_sec=onset_times_out,
+        tempo_override=tab_bpm,
+        onset_times_sec=onset_times_grid,
+        beat_warp=beat_warp,
     )
+    stages.begin("write")
     (job_dir / "tab").mkdir(parents=True, exist_ok=True)
-    (job_dir / "tab" / "guitar.alphatex").write_text(alphatex, encoding="utf-8")
-    (job_dir / "tab" / "score.json").write_text(json.dumps(score, ensure_ascii=False, indent=2), encoding="utf-8")
-    compare_report_path = job_dir / "tab" / "compare_report.json"
-    if compare_report_path.exists():
-        try:
-            compare_payload = json.loads(compare_report_path.read_text(encoding="utf-8"))
-            compare_payload["capo_in_range_0_5"] = bool(0 <= int(capo_guess) <= 5)
-            compare_payload["chord_tone_hit_rate"] = float(
-                tab_experiment.get("chord_tone_hit_rate", 0.0)
-            )
-            compare_payload["shape_alignment_rate"] = float(
-                tab_experiment.get("shape_alignment_rate", 0.0)
-            )
-            compare_payload["riff_segment_ratio"] = float(
-                tab_experiment.get("riff_segment_ratio", 0.0)
-            )
-            compare_payload["capo_candidate_range"] = [
-                int(CAPO_CANDIDATE_RANGE[0]),
-                int(CAPO_CANDIDATE_RANGE[1]),
-            ]
-            compare_report_path.write_text(
-                json.dumps(compare_payload, ensure_ascii=False, indent=2), encoding="utf-8"
-            )
-        except (OSError, json.JSONDecodeError, ValueError, TypeError):
-            pass
+    with (job_dir / "tab" / "guitar.alphatex").open("w", encoding="utf-8") as fh:
+        alphatex_doc.write_to(fh)
+    write_json(job_dir / "tab" / "score.json", score)
+    (job_dir / "tab" / SCORE_COLUMNS_FILENAME).write_bytes(encode_score_columns(score))
+    if compare_report:
+        # 렌더 단계는 리포트를 메모리로만 넘기고, 카포·코드 지표를 더해 여기서 한 번만 쓴다.
+        compare_report["capo_in_range_0_5"] = bool(0 <= int(capo_guess) <= 5)
+        compare_report["chord_tone_hit_rate"] = float(tab_experiment.get("chord_tone_hit_rate", 0.0))
+        compare_report["shape_alignment_rate"] = float(tab_experiment.get("shape_alignment_rate", 0.0))
+        compare_report["riff_segment_ratio"] = float(tab_experiment.get("riff_segment_ratio", 0.0))
+        compare_report["capo_candidate_range"] = [
+            int(CAPO_CANDIDATE_RANGE[0]),
+            int(CAPO_CANDIDATE_RANGE[1]),
+        ]
+        write_json(job_dir / "tab" / "compare_report.json", compare_report)
     meta_payload = {
         "title": score_title,
         "youtube_title": title,
@@ -3182,15 +4085,23 @@ def run_four_step_pipeline(
         "duration_youtube_sec": duration_youtube,
         "duration_audio_sec": audio_dur,
     }
-    (job_dir / "meta.json").write_text(json.dumps(meta_payload, ensure_ascii=False, indent=2), encoding="utf-8")
+    write_json(job_dir / "meta.json", meta_payload)
 
     job_meta_payload = {
-        "bpm": midi_bpm,
+        "bpm": tab_bpm,
         "midi_bpm": midi_bpm,
-        "beat_times_sec": [],
-        "downbeat_indices": [],
+        "beat_times_sec": beat_times,
+        "downbeat_indices": downbeat_indices,
+        "beats_per_bar": beats_per_bar,
+        "beat_tracking_ok": bool(beat_meta.get("ok")),
+        "beat_tracking_cached": bool(beat_meta.get("cached")),
         "onset_analysis_ok": bool(onset_meta.get("ok")),
         "onset_times_sec": onset_times_out,
+        "onset_envelope_path": (
+            str(_onset_envelope_cache_path(job_dir, selected_stem_mp3))
+            if _onset_envelope_cache_path(job_dir, selected_stem_mp3).is_file()
+            else None
+        ),
         "midi_source_stem": selected_source,
         "midi_source_reason": midi_source_reason,
         "guitar_stem_quality": guitar_quality,
@@ -3200,7 +4111,9 @@ def run_four_step_pipeline(
     }
     if onset_meta.get("error"):
         job_meta_payload["onset_analysis_error"] = onset_meta["error"]
-    (job_dir / "job_meta.json").write_text(json.dumps(job_meta_payload, ensure_ascii=False, indent=2), encoding="utf-8")
+    if beat_meta.get("error"):
+        job_meta_payload["beat_tracking_error"] = beat_meta["error"]
+    write_json(job_dir / "job_meta.json", job_meta_payload)
     lyrics_truncated, lyrics_alphatex_chars = (
         _alphatex_lyrics_truncation_info(lyrics.strip())
         if lyrics and lyrics.strip()
@@ -3213,62 +4126,76 @@ def run_four_step_pipeline(
         alphatex_truncated=lyrics_truncated,
         alphatex_lyrics_chars=lyrics_alphatex_chars,
     )
-    midi_chk = pretty_midi.PrettyMIDI(str(midi_path))
-    (job_dir / "tab" / "summary.json").write_text(
-        json.dumps(
-            {
-                "url": url,
-                "mp3_path": str(mp3_path),
-                "audio_duration_sec": audio_dur,
-                "mode": render_mode,
-                "capo_guess": capo_guess,
-                "capo_method": capo_method,
-                "capo_candidate_range": [
-                    int(CAPO_CANDIDATE_RANGE[0]),
-                    int(CAPO_CANDIDATE_RANGE[1]),
-                ],
-                "capo_in_range_0_5": bool(0 <= int(capo_guess) <= 5),
-                "alphatex_rhythm_mode": (
-                    "arrangement_eighth"
-                    if render_mode == "arrangement"
-                    else "transcription_legacy"
-                ),
-                "lyrics_source": lyrics_source,
-                "lyrics_files": lyrics_files_info,
-                "midi_has_named_chord_track_hint": _midi_has_named_chord_track_hint(midi_chk),
-                "midi_note_events_only": True,
-                "chords_on_score": "마디별 음높이로 추정(표기용). Basic Pitch MIDI에는 코드 문자열이 들어가지 않음.",
-                "midi_source_stem": selected_source,
-                "midi_source_reason": midi_source_reason,
-                "guitar_stem_quality": guitar_quality,
-                "piano_stem_quality": piano_quality,
-                "selected_stem_mp3": str(selected_stem_mp3),
-                "selected_stem_wav": str(selected_stem_wav),
-                "guitar_stem_mp3": str(guitar_mp3),
-                "guitar_stem_wav": str(guitar_wav),
-                "stems": {k: str(v) for k, v in stems.items()},
-                "midi_path": str(midi_path),
-                "tab_hints_extracted": len(extract_guitar_tab_hints_from_midi(midi_path)),
-                "demucs_model": DEMUCS_MODEL_NAME,
-                "guitar_transcribe_backend": "basic_pitch",
-                "alphatex_path": str(job_dir / "tab" / "guitar.alphatex"),
-                "tab_from_tab_midi": str(job_dir / "tab" / "tab_from_tab.mid"),
-                "tab_compare_report": str(job_dir / "tab" / "compare_report.json"),
-                "quality_gate": {
-                    "arrangement_min_recall": arrangement_min_recall,
-                    "arrangement_recall_initial": arrangement_recall_initial,
-                    "arrangement_recall_final": arrangement_recall_final,
-                    "arrangement_retry_applied": arrangement_retry_applied,
-                },
-                "job_meta_path": str(job_dir / "job_meta.json"),
-                "midi_bpm": midi_bpm,
-                "beat_times_count": 0,
-                "tab_experiment": tab_experiment,
+    for artifact_name in (
+        "guitar.alphatex",
+        "score.json",
+        SCORE_COLUMNS_FILENAME,
+        "compare_report.json",
+        "tab_from_tab.mid",
+    ):
+        stages.add_artifact(artifact_name, job_dir / "tab" / artifact_name)
+    stages.end()
+    write_json(
+        job_dir / "tab" / "summary.json",
+        {
+            "url": url,
+            "mp3_path": str(mp3_path),
+            "audio_duration_sec": audio_dur,
+            "mode": render_mode,
+            "capo_guess": capo_guess,
+            "capo_method": capo_method,
+            "capo_candidates": capo_candidates,
+            "capo_candidate_range": [
+                int(CAPO_CANDIDATE_RANGE[0]),
+                int(CAPO_CANDIDATE_RANGE[1]),
+            ],
+            "capo_in_range_0_5": bool(0 <= int(capo_guess) <= 5),
+            "alphatex_rhythm_mode": (
+                "arrangement_eighth"
+                if render_mode == "arrangement"
+                else "transcription_legacy"
+            ),
+            "lyrics_source": lyrics_source,
+            "lyrics_files": lyrics_files_info,
+            "midi_has_named_chord_track_hint": _midi_has_named_chord_track_hint(tab_inputs.midi),
+            "midi_note_events_only": True,
+            "chords_on_score": "마디별 음높이로 추정(표기용). Basic Pitch MIDI에는 코드 문자열이 들어가지 않음.",
+            "midi_source_stem": selected_source,
+            "midi_source_reason": midi_source_reason,
+            "guitar_stem_quality": guitar_quality,
+            "piano_stem_quality": piano_quality,
+            "selected_stem_mp3": str(selected_stem_mp3),
+            "selected_stem_wav": str(selected_stem_wav),
+            "guitar_stem_mp3": str(guitar_mp3),
+            "guitar_stem_wav": str(guitar_wav),
+            "stems": {k: str(v) for k, v in stems.items()},
+            "midi_path": str(midi_path),
+            "midi_unsnapped_path": str(unsnapped_midi_path),
+            "midi_render_path": str(render_midi_path),
+            "tab_hints_extracted": len(tab_inputs.tab_hints),
+            "demucs_model": DEMUCS_MODEL_NAME,
+            "guitar_transcribe_backend": "basic_pitch",
+            "alphatex_path": str(job_dir / "tab" / "guitar.alphatex"),
+            "tab_from_tab_midi": str(job_dir / "tab" / "tab_from_tab.mid"),
+            "tab_compare_report": str(job_dir / "tab" / "compare_report.json"),
+            "tab_render_profile": (
+                str(job_dir / "tab" / RENDER_PROFILE_SUMMARY_NAME)
+                if (job_dir / "tab" / RENDER_PROFILE_SUMMARY_NAME).is_file()
+                else None
+            ),
+            "quality_gate": {
+                "arrangement_min_recall": arrangement_min_recall,
+                "arrangement_recall_initial": arrangement_recall_initial,
+                "arrangement_recall_final": arrangement_recall_final,
+                "arrangement_retry_applied": arrangement_retry_applied,
             },
-            ensure_ascii=False,
-            indent=2,
-        ),
-        encoding="utf-8",
+            "job_meta_path": str(job_dir / "job_meta.json"),
+            "midi_bpm": midi_bpm,
+            "tab_bpm": tab_bpm,
+            "beat_times_count": len(beat_times),
+            "tab_experiment": tab_experiment,
+            "stage_timings": stages.to_summary(),
+        },
     )
     report(100, "done", "유튜브→Demucs→Basic Pitch→AlphaTex 파이프라인 완료")
 
@@ -3277,7 +4204,7 @@ def run_four_step_pipeline(
         mp3_path=mp3_path,
         stems=stems,
         midi_path=midi_path,
-        alphatex=alphatex,
+        alphatex=alphatex_doc.text,
         score=score,
         title=score_title,
         artist=display_artist,
@@ -0,0 +1,106 @@
+"""
+탭 렌더(`_midi_to_alphatex_document`) 옵트인 프로파일링.
+
+환경 변수 `TAB_RENDER_PROFILE=1` 또는 호출 인자 `profile=True`일 때 렌더를 cProfile로 감싸고,
+`tab_output_dir`(= 작업의 `tab/`, compare_report.json 옆)에 다음을 남긴다.
+- render_profile.prof: pstats 원본 (snakeviz·`python -m pstats`로 열람)
+- render_profile.json: 누적 시간 기준 상위 N개 핫스팟 요약 (`TAB_RENDER_PROFILE_TOP`, 기본 25)
+"""
+
+from __future__ import annotations
+
+import cProfile
+import functools
+import io
+import os
+import pstats
+import time
+from pathlib import Path
+from typing import Any, Callable, TypeVar
+
+from .json_codec import write_json
+
+RENDER_PROFILE_TOP_DEFAULT = 25
+RENDER_PROFILE_STATS_NAME = "render_profile.prof"
+RENDER_PROFILE_SUMMARY_NAME = "render_profile.json"
+
+_F = TypeVar("_F", bound=Callable[..., Any])
+
+
+def render_profile_enabled(explicit: bool | None = None) -> bool:
+    if explicit is not None:
+        return bool(explicit)
+    raw = (os.environ.get("TAB_RENDER_PROFILE") or "").strip().lower()
+    return raw in {"1", "true", "yes", "on"}
+
+
+def _render_profile_top_n() -> int:
+    raw = (os.environ.get("TAB_RENDER_PROFILE_TOP") or "").strip()
+    try:
+        return max(1, int(raw)) if raw else RENDER_PROFILE_TOP_DEFAULT
+    except ValueError:
+        return RENDER_PROFILE_TOP_DEFAULT
+
+
+def _hotspots(profiler: cProfile.Profile, top_n: int, *, sort_field: str) -> list[dict[str, Any]]:
+    stats = pstats.Stats(profiler, stream=io.StringIO())
+    rows: list[dict[str, Any]] = []
+    # stats.stats: {(file, line, func): (primitive_calls, total_calls, tottime, cumtime, callers)}
+    for (filename, line, func), (pcalls, ncalls, tottime, cumtime, _callers) in stats.stats.items():  # type: ignore[attr-defined]
+        rows.append(
+            {
+                "function": f"{Path(filename).name}:{line}({func})",
+                "ncalls": int(ncalls),
+                "primitive_calls": int(pcalls),
+                "tottime_sec": round(float(tottime), 6),
+                "cumtime_sec": round(float(cumtime), 6),
+            }
+        )
+    rows.sort(key=lambda r: -r[sort_field])
+    return rows[:top_n]
+
+
+def write_render_profile(profiler: cProfile.Profile, out_dir: Path, *, wall_sec: float) -> dict[str, Any]:
+    out_dir.mkdir(parents=True, exist_ok=True)
+    stats_path = out_dir / RENDER_PROFILE_STATS_NAME
+    profiler.dump_stats(str(stats_path))
+    top_n = _render_profile_top_n()
+    summary = {
+        "wall_sec": round(float(wall_sec), 6),
+        "top_n": top_n,
+        "stats_path": str(stats_path),
+        "hotspots_by_cumtime": _hotspots(profiler, top_n, sort_field="cumtime_sec"),
+        "hotspots_by_tottime": _hotspots(profiler, top_n, sort_field="tottime_sec"),
+    }
+    write_json(out_dir / RENDER_PROFILE_SUMMARY_NAME, summary, pretty=True)
+    return summary
+
+
+def profile_tab_render(fn: _F) -> _F:
+    """
+    렌더 함수에 `profile: bool | None` 키워드를 추가하는 데코레이터.
+    `tab_output_dir` 키워드가 없으면 산출물을 둘 곳이 없으므로 프로파일링하지 않는다.
+    """
+
+    @functools.wraps(fn)
+    def wrapper(*args: Any, profile: bool | None = None, **kwargs: Any) -> Any:
+        out_dir = kwargs.get("tab_output_dir")
+        if out_dir is None or not render_profile_enabled(profile):
+            return fn(*args, **kwargs)
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # 다른 프로파일러가 이미 활성(중첩 렌더 등)이면 프로파일 없이 진행
+            return fn(*args, **kwargs)
+        t0 = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            profiler.disable()
+            try:
+                write_render_profile(profiler, Path(out_dir), wall_sec=time.perf_counter() - t0)
+            except OSError:
+                pass
+
+    return wrapper  # type: ignore[return-value]
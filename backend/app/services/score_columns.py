@@ -0,0 +1,133 @@
+"""
+score.json의 열(column) 기반 바이너리 인코딩.
+
+비트마다 노트 dict를 중첩한 JSON 대신, 비트 시각·노트 줄/프렛/시작/끝/velocity를 타입 배열로 이어 붙인다.
+긴 곡에서 응답 크기와 JSON 인코딩/디코딩 시간을 줄이기 위한 형식이며, JSON(score.json)은 호환용으로 그대로 둔다.
+
+레이아웃(리틀엔디언):
+  magic b"GTSC" | u32 형식 버전 | u32 헤더 길이 | 헤더 JSON(UTF-8, 8바이트 경계까지 공백 패딩) | 열 데이터
+헤더 = {"version", "meta", "tracks": [{name, type, strings, tuning, beatCount, noteCount,
+        columns: [{name, dtype, offset, length}], chords: [[비트 번호, 라벨]], lyrics: [[비트 번호, 가사]]}]}
+열 offset은 버퍼 시작 기준이며 8바이트 정렬이라 브라우저에서 `new Float64Array(buf, offset, length)`로 바로 읽는다.
+비트 i의 노트 = note_* [beat_note_offset[i] : beat_note_offset[i+1]]. 없는 velocity·note_uid는 -1.
+"""
+
+from __future__ import annotations
+
+import json
+import struct
+from typing import Any
+
+import numpy as np
+
+SCORE_COLUMNS_MAGIC = b"GTSC"
+SCORE_COLUMNS_FORMAT_VERSION = 1
+SCORE_COLUMNS_MEDIA_TYPE = "application/octet-stream"
+SCORE_COLUMNS_FILENAME = "score.bin"
+
+_PREFIX = struct.Struct("<4sII")
+_ALIGN = 8
+
+_NOTE_COLUMNS: tuple[tuple[str, str, str, int], ...] = (
+    # (열 이름, dtype, 노트 dict 키, 없을 때 값)
+    ("note_string", "u1", "string", 0),
+    ("note_fret", "u1", "fret", 0),
+    ("note_start", "<f8", "start", 0),
+    ("note_end", "<f8", "end", 0),
+    ("note_velocity", "<i2", "velocity", -1),
+    ("note_uid", "<i4", "note_uid", -1),
+)
+_OPTIONAL_NOTE_KEYS = {"velocity", "note_uid"}
+
+
+def _pad(n: int) -> int:
+    return (-n) % _ALIGN
+
+
+def _track_columns(track: dict[str, Any]) -> tuple[dict[str, Any], list[tuple[str, np.ndarray]]]:
+    beats = track.get("beats") or []
+    notes = [n for b in beats for n in (b.get("notes") or [])]
+    offsets = np.zeros(len(beats) + 1, dtype="<u4")
+    offsets[1:] = np.cumsum([len(b.get("notes") or []) for b in beats], dtype=np.int64)
+    columns: list[tuple[str, np.ndarray]] = [
+        ("beat_time", np.asarray([float(b.get("time", 0.0)) for b in beats], dtype="<f8")),
+        ("beat_note_offset", offsets),
+    ]
+    for name, dtype, key, missing in _NOTE_COLUMNS:
+        columns.append((name, np.asarray([n.get(key, missing) for n in notes], dtype=dtype)))
+    info = {
+        key: track.get(key)
+        for key in ("name", "type", "strings", "tuning")
+        if key in track
+    }
+    info["beatCount"] = len(beats)
+    info["noteCount"] = len(notes)
+    info["chords"] = [[i, b["chord"]] for i, b in enumerate(beats) if b.get("chord") is not None]
+    info["lyrics"] = [[i, b["lyric"]] for i, b in enumerate(beats) if b.get("lyric") is not None]
+    return info, columns
+
+
+def encode_score_columns(score: dict[str, Any]) -> bytes:
+    """`_midi_to_score` 결과 → 열 기반 바이너리."""
+    tracks = [_track_columns(t) for t in score.get("tracks") or []]
+    # 헤더 길이가 열 offset에 영향을 주므로, offset 자리를 채운 헤더 크기가 바뀌지 않을 때까지 맞춘다.
+    data_start = 0
+    while True:
+        offset = data_start
+        header_tracks: list[dict[str, Any]] = []
+        for info, columns in tracks:
+            descs = []
+            for name, arr in columns:
+                descs.append({"name": name, "dtype": arr.dtype.str, "offset": offset, "length": int(arr.shape[0])})
+                offset += arr.nbytes + _pad(arr.nbytes)
+            header_tracks.append({**info, "columns": descs})
+        header = json.dumps(
+            {"version": score.get("version", 1), "meta": score.get("meta", {}), "tracks": header_tracks},
+            ensure_ascii=False,
+            separators=(",", ":"),
+        ).encode("utf-8")
+        head_len = _PREFIX.size + len(header)
+        needed = head_len + _pad(head_len)
+        if needed == data_start:
+            break
+        data_start = needed
+    parts = [_PREFIX.pack(SCORE_COLUMNS_MAGIC, SCORE_COLUMNS_FORMAT_VERSION, len(header)), header, b" " * _pad(head_len)]
+    for _info, columns in tracks:
+        for _name, arr in columns:
+            raw = arr.tobytes()
+            parts.append(raw)
+            parts.append(b"\0" * _pad(len(raw)))
+    return b"".join(parts)
+
+
+def decode_score_columns(data: bytes) -> dict[str, Any]:
+    """`encode_score_columns`의 역변환(score.json과 같은 구조)."""
+    magic, fmt_version, header_len = _PREFIX.unpack_from(data, 0)
+    if magic != SCORE_COLUMNS_MAGIC or fmt_version != SCORE_COLUMNS_FORMAT_VERSION:
+        raise ValueError("지원하지 않는 score 바이너리 형식입니다.")
+    header = json.loads(data[_PREFIX.size : _PREFIX.size + header_len].decode("utf-8"))
+    tracks: list[dict[str, Any]] = []
+    for info in header["tracks"]:
+        cols = {
+            c["name"]: np.frombuffer(data, dtype=c["dtype"], count=c["length"], offset=c["offset"]).tolist()
+            for c in info["columns"]
+        }
+        chords = {i: v for i, v in info.get("chords", [])}
+        lyrics = {i: v for i, v in info.get("lyrics", [])}
+        note_off = cols["beat_note_offset"]
+        beats: list[dict[str, Any]] = []
+        for i, t in enumerate(cols["beat_time"]):
+            notes: list[dict[str, Any]] = []
+            for j in range(note_off[i], note_off[i + 1]):
+                note: dict[str, Any] = {}
+                for name, _dtype, key, missing in _NOTE_COLUMNS:
+                    value = cols[name][j]
+                    if key in _OPTIONAL_NOTE_KEYS and value == missing:
+                        continue
+                    note[key] = value
+                notes.append(note)
+            beats.append({"time": t, "chord": chords.get(i), "lyric": lyrics.get(i), "notes": notes})
+        track = {k: info[k] for k in ("name", "type", "strings", "tuning") if k in info}
+        track["beats"] = beats
+        tracks.append(track)
+    return {"version": header["version"], "meta": header["meta"], "tracks": tracks}
@@ -0,0 +1,270 @@
+"""
+파이프라인 단계별 계측(벽시계·CPU·메모리·서브프로세스·산출물 크기) 및 Prometheus 텍스트 노출.
+
+- `StageRecorder`: 한 작업(job)의 단계 구간(span)을 기록해 summary.json 에 넣을 dict 로 만든다.
+  `cpu_sec`는 작업을 돌리는 스레드의 CPU 시간(`time.thread_time`)이라, 서버 스레드에서 동시에 도는 다른 작업의 CPU는
+  섞이지 않는다(작업이 따로 띄운 스레드·프로세스 풀의 CPU도 빠진다. 자식 프로세스는 `children_cpu_sec`).
+  메모리는 구간 끝의 현재 RSS(`rss_bytes`)와 구간 동안의 증감(`rss_delta_bytes`)이며, `process_peak_rss_bytes`는
+  `ru_maxrss` 그대로 프로세스 수명 전체의 최고치라 단계별 최고치가 아니다.
+- `record_subprocess`: `_run` 등 서브프로세스 호출부에서 현재 활성 단계에 종료 코드·소요 시간을 붙인다.
+- `render_prometheus_text`: 프로세스 누적 집계를 Prometheus text format(0.0.4)으로 반환한다.
+"""
+
+from __future__ import annotations
+
+import contextvars
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+_METRIC_PREFIX = "ai_guitar_tab"
+
+
+def _peak_rss_bytes(*, children: bool = False) -> int | None:
+    """
+    프로세스(또는 종료된 자식 프로세스 중 최대) peak RSS(bytes). 측정 불가 환경이면 None.
+    `ru_maxrss`는 프로세스가 시작된 뒤의 최고치(high-water mark)라 내려가지 않는다.
+    """
+    try:
+        import resource
+    except ImportError:
+        resource = None  # type: ignore[assignment]
+    if resource is not None:
+        who = resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF
+        raw = int(resource.getrusage(who).ru_maxrss)
+        # Linux는 KiB, macOS는 bytes 단위
+        return raw if sys.platform == "darwin" else raw * 1024
+    if children:
+        return None
+    try:
+        import psutil  # type: ignore[import-untyped]
+    except ImportError:
+        return None
+    info = psutil.Process().memory_info()
+    return int(getattr(info, "peak_wset", 0) or info.rss)
+
+
+def _current_rss_bytes() -> int | None:
+    """지금 이 순간의 프로세스 RSS(bytes). Linux는 /proc, 그 밖은 psutil(없으면 None)."""
+    try:
+        with open("/proc/self/statm", "rb") as fh:
+            return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        import psutil  # type: ignore[import-untyped]
+    except ImportError:
+        return None
+    return int(psutil.Process().memory_info().rss)
+
+
+def _children_cpu_sec() -> float:
+    t = os.times()
+    return float(t.children_user + t.children_system)
+
+
+def _file_size(path: Path) -> int | None:
+    try:
+        return int(path.stat().st_size) if path.is_file() else None
+    except OSError:
+        return None
+
+
+class StageRecorder:
+    """작업 하나의 단계 구간을 순서대로 기록한다. `begin`은 이전 구간을 자동으로 닫는다."""
+
+    def __init__(self) -> None:
+        self.spans: list[dict[str, Any]] = []
+        self._current: dict[str, Any] | None = None
+        self._t0_wall = time.time()
+        self._t0_perf = time.perf_counter()
+        self._t0_cpu = time.thread_time()
+        self.status = "running"
+        self.error: str | None = None
+
+    @property
+    def current(self) -> dict[str, Any] | None:
+        return self._current
+
+    def begin(self, stage: str) -> dict[str, Any]:
+        self.end()
+        span: dict[str, Any] = {
+            "stage": stage,
+            "start_unix": round(time.time(), 6),
+            "end_unix": None,
+            "wall_sec": None,
+            "cpu_sec": None,
+            "children_cpu_sec": None,
+            "rss_bytes": None,
+            "rss_delta_bytes": None,
+            "process_peak_rss_bytes": None,
+            "children_process_peak_rss_bytes": None,
+            "subprocesses": [],
+            "artifacts": {},
+            "_perf": time.perf_counter(),
+            "_cpu": time.thread_time(),
+            "_children_cpu": _children_cpu_sec(),
+            "_rss": _current_rss_bytes(),
+        }
+        self.spans.append(span)
+        self._current = span
+        return span
+
+    def end(self) -> None:
+        span = self._current
+        if span is None:
+            return
+        span["end_unix"] = round(time.time(), 6)
+        span["wall_sec"] = round(time.perf_counter() - span.pop("_perf"), 6)
+        span["cpu_sec"] = round(time.thread_time() - span.pop("_cpu"), 6)
+        span["children_cpu_sec"] = round(_children_cpu_sec() - span.pop("_children_cpu"), 6)
+        rss_start = span.pop("_rss")
+        rss = _current_rss_bytes()
+        span["rss_bytes"] = rss
+        span["rss_delta_bytes"] = rss - rss_start if rss is not None and rss_start is not None else None
+        span["process_peak_rss_bytes"] = _peak_rss_bytes()
+        span["children_process_peak_rss_bytes"] = _peak_rss_bytes(children=True)
+        self._current = None
+
+    def add_artifact(self, name: str, path: Path | None) -> None:
+        """현재 구간에 산출물 경로·크기를 붙인다(파일이 없으면 size=None)."""
+        if self._current is None or path is None:
+            return
+        self._current["artifacts"][name] = {"path": str(path), "size_bytes": _file_size(Path(path))}
+
+    def record_subprocess(self, command: list[str], returncode: int | None, duration_sec: float) -> None:
+        if self._current is None:
+            return
+        self._current["subprocesses"].append(
+            {
+                "command": " ".join(str(c) for c in command[:4]),
+                "returncode": returncode,
+                "duration_sec": round(float(duration_sec), 6),
+            }
+        )
+
+    def finish(self, status: str, error: str | None = None) -> None:
+        self.end()
+        self.status = status
+        self.error = error
+
+    def to_summary(self) -> dict[str, Any]:
+        """summary.json 의 `stage_timings` 값. 진행 중인 구간은 제외한다."""
+        done = [s for s in self.spans if s.get("end_unix") is not None]
+        return {
+            "started_unix": round(self._t0_wall, 6),
+            "elapsed_wall_sec": round(time.perf_counter() - self._t0_perf, 6),
+            "elapsed_cpu_sec": round(time.thread_time() - self._t0_cpu, 6),
+            "process_peak_rss_bytes": _peak_rss_bytes(),
+            "spans": [dict(s) for s in done],
+        }
+
+
+_ACTIVE_RECORDER: contextvars.ContextVar[StageRecorder | None] = contextvars.ContextVar(
+    "ai_guitar_tab_stage_recorder", default=None
+)
+
+
+def activate_recorder(recorder: StageRecorder | None) -> contextvars.Token:
+    return _ACTIVE_RECORDER.set(recorder)
+
+
+def reset_recorder(token: contextvars.Token) -> None:
+    _ACTIVE_RECORDER.reset(token)
+
+
+def active_recorder() -> StageRecorder | None:
+    return _ACTIVE_RECORDER.get()
+
+
+def record_subprocess(command: list[str], returncode: int | None, duration_sec: float) -> None:
+    """활성 기록기가 있을 때만 서브프로세스 결과를 현재 구간에 남긴다."""
+    rec = _ACTIVE_RECORDER.get()
+    if rec is not None:
+        rec.record_subprocess(command, returncode, duration_sec)
+
+
+# --- 프로세스 누적 집계 (Prometheus) ---
+_METRICS_LOCK = threading.Lock()
+_STAGE_TOTALS: dict[str, dict[str, float]] = {}
+_PIPELINE_RUNS: dict[str, int] = {}
+_SUBPROCESS_FAILURES: dict[str, int] = {}
+_LAST_RSS_DELTA: dict[str, float] = {}
+
+
+def observe_pipeline_run(recorder: StageRecorder) -> None:
+    """끝난 작업의 구간들을 누적 집계에 반영한다."""
+    with _METRICS_LOCK:
+        _PIPELINE_RUNS[recorder.status] = _PIPELINE_RUNS.get(recorder.status, 0) + 1
+        for span in recorder.spans:
+            if span.get("end_unix") is None:
+                continue
+            stage = str(span["stage"])
+            row = _STAGE_TOTALS.setdefault(
+                stage,
+                {"count": 0.0, "wall_sec": 0.0, "cpu_sec": 0.0, "children_cpu_sec": 0.0, "subprocess_sec": 0.0},
+            )
+            row["count"] += 1
+            row["wall_sec"] += float(span.get("wall_sec") or 0.0)
+            row["cpu_sec"] += float(span.get("cpu_sec") or 0.0)
+            row["children_cpu_sec"] += float(span.get("children_cpu_sec") or 0.0)
+            for sp in span.get("subprocesses", []):
+                row["subprocess_sec"] += float(sp.get("duration_sec") or 0.0)
+                if sp.get("returncode") not in (0, None):
+                    _SUBPROCESS_FAILURES[stage] = _SUBPROCESS_FAILURES.get(stage, 0) + 1
+            if span.get("rss_delta_bytes") is not None:
+                _LAST_RSS_DELTA[stage] = float(span["rss_delta_bytes"])
+
+
+def _label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def render_prometheus_text() -> str:
+    lines: list[str] = []
+
+    def family(name: str, kind: str, help_text: str) -> str:
+        full = f"{_METRIC_PREFIX}_{name}"
+        lines.append(f"# HELP {full} {help_text}")
+        lines.append(f"# TYPE {full} {kind}")
+        return full
+
+    with _METRICS_LOCK:
+        runs = dict(_PIPELINE_RUNS)
+        totals = {k: dict(v) for k, v in _STAGE_TOTALS.items()}
+        failures = dict(_SUBPROCESS_FAILURES)
+        deltas = dict(_LAST_RSS_DELTA)
+
+    name = family("pipeline_runs_total", "counter", "Finished pipeline runs by status.")
+    for status, n in sorted(runs.items()):
+        lines.append(f'{name}{{status="{_label_value(status)}"}} {n}')
+
+    for key, metric, help_text in (
+        ("wall_sec", "stage_wall_seconds_total", "Wall-clock seconds spent per pipeline stage."),
+        ("cpu_sec", "stage_cpu_seconds_total", "CPU seconds of the job thread per pipeline stage."),
+        ("children_cpu_sec", "stage_children_cpu_seconds_total", "Subprocess CPU seconds per pipeline stage."),
+        ("subprocess_sec", "stage_subprocess_seconds_total", "Wall-clock seconds inside subprocesses per stage."),
+        ("count", "stage_runs_total", "Completed stage spans."),
+    ):
+        name = family(metric, "counter", help_text)
+        for stage, row in sorted(totals.items()):
+            lines.append(f'{name}{{stage="{_label_value(stage)}"}} {row[key]:.6g}')
+
+    name = family("stage_subprocess_failures_total", "counter", "Subprocesses exiting non-zero per stage.")
+    for stage, n in sorted(failures.items()):
+        lines.append(f'{name}{{stage="{_label_value(stage)}"}} {n}')
+
+    name = family("stage_rss_delta_bytes", "gauge", "Process RSS change over the last span of each stage.")
+    for stage, v in sorted(deltas.items()):
+        lines.append(f'{name}{{stage="{_label_value(stage)}"}} {v:.0f}')
+
+    peak = _peak_rss_bytes()
+    if peak is not None:
+        name = family("process_peak_rss_bytes", "gauge", "Process lifetime peak RSS (ru_maxrss high-water mark).")
+        lines.append(f"{name} {peak}")
+
+    return "\n".join(lines) + "\n"
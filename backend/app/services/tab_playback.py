@@ -1,12 +1,15 @@
 """탭 note_events → MIDI export 및 원본 MIDI와의 온셋 비교."""
 from __future__ import annotations
 
-import json
+import bisect
+import functools
 from pathlib import Path
 from typing import Any
 
 import pretty_midi
 
+from .json_codec import write_json
+
 GUITAR_OPEN_MIDI = [64, 59, 55, 50, 45, 40]
 GUITAR_MIN_PITCH = 40
 GUITAR_MAX_PITCH = 88
@@ -56,48 +59,73 @@ def _collect_guitar_notes(midi: pretty_midi.PrettyMIDI) -> list[pretty_midi.Note
     return out
 
 
+@functools.lru_cache(maxsize=32)
+def _reference_onsets_cached(path: str, _mtime_ns: int, _size: int) -> dict[int, list[float]]:
+    by_pitch: dict[int, list[float]] = {}
+    for n in _collect_guitar_notes(pretty_midi.PrettyMIDI(path)):
+        by_pitch.setdefault(int(n.pitch), []).append(float(n.start))
+    for starts in by_pitch.values():
+        starts.sort()
+    return by_pitch
+
+
+def _reference_onsets_by_pitch(reference_midi_path: Path) -> dict[int, list[float]]:
+    """원본 기타 노트 온셋을 음높이별 오름차순 목록으로. 파일(mtime·크기)별로 한 번만 파싱한다(읽기 전용)."""
+    st = Path(reference_midi_path).stat()
+    return _reference_onsets_cached(str(reference_midi_path), st.st_mtime_ns, st.st_size)
+
+
+def _nearest_onset(starts: list[float], t: float) -> tuple[float | None, float]:
+    """정렬된 starts에서 t에 가장 가까운 값과 거리. 동거리면 앞쪽(이른 온셋)."""
+    i = bisect.bisect_left(starts, t)
+    best: float | None = None
+    best_d = float("inf")
+    for j in (i - 1, i):
+        if 0 <= j < len(starts):
+            d = abs(starts[j] - t)
+            if d < best_d:
+                best_d = d
+                best = starts[j]
+    return best, best_d
+
+
 def compare_tab_midi_to_reference(
     reference_midi_path: Path,
     tab_note_events: list[dict[str, Any]],
     *,
     onset_tolerance_sec: float = 0.06,
 ) -> dict[str, Any]:
-    ref = pretty_midi.PrettyMIDI(str(reference_midi_path))
-    ref_notes = _collect_guitar_notes(ref)
-    tab_notes: list[tuple[float, int]] = []
+    ref_by_pitch = _reference_onsets_by_pitch(reference_midi_path)
+    ref_count = sum(len(v) for v in ref_by_pitch.values())
+    tab_by_pitch: dict[int, list[float]] = {}
+    tab_count = 0
     for n in tab_note_events:
         st = float(n["start"])
         en = float(n["end"])
         if en <= st:
             continue
         p = string_fret_to_midi_pitch(int(n["string"]), int(n["fret"]))
-        tab_notes.append((st, p))
-    tab_notes.sort(key=lambda x: (x[0], x[1]))
+        tab_by_pitch.setdefault(p, []).append(st)
+        tab_count += 1
+    for starts in tab_by_pitch.values():
+        starts.sort()
     tol = float(onset_tolerance_sec)
 
-    def nearest_ok(query_t: float, pitch: int) -> bool:
-        best = tol * 10
-        for rn in ref_notes:
-            if int(rn.pitch) != pitch:
-                continue
-            d = abs(float(rn.start) - query_t)
-            if d < best:
-                best = d
-        return best <= tol
-
-    hits = sum(1 for st, p in tab_notes if nearest_ok(st, p))
-    onset_match_rate = (hits / len(tab_notes)) if tab_notes else 1.0
+    # 같은 음높이 온셋 중 최근접만 보면 되므로 음높이별 정렬 목록에서 bisect로 이웃 두 개만 비교한다.
+    hits = 0
+    for p, starts in tab_by_pitch.items():
+        ref_starts = ref_by_pitch.get(p, [])
+        hits += sum(1 for st in starts if _nearest_onset(ref_starts, st)[1] <= tol)
+    onset_match_rate = (hits / tab_count) if tab_count else 1.0
     recall_hits = 0
-    for rn in ref_notes:
-        rs = float(rn.start)
-        rp = int(rn.pitch)
-        if any(abs(st - rs) <= tol and p == rp for st, p in tab_notes):
-            recall_hits += 1
-    recall = (recall_hits / len(ref_notes)) if ref_notes else 1.0
+    for p, ref_starts in ref_by_pitch.items():
+        starts = tab_by_pitch.get(p, [])
+        recall_hits += sum(1 for rs in ref_starts if _nearest_onset(starts, rs)[1] <= tol)
+    recall = (recall_hits / ref_count) if ref_count else 1.0
     f1 = 0.0 if onset_match_rate + recall <= 1e-9 else 2 * onset_match_rate * recall / (onset_match_rate + recall)
     return {
-        "tab_note_count": len(tab_notes),
-        "reference_guitar_note_count": len(ref_notes),
+        "tab_note_count": tab_count,
+        "reference_guitar_note_count": ref_count,
         "onset_match_rate": round(float(onset_match_rate), 4),
         "pitch_onset_recall_rate": round(float(recall), 4),
         "f1_onset_symmetric": round(float(f1), 4),
@@ -112,25 +140,15 @@ def nudge_note_events_toward_reference(
     onset_tolerance_sec: float = 0.055,
 ) -> list[dict[str, Any]]:
     """원본과 피치·온셋이 가까우면 탭 노트 시작만 원본 온셋에 맞춘다."""
-    ref = pretty_midi.PrettyMIDI(str(reference_midi_path))
-    ref_notes = _collect_guitar_notes(ref)
+    ref_by_pitch = _reference_onsets_by_pitch(reference_midi_path)
     tol = float(onset_tolerance_sec)
     out: list[dict[str, Any]] = []
     for n in note_events:
         cp = {**n}
         pitch = string_fret_to_midi_pitch(int(cp["string"]), int(cp["fret"]))
-        st = float(cp["start"])
-        best: pretty_midi.Note | None = None
-        best_d = tol * 10
-        for rn in ref_notes:
-            if int(rn.pitch) != pitch:
-                continue
-            d = abs(float(rn.start) - st)
-            if d < best_d:
-                best_d = d
-                best = rn
+        best, best_d = _nearest_onset(ref_by_pitch.get(pitch, []), float(cp["start"]))
         if best is not None and best_d <= tol:
-            cp["start"] = float(best.start)
+            cp["start"] = best
         out.append(cp)
     return out
 
@@ -176,7 +194,9 @@ def write_tab_compare_artifacts(
     tab_dir: Path,
     *,
     refine: bool = True,
+    write_report: bool = True,
 ) -> dict[str, Any]:
+    """tab_from_tab.mid를 쓰고 비교 리포트를 반환한다. write_report=False면 호출부가 필드를 더해 compare_report.json을 직접 쓴다."""
     tab_dir.mkdir(parents=True, exist_ok=True)
     final_notes = list(note_events)
     report: dict[str, Any] = {"refine_enabled": bool(refine)}
@@ -191,5 +211,6 @@ def write_tab_compare_artifacts(
     report["compare_before_refine"] = compare_tab_midi_to_reference(reference_midi_path, note_events)
     report["compare_after_export"] = compare_tab_midi_to_reference(reference_midi_path, final_notes)
     report["note_event_count"] = len(final_notes)
-    (tab_dir / "compare_report.json").write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    if write_report:
+        write_json(tab_dir / "compare_report.json", report)
     return report
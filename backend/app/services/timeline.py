@@ -0,0 +1,94 @@
+"""
+템포·박자표 타임라인과 마디 인덱스(이진 탐색).
+
+구간 목록((시작 시각, 값) 오름차순)을 시각 배열과 값 배열로 나눠 들고 `bisect`로 조회한다.
+템포 이벤트가 촘촘한 MIDI(Basic Pitch 루바토 출력, 템포 맵이 많은 업로드)에서도 마디 계산·운지·출력이
+구간 수에 선형으로 느려지지 않게, `_compute_bars_info`·`_detect_riff_bars`·alphaTex 출력이 같은 객체를 쓴다.
+"""
+
+from __future__ import annotations
+
+import bisect
+from typing import Any
+
+BarInfo = tuple[float, float, int, int, float, int]
+
+# 구간 경계 비교 허용오차(기존 선형 탐색과 같은 값)
+SEGMENT_EPS = 1e-9
+MAX_BARS = 100_000
+
+
+def measure_units_16ths(numerator: int, denominator: int) -> int:
+    return max(1, int(numerator * 16 // denominator))
+
+
+class SegmentTimeline:
+    """(시작 시각, 값) 구간 목록. `value_at(t)` = 시작 시각 ≤ t 인 마지막 구간 값(없으면 default)."""
+
+    def __init__(self, segments: list[tuple[float, Any]], default: Any) -> None:
+        self.times = [float(t) for t, _v in segments]
+        self.values = [v for _t, v in segments]
+        self.default = default
+
+    def value_at(self, t: float) -> Any:
+        i = bisect.bisect_right(self.times, t + SEGMENT_EPS) - 1
+        return self.values[i] if i >= 0 else self.default
+
+    def between(self, lo: float, hi: float) -> list[tuple[float, Any]]:
+        """lo < 시작 시각 < hi 인 구간들(시각 순)."""
+        i = bisect.bisect_right(self.times, lo)
+        j = bisect.bisect_left(self.times, hi)
+        return list(zip(self.times[i:j], self.values[i:j]))
+
+
+class TempoTimeline:
+    """템포(BPM)·박자표 구간. `_parse_tempo_segments` / `_parse_time_signature_segments` 결과를 받는다."""
+
+    def __init__(
+        self,
+        tempo_segments: list[tuple[float, float]],
+        ts_segments: list[tuple[float, int, int]],
+    ) -> None:
+        self.tempo = SegmentTimeline(tempo_segments, 120.0)
+        self.time_signature = SegmentTimeline([(t, (n, d)) for t, n, d in ts_segments], (4, 4))
+
+    def bpm_at(self, t: float) -> float:
+        return float(self.tempo.value_at(t))
+
+    def time_signature_at(self, t: float) -> tuple[int, int]:
+        return self.time_signature.value_at(t)
+
+    def bars(self, max_end: float, *, bpm_override: float | None = None) -> list[BarInfo]:
+        """마디 시작 템포·박자표로 마디 길이를 정해 max_end까지 이어 붙인다(최소 1마디, 최대 MAX_BARS+1)."""
+        eps = 1e-6
+        bars_info: list[BarInfo] = []
+        t_cursor = 0.0
+        while t_cursor < max_end + eps or not bars_info:
+            num, den = self.time_signature_at(t_cursor)
+            bpm = float(bpm_override) if bpm_override is not None else self.bpm_at(t_cursor)
+            bpm = max(20.0, min(300.0, bpm))
+            measure_units = measure_units_16ths(num, den)
+            measure_sec = measure_units * (60.0 / bpm) / 4.0
+            bars_info.append((t_cursor, t_cursor + measure_sec, num, den, bpm, measure_units))
+            t_cursor += measure_sec
+            if len(bars_info) > MAX_BARS:
+                break
+        return bars_info
+
+
+class BarIndex:
+    """
+    연속 마디(다음 마디 시작 = 이전 마디 끝) 목록에서 시각 → 마디 인덱스.
+    t < 끝 - 1e-9 인 첫 마디, 끝을 넘으면 마지막 마디, 비어 있으면 0.
+    """
+
+    def __init__(self, bars_info: list[BarInfo]) -> None:
+        self._ends = [float(b[1]) - SEGMENT_EPS for b in bars_info]
+
+    def __len__(self) -> int:
+        return len(self._ends)
+
+    def index_at(self, t: float) -> int:
+        if not self._ends:
+            return 0
+        return min(bisect.bisect_right(self._ends, t), len(self._ends) - 1)
@@ -0,0 +1,222 @@
+"""
+MIDI 디렉터리(또는 매니페스트)를 프로세스 풀로 일괄 탭 렌더.
+
+`_midi_to_alphatex` / `_midi_to_score`를 파일마다 실행해
+<out>/<이름>/guitar.alphatex, score.json, compare_report.json, tab_experiment.json 을 남기고,
+<out>/batch_metrics.csv · batch_metrics.json 에 파일별 지표(소요 시간·recall 등)를 모은다.
+`HYBRID_*` 가중치 튜닝 뒤 카탈로그 전체를 다시 렌더할 때 쓴다.
+
+실행(backend 디렉터리에서):
+  PYTHONPATH=. python scripts/batch_render_midi.py <midi_dir | manifest.json | manifest.txt> --out data/batch
+매니페스트: 경로 목록(.txt 한 줄에 하나) 또는 JSON 배열(문자열 또는 {"midi", "title", "capo"} 객체).
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any
+
+_BACKEND = Path(__file__).resolve().parents[1]
+if str(_BACKEND) not in sys.path:
+    sys.path.insert(0, str(_BACKEND))
+
+_METRIC_COLUMNS = [
+    "name",
+    "midi",
+    "status",
+    "render_sec",
+    "capo",
+    "mode",
+    "note_event_count",
+    "reference_guitar_note_count",
+    "pitch_onset_recall_rate",
+    "onset_match_rate",
+    "f1_onset_symmetric",
+    "chord_tone_hit_rate",
+    "shape_alignment_rate",
+    "riff_segment_ratio",
+    "mean_tokens_per_bar",
+    "error",
+]
+
+
+def _load_jobs(source: Path, pattern: str) -> list[dict[str, Any]]:
+    if source.is_dir():
+        found: set[Path] = set()
+        for pat in (x.strip() for x in pattern.split(",")):
+            if pat:
+                found.update(p for p in source.rglob(pat) if p.is_file())
+        return [{"midi": str(p)} for p in sorted(found)]
+    if source.suffix.lower() == ".json":
+        raw = json.loads(source.read_text(encoding="utf-8"))
+        jobs: list[dict[str, Any]] = []
+        for item in raw if isinstance(raw, list) else []:
+            if isinstance(item, str):
+                jobs.append({"midi": item})
+            elif isinstance(item, dict) and item.get("midi"):
+                jobs.append(dict(item))
+        base = source.parent
+        for job in jobs:
+            p = Path(job["midi"])
+            job["midi"] = str(p if p.is_absolute() else base / p)
+        return jobs
+    lines = source.read_text(encoding="utf-8").splitlines()
+    out: list[dict[str, Any]] = []
+    for line in lines:
+        s = line.strip()
+        if s and not s.startswith("#"):
+            p = Path(s)
+            out.append({"midi": str(p if p.is_absolute() else source.parent / p)})
+    return out
+
+
+def _unique_names(jobs: list[dict[str, Any]]) -> None:
+    seen: dict[str, int] = {}
+    for job in jobs:
+        stem = Path(job["midi"]).stem or "midi"
+        n = seen.get(stem, 0)
+        seen[stem] = n + 1
+        job["name"] = stem if n == 0 else f"{stem}-{n}"
+
+
+def _render_one(job: dict[str, Any], out_root: str, mode: str, capo_arg: str) -> dict[str, Any]:
+    """워커 프로세스: 파일 하나를 렌더하고 지표 행을 반환한다(예외는 행의 error로)."""
+    from app.services.json_codec import write_json
+    from app.services.pipeline import (
+        _choose_capo_by_render,
+        _choose_capo_midi_only,
+        _clamp_capo_0_5,
+        _compute_bars_info,
+        _midi_to_alphatex,
+        _midi_to_score,
+        _preset_for_mode,
+        _raw_guitar_notes_from_midi,
+    )
+    import pretty_midi
+
+    midi_path = Path(job["midi"])
+    name = str(job["name"])
+    tab_dir = Path(out_root) / name
+    row: dict[str, Any] = {"name": name, "midi": str(midi_path), "mode": mode, "status": "error"}
+    t0 = time.perf_counter()
+    try:
+        tab_dir.mkdir(parents=True, exist_ok=True)
+        title = str(job.get("title") or midi_path.stem)
+        capo_raw = job.get("capo", capo_arg)
+        if str(capo_raw).strip().lower() == "render":
+            # 파일 단위로 이미 프로세스 풀이므로 후보 6개는 워커 안에서 순서대로 렌더한다.
+            capo, _rows = _choose_capo_by_render(midi_path, render_mode=mode, workers=1)
+        elif str(capo_raw).strip().lower() == "auto":
+            midi = pretty_midi.PrettyMIDI(str(midi_path))
+            raw = _raw_guitar_notes_from_midi(midi)
+            bars = _compute_bars_info(midi, raw.max_end(default=0.01))
+            capo = _choose_capo_midi_only(raw, bars, render_mode=mode)
+        else:
+            capo = _clamp_capo_0_5(int(capo_raw))
+        row["capo"] = capo
+
+        tab_experiment: dict[str, Any] = {}
+        report: dict[str, Any] = {}
+        alphatex = _midi_to_alphatex(
+            midi_path,
+            title=title,
+            capo=capo,
+            tab_output_dir=tab_dir,
+            tab_experiment_out=tab_experiment,
+            compare_report_out=report,
+            preset=_preset_for_mode(mode),
+        )
+        score = _midi_to_score(midi_path, title=title, capo=capo)
+        (tab_dir / "guitar.alphatex").write_text(alphatex, encoding="utf-8")
+        write_json(tab_dir / "score.json", score)
+        write_json(tab_dir / "tab_experiment.json", tab_experiment)
+
+        if report:
+            write_json(tab_dir / "compare_report.json", report)
+            after = report.get("compare_after_export") or {}
+            row["note_event_count"] = report.get("note_event_count")
+            for key in (
+                "reference_guitar_note_count",
+                "pitch_onset_recall_rate",
+                "onset_match_rate",
+                "f1_onset_symmetric",
+            ):
+                row[key] = after.get(key)
+        for key in ("chord_tone_hit_rate", "shape_alignment_rate", "riff_segment_ratio", "mean_tokens_per_bar"):
+            row[key] = tab_experiment.get(key)
+        row["status"] = "ok"
+    except Exception as exc:
+        row["error"] = f"{type(exc).__name__}: {exc}"
+    row["render_sec"] = round(time.perf_counter() - t0, 4)
+    return row
+
+
+def main() -> None:
+    from app.services.json_codec import write_json
+
+    parser = argparse.ArgumentParser(description="MIDI → AlphaTex/score 일괄 렌더(프로세스 풀)")
+    parser.add_argument("source", help="MIDI 디렉터리 또는 매니페스트(.json/.txt)")
+    parser.add_argument("--out", required=True, help="출력 루트 디렉터리")
+    parser.add_argument("--mode", choices=["transcription", "arrangement"], default="transcription")
+    parser.add_argument("--capo", default="0", help="0~5, auto(휴리스틱) 또는 render(후보 렌더 채점) (매니페스트 항목의 capo가 우선)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--glob", default="*.mid,*.midi", help="디렉터리 입력 시 파일 패턴(쉼표 구분)")
+    args = parser.parse_args()
+
+    jobs = _load_jobs(Path(args.source), args.glob)
+    if not jobs:
+        print("렌더할 MIDI가 없습니다.", file=sys.stderr)
+        raise SystemExit(2)
+    _unique_names(jobs)
+
+    out_root = Path(args.out)
+    out_root.mkdir(parents=True, exist_ok=True)
+    workers = max(1, min(int(args.workers), len(jobs)))
+    rows: list[dict[str, Any]] = []
+    t0 = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_render_one, job, str(out_root), args.mode, args.capo) for job in jobs]
+        for fut in as_completed(futures):
+            row = fut.result()
+            rows.append(row)
+            print(f"[{len(rows):>4}/{len(jobs)}] {row['status']:<5} {row['render_sec']:>7.2f}s {row['name']}", flush=True)
+    wall = time.perf_counter() - t0
+    rows.sort(key=lambda r: r["name"])
+
+    with (out_root / "batch_metrics.csv").open("w", encoding="utf-8", newline="") as fh:
+        writer = csv.DictWriter(fh, fieldnames=_METRIC_COLUMNS, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(rows)
+
+    ok_rows = [r for r in rows if r["status"] == "ok"]
+    recalls = [float(r["pitch_onset_recall_rate"]) for r in ok_rows if r.get("pitch_onset_recall_rate") is not None]
+    summary = {
+        "source": str(args.source),
+        "mode": args.mode,
+        "workers": workers,
+        "file_count": len(rows),
+        "ok_count": len(ok_rows),
+        "error_count": len(rows) - len(ok_rows),
+        "wall_sec": round(wall, 3),
+        "render_sec_total": round(sum(float(r["render_sec"]) for r in rows), 3),
+        "mean_pitch_onset_recall_rate": round(sum(recalls) / len(recalls), 4) if recalls else None,
+        "files": rows,
+    }
+    write_json(out_root / "batch_metrics.json", summary, pretty=True)
+    print(
+        f"batch render: {len(ok_rows)}/{len(rows)} ok, wall {wall:.1f}s "
+        f"(render total {summary['render_sec_total']:.1f}s, workers={workers})"
+    )
+    if len(ok_rows) < len(rows):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,11 @@
 """
 MIDI 마디별 피치클래스 집계 (tab 학습용).
-입력: guitar.mid 경로, job_meta.json 경로(선택, beat_times_sec 사용).
-출력: stdout에 JSON.
+입력: guitar.mid 경로, job_meta.json 경로(선택, beat_times_sec·onset_times_sec 사용).
+출력: stdout에 JSON. job_meta에 파이프라인이 뽑은 onset 시각이 있으면 마디별 오디오 onset 개수(onsetCount)도 붙인다.
 """
 from __future__ import annotations
 
+import bisect
 import json
 import sys
 from pathlib import Path
@@ -23,6 +24,19 @@ def _collect_notes(pm: pretty_midi.PrettyMIDI) -> list[tuple[float, float, int]]
     return out
 
 
+def _onset_times_from_meta(meta: dict) -> list[float] | None:
+    """job_meta의 onset 시각(파이프라인 onset 게이트가 쓴 것과 같은 값)을 정렬해 돌려준다. 분석 실패면 None."""
+    raw = meta.get("onset_times_sec")
+    if not meta.get("onset_analysis_ok") or not isinstance(raw, list):
+        return None
+    return sorted(float(t) for t in raw if isinstance(t, (int, float)))
+
+
+def _onset_count(onsets: list[float], t0: float, t1: float) -> int:
+    """정렬된 onsets 중 [t0, t1) 개수."""
+    return bisect.bisect_left(onsets, t1) - bisect.bisect_left(onsets, t0)
+
+
 def _beats_per_bar_from_midi(pm: pretty_midi.PrettyMIDI) -> int:
     if pm.time_signature_changes:
         ts = pm.time_signature_changes[0]
@@ -49,9 +63,11 @@ def main() -> None:
     duration = float(pm.get_end_time())
 
     beats: list[float] = []
+    onsets: list[float] | None = None
     if meta_path and meta_path.exists():
         meta = json.loads(meta_path.read_text(encoding="utf-8"))
         beats = [float(x) for x in meta.get("beat_times_sec", []) if isinstance(x, (int, float))]
+        onsets = _onset_times_from_meta(meta)
 
     bars: list[dict] = []
 
@@ -66,15 +82,16 @@ def main() -> None:
                     pc = p % 12
                     pcs[pc] = pcs.get(pc, 0) + 1
             top = sorted(pcs.items(), key=lambda kv: (-kv[1], kv[0]))[:6]
-            bars.append(
-                {
-                    "index": i,
-                    "t0": t0,
-                    "t1": t1,
-                    "pitchClassCounts": {str(k): v for k, v in sorted(pcs.items())},
-                    "topPitchClasses": [k for k, _ in top],
-                }
-            )
+            bar = {
+                "index": i,
+                "t0": t0,
+                "t1": t1,
+                "pitchClassCounts": {str(k): v for k, v in sorted(pcs.items())},
+                "topPitchClasses": [k for k, _ in top],
+            }
+            if onsets is not None:
+                bar["onsetCount"] = _onset_count(onsets, t0, t1)
+            bars.append(bar)
     else:
         bpm = 120.0
         _, tempos = pm.get_tempo_changes()
@@ -93,21 +110,23 @@ def main() -> None:
                     pc = p % 12
                     pcs[pc] = pcs.get(pc, 0) + 1
             top = sorted(pcs.items(), key=lambda kv: (-kv[1], kv[0]))[:6]
-            bars.append(
-                {
-                    "index": i,
-                    "t0": t0,
-                    "t1": t1,
-                    "pitchClassCounts": {str(k): v for k, v in sorted(pcs.items())},
-                    "topPitchClasses": [k for k, _ in top],
-                }
-            )
+            bar = {
+                "index": i,
+                "t0": t0,
+                "t1": t1,
+                "pitchClassCounts": {str(k): v for k, v in sorted(pcs.items())},
+                "topPitchClasses": [k for k, _ in top],
+            }
+            if onsets is not None:
+                bar["onsetCount"] = _onset_count(onsets, t0, t1)
+            bars.append(bar)
 
     out = {
         "midiPath": str(midi_path).replace("\\", "/"),
         "durationSec": duration,
         "beatsPerBar": bpb,
         "beatTimesUsed": len(beats),
+        "onsetTimesUsed": len(onsets) if onsets is not None else 0,
         "barCount": len(bars),
         "bars": bars,
     }
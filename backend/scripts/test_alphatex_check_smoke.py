@@ -0,0 +1,120 @@
+"""
+Python alphaTex 구조 검증(`check_alphatex_structure` / `check_alphatex_chunks`) 스모크.
+- 렌더러(`_midi_to_alphatex_document`) 출력은 두 프리셋 모두 오류 없이 통과해야 한다(거짓 양성 없음).
+- 괄호 짝 불일치, `:` 뒤 숫자 아님, 줄 번호 없는 프렛, `|` 누락은 잡아야 한다.
+- 조각 단위 검사 결과는 한 문자열 검사와 같아야 한다.
+실행: backend 디렉터리에서  PYTHONPATH=. python scripts/test_alphatex_check_smoke.py
+"""
+
+from __future__ import annotations
+
+import sys
+import tempfile
+from pathlib import Path
+from typing import Any
+
+import pretty_midi
+
+# backend 루트를 path에 추가
+_BACKEND = Path(__file__).resolve().parents[1]
+if str(_BACKEND) not in sys.path:
+    sys.path.insert(0, str(_BACKEND))
+
+from app.services.alphatex_check import check_alphatex_chunks, check_alphatex_structure  # noqa: E402
+from app.services.pipeline import (  # noqa: E402
+    ARRANGEMENT_PRESET,
+    TRANSCRIPTION_PRESET,
+    _midi_to_alphatex_document,
+)
+
+_FIXTURE_MIDIS = sorted((_BACKEND.parent / "frontend" / "src" / "test-scores").glob("*/*/midi/guitar.mid"))
+
+_VALID = (
+    '\\title "smoke"\n'
+    '\\track "Guitar" { instrument "Acoustic Guitar (steel)" }\n'
+    "\\staff {score tabs}\n"
+    "\\ts (4 4)\n"
+    "\\tuning (E4 B3 G3 D3 A2 E2)\n"
+    "\\tempo 120\n"
+    ":4 0.6 2.5 (0.1 1.2) r |\n"
+    ":8 3.6 3.6 :4 3.6 3.6 :2 0.1 |\n"
+)
+
+
+def _make_tiny_midi(path: Path) -> None:
+    pm = pretty_midi.PrettyMIDI(initial_tempo=120)
+    inst = pretty_midi.Instrument(program=25, is_drum=False, name="Guitar")
+    for i, pitch in enumerate((40, 45, 52, 55, 59, 64, 67, 64)):
+        inst.notes.append(pretty_midi.Note(velocity=80, pitch=pitch, start=i * 0.25, end=i * 0.25 + 0.5))
+    inst.notes.append(pretty_midi.Note(velocity=80, pitch=48, start=2.0, end=3.0))
+    inst.notes.append(pretty_midi.Note(velocity=80, pitch=55, start=2.0, end=3.0))
+    inst.notes.append(pretty_midi.Note(velocity=80, pitch=60, start=2.0, end=3.0))
+    pm.instruments.append(inst)
+    pm.write(str(path))
+
+
+def _assert_clean(name: str, diag: dict[str, Any]) -> None:
+    assert diag["tokenGuard"]["ok"], (name, diag["tokenGuard"])
+    assert not diag["hasErrors"], (name, diag["errors"][:3], diag["astIssues"][:3])
+
+
+def _check_renderer_output(midis: list[Path]) -> None:
+    for midi_path in midis:
+        for preset in (TRANSCRIPTION_PRESET, ARRANGEMENT_PRESET):
+            doc = _midi_to_alphatex_document(midi_path, title='smoke "quoted" /* title', preset=preset)
+            diag = check_alphatex_structure(doc.text)
+            _assert_clean(f"{midi_path.parent.parent.name}:{preset.name}", diag)
+            assert check_alphatex_chunks(doc.iter_chunks(lines_per_chunk=3)) == diag
+            print(f"[ok] no false positive {midi_path.parent.parent.name} preset={preset.name} bars={len(doc.bars)}")
+
+
+def _mutated(old: str, new: str) -> str:
+    assert old in _VALID, old
+    return _VALID.replace(old, new, 1)
+
+
+def _check_rejections() -> None:
+    _assert_clean("valid", check_alphatex_structure(_VALID))
+
+    diag = check_alphatex_structure(_mutated("(0.1 1.2) r |", "(0.1 1.2 r |"))
+    assert not diag["tokenGuard"]["parenOk"] and diag["hasErrors"], diag
+    print("[ok] unbalanced parens rejected")
+
+    diag = check_alphatex_structure(_mutated(":4 0.6 2.5", ":q 0.6 2.5"))
+    assert not diag["tokenGuard"]["colonOk"] and not diag["tokenGuard"]["ok"], diag
+    print("[ok] ':q' rejected")
+
+    diag = check_alphatex_structure(_mutated(":2 0.1 |", ":2 0. |"))
+    assert diag["hasErrors"] and {i["kind"] for i in diag["astIssues"]} == {
+        "NoteStringDotMismatch",
+        "NonFrettedNumericNote",
+    }, diag["astIssues"]
+    diag = check_alphatex_structure(_mutated(":4 0.6 2.5", ":4 0 2.5"))
+    assert diag["hasErrors"] and [i["kind"] for i in diag["astIssues"]] == ["NonFrettedNumericNote"], diag
+    print("[ok] fret without string rejected")
+
+    diag = check_alphatex_structure(_mutated("(0.1 1.2) r |\n", "(0.1 1.2) r\n\\ts (4 4)\n"))
+    kinds = [i["kind"] for i in diag["astIssues"]]
+    assert diag["hasErrors"] and kinds == ["MissingPipeTokenNode"] and diag["astIssues"][0]["barIndex"] == 0, diag
+    print("[ok] missing pipe rejected")
+
+    # 조각 경계가 문자열·주석·숫자 한가운데 걸려도 결과가 같아야 한다.
+    tex = '\\title "a | b" /* c ( */\n' + _mutated(":4 0.6 2.5", ":4 10.6 2.5")
+    whole = check_alphatex_structure(tex)
+    for size in (1, 2, 5, 17):
+        chunks = [tex[i : i + size] for i in range(0, len(tex), size)]
+        assert check_alphatex_chunks(chunks) == whole, size
+    print("[ok] chunked check matches whole-string check")
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as td:
+        tiny = Path(td) / "smoke.mid"
+        _make_tiny_midi(tiny)
+        _check_renderer_output([tiny, *_FIXTURE_MIDIS])
+    _check_rejections()
+    print("alphatex check smoke: all passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+"""
+onset 게이트·동일 pitch 병합·지속 상한(`_reduce_note_density_with_onsets`) 무작위 동치 검사.
+벡터화 이전의 노트별 루프 구현을 기준(oracle)으로 두고, 무작위 노트 집합에서 결과 열과 통계가 같은지 본다.
+실행: backend 디렉터리에서  PYTHONPATH=. python scripts/test_onset_density_smoke.py [반복 수]
+"""
+
+from __future__ import annotations
+
+import bisect
+import random
+import sys
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+# backend 루트를 path에 추가
+_BACKEND = Path(__file__).resolve().parents[1]
+if str(_BACKEND) not in sys.path:
+    sys.path.insert(0, str(_BACKEND))
+
+from app.services.note_table import NO_UID, NoteTable  # noqa: E402
+from app.services.pipeline import (  # noqa: E402
+    MAX_SUSTAIN_BEATS,
+    MERGE_MIN_IOI_SEC,
+    MIN_NOTE_VELOCITY,
+    ONSET_TOLERANCE_SEC,
+    SUSTAIN_RELEASE_SEC,
+    _reduce_note_density_with_onsets,
+)
+
+
+# --- 기준 구현: 벡터화 이전(노트별 루프) 그대로 ---
+def _nearest_onset_distance_sec(onset_times: list[float], t: float) -> float:
+    if not onset_times:
+        return float("inf")
+    i = bisect.bisect_left(onset_times, t)
+    d = float("inf")
+    if i < len(onset_times):
+        d = min(d, abs(onset_times[i] - t))
+    if i > 0:
+        d = min(d, abs(onset_times[i - 1] - t))
+    return d
+
+
+def _next_onset_after(onset_times: list[float], t: float) -> float | None:
+    if not onset_times:
+        return None
+    i = bisect.bisect_right(onset_times, t)
+    if i < len(onset_times):
+        return onset_times[i]
+    return None
+
+
+def _reference_reduce(
+    raw_notes: NoteTable,
+    *,
+    onset_times_sec: list[float] | None,
+    quarter_sec: float,
+    onset_gate_mode: str,
+    stats_out: dict[str, Any] | None = None,
+) -> NoteTable:
+    if not len(raw_notes):
+        return raw_notes
+
+    onset_times = sorted(float(t) for t in (onset_times_sec or []) if t is not None)
+    mode = onset_gate_mode if onset_gate_mode in ("hard", "soft", "off") else "hard"
+    hard_drop = 0
+    soft_adj = 0
+    if stats_out is not None:
+        stats_out["onset_gate_mode"] = mode
+
+    if onset_times and mode != "off":
+        keep: list[int] = []
+        velocity = raw_notes.velocity.copy()
+        for i, (start, vel) in enumerate(zip(raw_notes.start.tolist(), raw_notes.velocity.tolist())):
+            d = _nearest_onset_distance_sec(onset_times, start)
+            if d <= ONSET_TOLERANCE_SEC or vel >= (MIN_NOTE_VELOCITY + 8):
+                keep.append(i)
+                continue
+            if mode == "hard":
+                hard_drop += 1
+                continue
+            nv = max(MIN_NOTE_VELOCITY, int(round(vel * 0.62)))
+            if nv != vel:
+                soft_adj += 1
+            velocity[i] = nv
+            keep.append(i)
+        if keep:
+            raw_notes.velocity = velocity
+            raw_notes = raw_notes.take(np.asarray(keep, dtype=np.int64))
+
+    if stats_out is not None:
+        stats_out["onset_hard_dropped_notes"] = int(hard_drop)
+        stats_out["onset_soft_velocity_adjusted"] = int(soft_adj)
+
+    min_ioi = max(MERGE_MIN_IOI_SEC, quarter_sec / 8.0)
+    pitch_l = raw_notes.pitch.tolist()
+    start_l = raw_notes.start.tolist()
+    end_l = raw_notes.end.tolist()
+    vel_l = raw_notes.velocity.tolist()
+    uid_l = raw_notes.uid.tolist()
+    m_pitch: list[int] = []
+    m_start: list[float] = []
+    m_end: list[float] = []
+    m_vel: list[int] = []
+    m_uid: list[int] = []
+    for i in np.lexsort((raw_notes.end, raw_notes.start, raw_notes.pitch)).tolist():
+        if m_pitch and m_pitch[-1] == pitch_l[i] and start_l[i] - m_end[-1] <= min_ioi:
+            m_end[-1] = max(m_end[-1], end_l[i])
+            m_vel[-1] = max(m_vel[-1], vel_l[i])
+            if m_uid[-1] != NO_UID or uid_l[i] != NO_UID:
+                u1 = m_uid[-1] if m_uid[-1] != NO_UID else 10**9
+                u2 = uid_l[i] if uid_l[i] != NO_UID else 10**9
+                m_uid[-1] = min(u1, u2)
+            continue
+        m_pitch.append(pitch_l[i])
+        m_start.append(start_l[i])
+        m_end.append(end_l[i])
+        m_vel.append(vel_l[i])
+        m_uid.append(uid_l[i])
+
+    keep_rows: list[int] = []
+    new_ends: list[float] = []
+    max_sustain_sec = quarter_sec * MAX_SUSTAIN_BEATS
+    for i in np.lexsort((np.asarray(m_pitch), np.asarray(m_start))).tolist():
+        start = m_start[i]
+        next_onset = _next_onset_after(onset_times, start + 1e-6) if onset_times else None
+        cap1 = start + max_sustain_sec
+        cap2 = (next_onset + SUSTAIN_RELEASE_SEC) if next_onset is not None else cap1
+        new_end = min(m_end[i], cap1, cap2)
+        if new_end <= start + 1e-3:
+            continue
+        keep_rows.append(i)
+        new_ends.append(new_end)
+    if not keep_rows:
+        return raw_notes
+    rows = np.asarray(keep_rows, dtype=np.int64)
+    return NoteTable.from_columns(
+        np.asarray(m_pitch)[rows],
+        np.asarray(m_start)[rows],
+        new_ends,
+        np.asarray(m_vel)[rows],
+        uid=np.asarray(m_uid)[rows],
+    )
+
+
+def _random_case(rng: random.Random) -> tuple[NoteTable, list[float] | None, float, str]:
+    quarter = 60.0 / rng.choice([72.0, 96.0, 120.0, 150.0])
+    grid = quarter / rng.choice([2, 4, 8])
+    n = rng.randint(1, 60)
+    pitches, starts, ends, vels, uids = [], [], [], [], []
+    for _ in range(n):
+        # 격자에 맞춘 시각(동률·겹침이 잘 생기게)과 자유 시각을 섞는다.
+        if rng.random() < 0.6:
+            start = grid * rng.randint(0, 48)
+        else:
+            start = rng.uniform(0.0, grid * 48)
+        length = rng.choice([grid * rng.randint(1, 8), rng.uniform(0.0005, quarter * 6)])
+        pitches.append(rng.choice([40, 45, 52, 52, 55, 60, 64]))
+        starts.append(start)
+        ends.append(start + length)
+        vels.append(rng.randint(MIN_NOTE_VELOCITY, 127))
+        uids.append(NO_UID if rng.random() < 0.3 else rng.randint(0, 500))
+    table = NoteTable.from_columns(pitches, starts, ends, vels, uid=uids if rng.random() < 0.8 else None)
+    onsets: list[float] | None
+    if rng.random() < 0.15:
+        onsets = None if rng.random() < 0.5 else []
+    else:
+        onsets = [rng.choice([grid * rng.randint(0, 48), rng.uniform(0.0, grid * 48)]) for _ in range(rng.randint(1, 40))]
+    mode = rng.choice(["hard", "soft", "off", "bogus"])
+    return table, onsets, quarter, mode
+
+
+def _copy(table: NoteTable) -> NoteTable:
+    return table.take(np.arange(len(table)))
+
+
+def _same(a: NoteTable, b: NoteTable) -> bool:
+    return all(
+        np.array_equal(getattr(a, col), getattr(b, col))
+        for col in ("pitch", "start", "end", "velocity", "uid", "string", "fret")
+    )
+
+
+def main() -> None:
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 3000
+    rng = random.Random(20261019)
+    for k in range(runs):
+        table, onsets, quarter, mode = _random_case(rng)
+        ref_stats: dict[str, Any] = {}
+        new_stats: dict[str, Any] = {}
+        ref = _reference_reduce(
+            _copy(table), onset_times_sec=onsets, quarter_sec=quarter, onset_gate_mode=mode, stats_out=ref_stats
+        )
+        got = _reduce_note_density_with_onsets(
+            _copy(table), onset_times_sec=onsets, quarter_sec=quarter, onset_gate_mode=mode, stats_out=new_stats
+        )
+        assert ref_stats == new_stats, (k, ref_stats, new_stats)
+        assert _same(ref, got), (k, mode)
+    print(f"[ok] onset density equivalence runs={runs}")
+    print("onset density smoke: all passed")
+
+
+if __name__ == "__main__":
+    main()
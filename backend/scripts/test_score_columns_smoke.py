@@ -0,0 +1,90 @@
+"""
+score.bin(`encode_score_columns` / `decode_score_columns`) 왕복 스모크.
+프론트 test-scores의 guitar.mid 픽스처를 `_midi_to_score`로 그린 결과가 인코딩→디코딩 뒤 그대로여야 한다.
+비트별 chord·lyric과 velocity·note_uid가 없는 노트는 합성 score로 따로 본다.
+실행: backend 디렉터리에서  PYTHONPATH=. python scripts/test_score_columns_smoke.py
+"""
+
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+from typing import Any
+
+# backend 루트를 path에 추가
+_BACKEND = Path(__file__).resolve().parents[1]
+if str(_BACKEND) not in sys.path:
+    sys.path.insert(0, str(_BACKEND))
+
+from app.services.pipeline import _midi_to_score  # noqa: E402
+from app.services.score_columns import (  # noqa: E402
+    SCORE_COLUMNS_MAGIC,
+    decode_score_columns,
+    encode_score_columns,
+)
+
+_FIXTURE_MIDIS = sorted((_BACKEND.parent / "frontend" / "src" / "test-scores").glob("*/*/midi/guitar.mid"))
+
+
+def _assert_round_trip(name: str, score: dict[str, Any]) -> int:
+    data = encode_score_columns(score)
+    assert data[:4] == SCORE_COLUMNS_MAGIC
+    decoded = decode_score_columns(data)
+    if decoded != score:
+        for i, (a, b) in enumerate(zip(score["tracks"][0]["beats"], decoded["tracks"][0]["beats"])):
+            assert a == b, (name, i, a, b)
+        raise AssertionError((name, {k: (score[k] == decoded.get(k)) for k in score}))
+    return len(data)
+
+
+def _check_fixtures() -> None:
+    assert _FIXTURE_MIDIS, "frontend/src/test-scores 픽스처 MIDI가 없습니다."
+    for midi_path in _FIXTURE_MIDIS:
+        name = midi_path.parent.parent.name
+        for capo in (0, 2):
+            score = _midi_to_score(midi_path, title=name, artist="smoke", lyrics="첫 줄\n둘째 줄", capo=capo)
+            size = _assert_round_trip(f"{name}:capo{capo}", score)
+        beats = score["tracks"][0]["beats"]
+        print(f"[ok] round trip {name} beats={len(beats)} bytes={size}")
+
+
+def _check_synthetic() -> None:
+    score = {
+        "version": 1,
+        "meta": {"title": "합성", "tempo": 97.5, "chords": ["Am", "F"], "lyrics": None},
+        "tracks": [
+            {
+                "name": "Guitar",
+                "type": "guitar",
+                "strings": 6,
+                "tuning": [40, 45, 50, 55, 59, 64],
+                "beats": [
+                    {"time": 0.0, "chord": "Am", "lyric": "가", "notes": [
+                        {"string": 5, "fret": 0, "start": 0.0, "end": 0.5, "velocity": 90, "note_uid": 0},
+                        {"string": 3, "fret": 2, "start": 0.0, "end": 0.25},
+                    ]},
+                    {"time": 0.3125, "chord": None, "lyric": None, "notes": []},
+                    {"time": 0.625, "chord": "F", "lyric": None, "notes": [
+                        {"string": 6, "fret": 1, "start": 0.625, "end": 1.0 / 3.0, "note_uid": 7},
+                    ]},
+                    {"time": 1.0, "chord": None, "lyric": "나다", "notes": [
+                        {"string": 1, "fret": 24, "start": 1.0, "end": 1.5, "velocity": 1},
+                    ]},
+                ],
+            }
+        ],
+    }
+    _assert_round_trip("synthetic", score)
+    empty = {"version": 1, "meta": {}, "tracks": [{"name": "Guitar", "type": "guitar", "beats": []}]}
+    _assert_round_trip("empty", empty)
+    print("[ok] round trip synthetic chords/lyrics/optional note keys")
+
+
+def main() -> None:
+    _check_fixtures()
+    _check_synthetic()
+    print("score columns smoke: all passed")
+
+
+if __name__ == "__main__":
+    main()
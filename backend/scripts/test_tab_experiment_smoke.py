@@ -44,7 +44,7 @@ def _run_case(name: str, env_updates: dict[str, str], *, mode: str) -> dict:
         _make_tiny_midi(mid)
         out: dict = {}
         if mode == "arrangement":
-            tex = _render_arrangement_alphatex(
+            doc = _render_arrangement_alphatex(
                 mid,
                 title="smoke",
                 artist="",
@@ -58,7 +58,7 @@ def _run_case(name: str, env_updates: dict[str, str], *, mode: str) -> dict:
                 arrangement_relax_level=0,
             )
         else:
-            tex = _render_transcription_alphatex(
+            doc = _render_transcription_alphatex(
                 mid,
                 title="smoke",
                 artist="",
@@ -70,7 +70,7 @@ def _run_case(name: str, env_updates: dict[str, str], *, mode: str) -> dict:
                 tab_output_dir=None,
                 tab_experiment_out=out,
             )
-        assert "\\title" in tex
+        assert "\\title" in doc.text
         assert out.get("boundary_count_after", 0) >= 1
         assert out.get("render_mode") == mode
     print(f"[ok] {name} keys={sorted(env_updates.keys()) or 'default'}")
@@ -1,7 +1,7 @@
 "use client";
 
 import { ScoreViewer, type AlphaTabScore } from "@/components/ScoreViewer";
-import { useRef, useState } from "react";
+import { useCallback, useEffect, useRef, useState } from "react";
 
 type SongMeta = {
   title: string;
@@ -27,6 +27,18 @@ function apiUrl(path: string): string {
   return path;
 }
 
+type TabPreviewPayload = {
+  detail?: string;
+  title?: string;
+  artist?: string;
+  lyrics?: string | null;
+  score?: AlphaTabScore;
+  alphatex?: string;
+};
+
+/** 완료된 작업 jobId를 주소(?job=)에 남겨 새로고침 시 GET 결과 재조회(ETag 재검증 → 304)로 다시 불러온다. */
+const JOB_QUERY_KEY = "job";
+
 export default function Home() {
   const [url, setUrl] = useState("");
   const [score, setScore] = useState<AlphaTabScore | null>(null);
@@ -40,6 +52,50 @@ export default function Home() {
   /** 백엔드 진행 스냅샷이 바뀔 때만 UI 갱신(불필요한 리렌더·로딩바 깜빡임 방지) */
   const lastProgressSnapshotRef = useRef<string>("");
 
+  const applyResult = useCallback((payload: TabPreviewPayload) => {
+    if (!payload.score || !payload.title) {
+      throw new Error("서버 응답 형식이 올바르지 않습니다.");
+    }
+    setSongMeta({
+      title: payload.title,
+      artist: payload.artist ?? "",
+      lyrics: payload.lyrics ?? null,
+      chords: payload.score.meta?.chords ?? [],
+      key: payload.score.meta?.key,
+      capo: payload.score.meta?.capo,
+    });
+    setScore(payload.score);
+    setAlphaTex(payload.alphatex ?? null);
+    setStatus("표시할 악보를 준비했습니다.");
+  }, []);
+
+  useEffect(() => {
+    const params = new URLSearchParams(window.location.search);
+    const jobId = params.get(JOB_QUERY_KEY);
+    if (!jobId) return;
+    let cancelled = false;
+    const restore = async () => {
+      try {
+        // 기본 캐시 모드: 브라우저가 저장한 응답을 If-None-Match로 재검증하고, 변경 없으면 304로 본문을 재사용한다.
+        const res = await fetch(apiUrl(`/api/youtube/tab-preview/result/${encodeURIComponent(jobId)}`));
+        if (!res.ok) throw new Error(`HTTP ${res.status}`);
+        const payload = (await res.json()) as TabPreviewPayload;
+        if (!cancelled) applyResult(payload);
+      } catch {
+        // 서버 재시작 등으로 결과가 없으면 주소의 jobId만 지운다.
+        if (!cancelled) {
+          params.delete(JOB_QUERY_KEY);
+          const query = params.toString();
+          window.history.replaceState(null, "", `${window.location.pathname}${query ? `?${query}` : ""}`);
+        }
+      }
+    };
+    void restore();
+    return () => {
+      cancelled = true;
+    };
+  }, [applyResult]);
+
   const handleAnalyze = async () => {
     if (!url.trim()) return;
     const jobId = `job-${Date.now()}-${Math.random().toString(36).slice(2, 8)}`;
@@ -99,14 +155,7 @@ export default function Home() {
       const res = await postPromise;
       stopped = true;
 
-      const payload = (await res.json().catch(() => ({}))) as {
-        detail?: string;
-        title?: string;
-        artist?: string;
-        lyrics?: string | null;
-        score?: AlphaTabScore;
-        alphatex?: string;
-      };
+      const payload = (await res.json().catch(() => ({}))) as TabPreviewPayload;
 
       if (!res.ok) {
         const msg =
@@ -116,22 +165,11 @@ export default function Home() {
         throw new Error(msg);
       }
 
-      if (!payload.score || !payload.title) {
-        throw new Error("서버 응답 형식이 올바르지 않습니다.");
-      }
-
-      setSongMeta({
-        title: payload.title,
-        artist: payload.artist ?? "",
-        lyrics: payload.lyrics ?? null,
-        chords: payload.score.meta?.chords ?? [],
-        key: payload.score.meta?.key,
-        capo: payload.score.meta?.capo,
-      });
-      setScore(payload.score);
-      setAlphaTex(payload.alphatex ?? null);
-      setStatus("표시할 악보를 준비했습니다.");
+      applyResult(payload);
       setAnalyzeProgress(100);
+      const params = new URLSearchParams(window.location.search);
+      params.set(JOB_QUERY_KEY, jobId);
+      window.history.replaceState(null, "", `${window.location.pathname}?${params.toString()}`);
     } catch (e) {
       const message = e instanceof Error ? e.message : "요청 처리 중 오류가 발생했습니다.";
       setErrorDetail(message);